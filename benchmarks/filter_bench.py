@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+DocuFlow - AST 过滤器基准
+对比两种运行过滤器的方式：
+  - 进程内：pandoc 读取为 JSON，过滤器链在本进程内一次遍历，再由 pandoc 写出（2 个 pandoc 进程）
+  - 外部进程：pandoc --filter，每个过滤器启动一个 Python 进程并往返序列化一次 JSON
+两种方式运行同样的内置过滤器，输出必须完全一致，不一致时返回非零退出码。
+
+用法:
+  python benchmarks/filter_bench.py
+  python benchmarks/filter_bench.py --sections 2000 --runs 7
+"""
+
+import os
+import sys
+import argparse
+import statistics
+import subprocess
+import tempfile
+import time
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+from converter.document_converter import DocumentConverter
+from converter.filters import BUILTIN_FILTERS, create_builtin_filter
+
+OUTPUT_FORMAT = ".html"
+
+# 作为 pandoc --filter 运行的脚本，对标准输入的AST运行一个内置过滤器
+FILTER_SCRIPT = """#!{python}
+import sys
+import json
+sys.path.insert(0, {root!r})
+from converter.filters import FilterPipeline, create_builtin_filter
+doc = json.load(sys.stdin)
+pipeline = FilterPipeline([create_builtin_filter({name!r}, {output_format!r})])
+json.dump(pipeline.apply(doc, sys.argv[1] if len(sys.argv) > 1 else ''), sys.stdout)
+"""
+
+
+def write_document(path, sections):
+    """生成含多级标题与相互链接的测试文档"""
+    with open(path, 'w', encoding='utf-8') as f:
+        for index in range(sections):
+            f.write(f"# 第 {index} 章\n\n")
+            f.write(f"参见 [下一章](chapter{index + 1}.md#sec) 与 [外部](https://example.com/{index}.md)。\n\n")
+            f.write("## 小节 {-}\n\n" if index % 5 == 0 else "## 小节\n\n")
+            f.write("正文 *强调* `代码` 与更多文字。" * 4 + "\n\n")
+
+
+def write_filter_scripts(directory, names):
+    """为每个内置过滤器生成 --filter 脚本"""
+    paths = []
+    for name in names:
+        path = os.path.join(directory, f"{name}.py")
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(FILTER_SCRIPT.format(python=sys.executable, root=PROJECT_ROOT, name=name,
+                                         output_format=OUTPUT_FORMAT))
+        os.chmod(path, 0o755)
+        paths.append(path)
+    return paths
+
+
+def run_in_process(converter, input_path, output_dir):
+    """进程内过滤器：返回输出内容"""
+    output_path = converter.convert_file(input_path, OUTPUT_FORMAT, output_dir)
+    with open(output_path, 'rb') as f:
+        return f.read()
+
+
+def run_external(input_path, output_path, scripts):
+    """pandoc --filter：返回输出内容"""
+    args = ["pandoc", input_path, "-o", output_path, "--standalone", "--self-contained"]
+    for script in scripts:
+        args.extend(["--filter", script])
+    env = dict(os.environ, SOURCE_DATE_EPOCH=str(int(os.path.getmtime(input_path))))
+    subprocess.run(args, capture_output=True, check=True, env=env)
+    with open(output_path, 'rb') as f:
+        return f.read()
+
+
+def median_seconds(func, runs):
+    """多次运行取中位数耗时，返回 (中位数秒数, 最后一次的结果)"""
+    timings = []
+    result = None
+    for _ in range(runs):
+        started = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings), result
+
+
+def main():
+    """基准主函数"""
+    parser = argparse.ArgumentParser(description="DocuFlow AST 过滤器基准")
+    parser.add_argument('--sections', type=int, default=500, help='测试文档的章节数（默认 500）')
+    parser.add_argument('--runs', type=int, default=5, help='每种方式运行次数，取中位数')
+    parser.add_argument('--filters', nargs='+', default=list(BUILTIN_FILTERS),
+                        choices=list(BUILTIN_FILTERS), help='要运行的内置过滤器（默认全部）')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="docuflow_filter_bench_") as work_dir:
+        input_path = os.path.join(work_dir, "doc.md")
+        write_document(input_path, args.sections)
+        scripts = write_filter_scripts(work_dir, args.filters)
+        in_process_dir = os.path.join(work_dir, "in_process")
+        external_path = os.path.join(work_dir, "external.html")
+
+        plain = DocumentConverter()
+        filtered = DocumentConverter(
+            filters=[create_builtin_filter(name, OUTPUT_FORMAT) for name in args.filters]
+        )
+
+        baseline, _ = median_seconds(
+            lambda: run_in_process(plain, input_path, os.path.join(work_dir, "plain")), args.runs)
+        in_process, in_process_output = median_seconds(
+            lambda: run_in_process(filtered, input_path, in_process_dir), args.runs)
+        external, external_output = median_seconds(
+            lambda: run_external(input_path, external_path, scripts), args.runs)
+
+    size = len(in_process_output)
+    print(f"文档: {args.sections} 章，输出 {size} 字节；过滤器: {', '.join(args.filters)}")
+    print(f"{'方式':<20}{'耗时(中位数)':>14}")
+    print(f"{'无过滤器':<20}{baseline * 1000:>11.1f} ms")
+    print(f"{'进程内过滤器':<20}{in_process * 1000:>11.1f} ms")
+    print(f"{'pandoc --filter':<20}{external * 1000:>11.1f} ms")
+    print(f"过滤器额外耗时: 进程内 {(in_process - baseline) * 1000:.1f} ms，"
+          f"外部进程 {(external - baseline) * 1000:.1f} ms")
+
+    if in_process_output != external_output:
+        print("❌ 两种方式的输出不一致")
+        return 1
+    print("✅ 两种方式的输出一致")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+DocuFlow - 增量渲染基准
+生成多章节的 Markdown 文档（含元数据、代码块、数学公式、表格与链接定义），
+对比整篇转换、首次增量渲染与修改一节后再次增量渲染的耗时。
+增量渲染的输出必须与整篇转换逐字节一致，不一致时返回非零退出码。
+
+用法:
+  python benchmarks/incremental_bench.py
+  python benchmarks/incremental_bench.py --sections 400
+"""
+
+import os
+import sys
+import argparse
+import tempfile
+import time
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+from converter.document_converter import DocumentConverter
+
+
+def write_documents(directory, sections):
+    """生成不同特征的文档，返回 {名称: 路径}"""
+    body = []
+    for index in range(sections):
+        body.append(f"## 第 {index} 节\n\n第 {index} 节正文，包含 *强调* 与 [链接][home]。\n\n")
+        if index % 4 == 1:
+            fence = {5: f"```{{#listing-{index} .python}}", 1: "```"}.get(index % 12, "```python")
+            body.append(f"{fence}\nprint({index})\n```\n\n")
+        if index % 4 == 2:
+            body.append(f"行内公式 $x^{index}$ 与行间公式\n\n$$\\sum_{{i=0}}^{{{index}}} i$$\n\n")
+        if index % 4 == 3:
+            body.append(f"    缩进代码块 {index}\n\n| a | b |\n|---|---|\n| {index} | {index * 2} |\n\n")
+    body.append("[home]: https://example.com/\n")
+    body = "".join(body)
+
+    documents = {
+        "plain": "".join(line for line in body.splitlines(keepends=True)
+                         if not line.startswith(("```", "print(", "行内公式", "$$"))),
+        "code_math": body,
+        "front_matter": f"---\ntitle: 手册\nauthor: DocuFlow\n---\n\n{body}",
+        "inline_code": "# 标题\n\n调用 `print(1)`{.python} 输出结果。\n\n## 下一节\n\n正文。\n",
+    }
+    paths = {}
+    for name, text in documents.items():
+        path = os.path.join(directory, f"{name}.md")
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(text)
+        paths[name] = path
+    return paths
+
+
+def convert(converter, path, output_dir, incremental):
+    """转换单个文档，返回 (耗时秒数, 输出内容)"""
+    started = time.perf_counter()
+    output_path, _ = converter.convert_file_detailed(path, ".html", output_dir,
+                                                     incremental=incremental)
+    elapsed = time.perf_counter() - started
+    with open(output_path, 'rb') as f:
+        return elapsed, f.read()
+
+
+def main():
+    """基准主函数"""
+    parser = argparse.ArgumentParser(description="DocuFlow 增量渲染基准")
+    parser.add_argument('--sections', type=int, default=100, help='每篇文档的章节数（默认 100）')
+    args = parser.parse_args()
+
+    mismatched = []
+    print(f"{'文档':<14}{'整篇':>10}{'首次增量':>10}{'再次增量':>10}")
+    with tempfile.TemporaryDirectory(prefix="docuflow_incremental_bench_") as work_dir:
+        input_dir = os.path.join(work_dir, "input")
+        os.makedirs(input_dir)
+        converter = DocumentConverter(cache_dir=os.path.join(work_dir, "cache"))
+        for name, path in write_documents(input_dir, args.sections).items():
+            full, expected = convert(converter, path, os.path.join(work_dir, "full"), False)
+            cold, first = convert(converter, path, os.path.join(work_dir, "cold"), True)
+
+            # 修改第一节后再次渲染，其余章节来自缓存
+            with open(path, 'r', encoding='utf-8') as f:
+                text = f.read()
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(text.replace("正文", "修改后的正文", 1))
+            _, expected_after = convert(converter, path, os.path.join(work_dir, "full"), False)
+            warm, second = convert(converter, path, os.path.join(work_dir, "warm"), True)
+
+            if first != expected or second != expected_after:
+                mismatched.append(name)
+            print(f"{name:<14}{full:>9.2f}s{cold:>9.2f}s{warm:>9.2f}s")
+
+    if mismatched:
+        print(f"❌ 增量渲染与整篇转换的输出不一致: {', '.join(mismatched)}")
+        return 1
+    print("✅ 增量渲染与整篇转换的输出一致")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
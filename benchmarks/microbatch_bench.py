@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+DocuFlow - 小文件批量转换基准
+生成大量只有几 KB 的 Markdown 文件，对比逐个转换（每个文件一个 pandoc 进程）
+与批量转换（一批文件一个 pandoc 进程）的耗时。
+两种方式的输出必须逐字节一致，不一致时返回非零退出码。
+
+用法:
+  python benchmarks/microbatch_bench.py
+  python benchmarks/microbatch_bench.py --files 2000 -j 8 -f .docx
+"""
+
+import os
+import sys
+import argparse
+import filecmp
+import tempfile
+import time
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+from converter.document_converter import DocumentConverter
+from converter.engine import ConversionEngine
+
+
+def write_documents(directory, count):
+    """生成大小不一的小文档（1～5 KB，含标题、列表、代码块与表格）"""
+    paths = []
+    for index in range(count):
+        path = os.path.join(directory, f"note{index:05d}.md")
+        with open(path, 'w', encoding='utf-8') as f:
+            if index % 3 == 0:
+                f.write(f"---\ntitle: 笔记 {index}\n---\n\n")
+            f.write(f"# 第 {index} 篇\n\n")
+            for paragraph in range(1 + index % 8):
+                f.write(f"第 {paragraph} 段，包含 *强调*、`代码` 与 [链接](https://example.com/{index})。" * 3)
+                f.write("\n\n")
+            f.write("- 条目一\n- 条目二\n\n```python\nprint('hello')\n```\n\n| a | b |\n|---|---|\n| 1 | 2 |\n")
+        paths.append(path)
+    return paths
+
+
+def run(paths, output_format, output_dir, jobs, microbatch):
+    """转换全部文件（microbatch 为None时使用配置中的大小上限），返回 (耗时秒数, 失败数)"""
+    engine = ConversionEngine(DocumentConverter(), max_workers=jobs, dedup="off",
+                              microbatch=microbatch)
+    started = time.perf_counter()
+    results = engine.run(paths, output_format, output_dir)
+    return time.perf_counter() - started, sum(1 for result in results if not result.ok)
+
+
+def main():
+    """基准主函数"""
+    parser = argparse.ArgumentParser(description="DocuFlow 小文件批量转换基准")
+    parser.add_argument('--files', type=int, default=500, help='文件数（默认 500）')
+    parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count() or 1,
+                        help='并发数（默认为 CPU 核数）')
+    parser.add_argument('-f', '--format', default='.html', choices=['.html', '.docx'],
+                        help='输出格式（默认 .html）')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="docuflow_microbatch_bench_") as work_dir:
+        input_dir = os.path.join(work_dir, "input")
+        os.makedirs(input_dir)
+        paths = write_documents(input_dir, args.files)
+        total_bytes = sum(os.path.getsize(path) for path in paths)
+
+        single_dir = os.path.join(work_dir, "single")
+        batch_dir = os.path.join(work_dir, "batch")
+        single, single_failed = run(paths, args.format, single_dir, args.jobs, 0)
+        batch, batch_failed = run(paths, args.format, batch_dir, args.jobs, None)
+
+        comparison = filecmp.dircmp(single_dir, batch_dir)
+        mismatched = comparison.left_only + comparison.right_only
+        _, different, errors = filecmp.cmpfiles(single_dir, batch_dir, comparison.common_files,
+                                                shallow=False)
+        mismatched += different + errors
+
+    print(f"{args.files} 个文件（平均 {total_bytes / args.files / 1024:.1f} KB），"
+          f"输出 {args.format}，{args.jobs} 个并发")
+    print(f"{'方式':<12}{'耗时':>10}{'文件/秒':>10}{'失败':>6}")
+    print(f"{'逐个转换':<12}{single:>9.2f}s{args.files / single:>10.0f}{single_failed:>6}")
+    print(f"{'批量转换':<12}{batch:>9.2f}s{args.files / batch:>10.0f}{batch_failed:>6}")
+    print(f"加速 {single / batch:.1f} 倍")
+
+    if mismatched or single_failed != batch_failed:
+        print(f"❌ 两种方式的输出不一致: {', '.join(sorted(mismatched)[:10])}")
+        return 1
+    print("✅ 两种方式的输出一致")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+DocuFlow - 启动时间基准
+使用 python -X importtime 测量入口模块的导入耗时，并检查启动阶段没有
+加载重量级模块、创建日志文件或启动 pandoc 子进程。超出预算时返回非零退出码，
+可直接用于 CI。
+
+用法:
+  python benchmarks/startup_bench.py
+  python benchmarks/startup_bench.py --budget-ms 30 --runs 7
+"""
+
+import os
+import sys
+import argparse
+import statistics
+import subprocess
+import tempfile
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 导入耗时预算（毫秒），可通过环境变量调整
+DEFAULT_BUDGET_MS = float(os.getenv('DOCUFLOW_STARTUP_BUDGET_MS', 50))
+
+# 需要测量的入口模块
+ENTRY_MODULES = ['cli_converter', 'main_pyside', 'main']
+
+# 启动阶段不应加载的模块（按需导入）
+LAZY_MODULES = ['PySide6', 'PyQt5', 'logging', 'concurrent', 'zipfile', 'tarfile', 'uuid']
+
+# 导入入口模块并创建转换器，输出启动阶段加载的受限模块
+PROBE_SCRIPT = """
+import sys
+import {module}
+from converter.document_converter import DocumentConverter
+DocumentConverter()
+loaded = sorted({{name.split('.')[0] for name in sys.modules}} & set({lazy!r}))
+print(','.join(loaded))
+"""
+
+
+def measure_import_ms(module):
+    """测量一次模块导入的累计耗时（毫秒）
+
+    Args:
+        module: 模块名
+
+    Returns:
+        float: 导入耗时
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=PROJECT_ROOT, capture_output=True, text=True, check=True
+    )
+    for line in result.stderr.splitlines():
+        # 格式: import time: self [us] | cumulative | imported package
+        parts = [part.strip() for part in line.split('|')]
+        if len(parts) == 3 and parts[2] == module:
+            return int(parts[1]) / 1000.0
+    raise RuntimeError(f"未找到 {module} 的导入耗时")
+
+
+def check_lazy_startup(module):
+    """检查启动阶段的副作用
+
+    在空的工作目录、不含 pandoc 的 PATH 下导入入口模块并创建转换器。
+
+    Returns:
+        list: 问题描述列表
+    """
+    problems = []
+    with tempfile.TemporaryDirectory() as work_dir:
+        env = dict(os.environ, PATH=work_dir, PYTHONPATH=PROJECT_ROOT)
+        result = subprocess.run(
+            [sys.executable, "-c", PROBE_SCRIPT.format(module=module, lazy=LAZY_MODULES)],
+            cwd=work_dir, env=env, capture_output=True, text=True, check=False
+        )
+        if result.returncode != 0:
+            problems.append(f"导入或创建转换器失败（不应在启动时检查pandoc）: "
+                            f"{result.stderr.strip().splitlines()[-1:]}")
+        elif result.stdout.strip():
+            problems.append(f"启动时加载了应按需导入的模块: {result.stdout.strip()}")
+
+        if os.listdir(work_dir):
+            problems.append(f"启动时在工作目录创建了文件: {os.listdir(work_dir)}")
+    return problems
+
+
+def main():
+    """基准主函数"""
+    parser = argparse.ArgumentParser(description="DocuFlow 启动时间基准")
+    parser.add_argument('--budget-ms', type=float, default=DEFAULT_BUDGET_MS,
+                        help=f'每个入口模块的导入耗时预算（默认 {DEFAULT_BUDGET_MS:g} ms）')
+    parser.add_argument('--runs', type=int, default=5, help='每个模块测量次数，取中位数')
+    args = parser.parse_args()
+
+    # 预先编译字节码，避免首次编译计入导入耗时
+    subprocess.run([sys.executable, "-m", "compileall", "-q", PROJECT_ROOT],
+                   capture_output=True, check=False)
+
+    failed = False
+    print(f"{'模块':<16}{'导入耗时(中位数)':>18}{'预算':>10}")
+    for module in ENTRY_MODULES:
+        timings = [measure_import_ms(module) for _ in range(args.runs)]
+        median = statistics.median(timings)
+        over_budget = median > args.budget_ms
+        failed = failed or over_budget
+        mark = "❌" if over_budget else "✅"
+        print(f"{module:<16}{median:>15.1f} ms{args.budget_ms:>8g} ms {mark}")
+
+        for problem in check_lazy_startup(module):
+            failed = True
+            print(f"  ❌ {problem}")
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -8,8 +8,71 @@ DocuFlow - 命令行版本文档转换器
 import os
 import sys
 import argparse
+import itertools
 from converter.document_converter import DocumentConverter
-from utils.file_utils import is_supported_file, get_supported_formats
+from converter.engine import ConversionEngine, FAILED, CANCELLED, QUARANTINED
+from converter.output import ArchiveSink, UNCHANGED
+from converter.planner import (plan_conversion, check_file, get_throughput_stats, SKIP_LABELS,
+                               SKIP_UP_TO_DATE)
+from converter.filters import BUILTIN_FILTERS, create_builtin_filter
+from utils.file_utils import (is_supported_file, get_supported_formats, get_output_formats,
+                              format_file_size, format_duration, iter_files_from_directory,
+                              iter_path_list)
+from utils.archive_utils import is_archive_file
+
+# 转换计划中每类跳过原因最多列出的文件数
+PLAN_LIST_LIMIT = 10
+
+def print_plan(plan, stats):
+    """打印转换计划"""
+    print("📋 转换计划（仅扫描，不执行转换）")
+    for key, entry in sorted(plan.pairs.items()):
+        source, target = key.split('->')
+        bytes_per_second = stats.bytes_per_second(source, target)
+        history = (f"历史吞吐 {format_file_size(bytes_per_second)}/s，{stats.samples(source, target)} 个样本"
+                   if bytes_per_second else "无历史记录，使用默认估算")
+        print(f"  {source} -> {target}: {entry['files']} 个任务，{format_file_size(entry['bytes'])}，"
+              f"累计约 {format_duration(entry['seconds'])} ({history})")
+    
+    groups = plan.skipped_by_reason()
+    if groups:
+        print(f"\n⏭️  将跳过 {len(plan.skipped)} 个文件:")
+        for reason, items in groups.items():
+            print(f"  {SKIP_LABELS[reason]} {len(items)} 个:")
+            for path, message in items[:PLAN_LIST_LIMIT]:
+                print(f"    {path} ({message})")
+            if len(items) > PLAN_LIST_LIMIT:
+                print(f"    ... 还有 {len(items) - PLAN_LIST_LIMIT} 个")
+    
+    print(f"\n📊 总计: {len(plan.jobs)} 个任务，{format_file_size(plan.total_bytes)}")
+    print(f"⏱️  预计耗时: {format_duration(plan.estimated_seconds)}（{plan.max_workers} 个并发）")
+
+def print_quarantine(entries):
+    """打印失败记录"""
+    import time
+    if not entries:
+        print("没有失败记录")
+        return
+    for entry in entries:
+        label = "🚫 已隔离" if entry['quarantined'] else "⚠️  未隔离"
+        last_failed = time.strftime('%Y-%m-%d %H:%M', time.localtime(entry['last_failed']))
+        error = entry['error'].splitlines()[0] if entry['error'] else ""
+        print(f"{label}: {entry['path']} -> {entry['format']} "
+              f"(失败 {entry['failures']} 次，最近 {last_failed}，{entry['toolchain']})")
+        print(f"   {error}")
+    quarantined = sum(1 for entry in entries if entry['quarantined'])
+    print(f"\n共 {len(entries)} 条失败记录，其中 {quarantined} 个输入已隔离")
+
+
+def expand_inputs(paths):
+    """展开输入中的目录（递归扫描其中支持的文件），跳过不存在或不支持的文件"""
+    for file_path in paths:
+        if os.path.isdir(file_path):
+            yield from iter_files_from_directory(file_path, recursive=True)
+        elif os.path.exists(file_path) and (is_supported_file(file_path) or is_archive_file(file_path)):
+            yield file_path
+        else:
+            print(f"⚠️  跳过文件: {file_path} (不存在或不支持的格式)")
 
 def main():
     """命令行主函数"""
@@ -21,16 +84,102 @@ def main():
   python cli_converter.py input.md -f .html
   python cli_converter.py input.docx -f .html -o /path/to/output
   python cli_converter.py *.md -f .epub
+  python cli_converter.py manual.md -f .html --incremental
+  python cli_converter.py docs/*.md -f .html -o site --html-assets shared
+  python cli_converter.py reports/*.docx -f .md -o notes --extract-media
+  python cli_converter.py docs/*.md -f .html --archive site.tar.gz
+  python cli_converter.py bundle.tar.gz -f .html -o site
+  python cli_converter.py docs/*.md -f .html -o site -j 8 --plan
+  python cli_converter.py docs/*.md -f .html -o site --transform rewrite-links --transform number-headings
+  find docs -name '*.md' -print0 | python cli_converter.py --files-from - -0 -f .html -o site -j 8
+  python cli_converter.py docs/*.docx -f .html -o site --quarantine --timeout 300
+  python cli_converter.py --list-quarantine
         """
     )
     
-    parser.add_argument('files', nargs='+', help='要转换的文件路径')
-    parser.add_argument('-f', '--format', required=True, 
-                       choices=['.md', '.docx', '.html', '.epub'],
+    parser.add_argument('files', nargs='*',
+                        help='要转换的文件路径（可以是 zip/tar 归档，目录会递归扫描其中支持的文件）')
+    parser.add_argument('--files-from', metavar='FILE',
+                       help='从文件（- 表示标准输入）逐个读取要转换的路径，每行一个；'
+                            '读到第一个路径即开始转换，内存占用与文件数无关')
+    parser.add_argument('-0', '--null', action='store_true',
+                       help='--files-from 中的路径以 NUL 分隔（配合 find -print0）')
+    parser.add_argument('-f', '--format',
+                       choices=list(get_output_formats()),
                        help='输出格式')
     parser.add_argument('-o', '--output', help='输出目录（默认为源文件目录）')
     parser.add_argument('--keep-name', action='store_true', 
                        help='保留原文件名（默认添加格式后缀）')
+    parser.add_argument('--incremental', action=argparse.BooleanOptionalAction,
+                       help='增量渲染：仅重新渲染变化的章节（.md 转 .html，默认按配置）')
+    parser.add_argument('--html-assets', choices=['inline', 'shared'],
+                       help='HTML资源处理方式：inline 内嵌到每个文件，'
+                            'shared 提取到按内容去重的共享 assets 目录（默认按配置，即 inline）')
+    parser.add_argument('--asset-dir', help='共享资源目录（默认为输出目录下的 assets）')
+    parser.add_argument('--extract-media', action=argparse.BooleanOptionalAction,
+                       help='.docx/.epub 转 .md 时提取媒体文件，按内容去重保存到共享 media 目录'
+                            '（默认按配置）')
+    parser.add_argument('--media-dir', help='共享媒体目录（默认为输出目录下的 media）')
+    parser.add_argument('--archive', metavar='PATH',
+                       help='将输出流式写入归档（.zip/.tar/.tar.gz/.tar.zst），'
+                            '此时 -o 为归档内的目录前缀')
+    parser.add_argument('--layout', choices=['flat', 'mirror', 'hash'],
+                       help='指定 -o 或 --archive 时输出的目录布局：flat 全部放在输出目录中，'
+                            'mirror 按源目录结构存放，hash 按源文件路径的哈希分到两级子目录（如 3f/a2/）'
+                            '（默认使用配置 DOCUFLOW_OUTPUT_LAYOUT，即 flat）；'
+                            '重名的输出在文件名后加上源路径哈希，不会互相覆盖')
+    parser.add_argument('--source-root', metavar='DIR',
+                       help='mirror 布局的源目录（默认为所有输入的共同上级目录，使用 --files-from 时为当前目录）')
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                       help='同时转换的文件数（默认 1）')
+    parser.add_argument('--skip-up-to-date', action='store_true',
+                       help='输出已存在且不比源文件旧时跳过该文件')
+    parser.add_argument('--plan', action='store_true',
+                       help='只扫描输入并显示转换计划与预计耗时，不执行转换')
+    parser.add_argument('--priority', choices=['interactive', 'normal', 'bulk'],
+                       help='优先级通道：interactive 交互式少量文件，normal 普通，bulk 大批量后台任务'
+                            '（默认使用配置 DOCUFLOW_PRIORITY，即 normal）')
+    parser.add_argument('--dedup', choices=['auto', 'hardlink', 'copy', 'off'], default='auto',
+                       help='内容相同的输入只转换一次，其余输出由 reflink（auto，默认，不支持时复制）、'
+                            '硬链接（hardlink）或复制（copy）生成；off 关闭。归档输出时不检测')
+    parser.add_argument('--stage', action='store_true',
+                       help='先把源文件与其引用的资源复制到本地暂存区（默认 /dev/shm）再转换，'
+                            '输出一次性写回；适用于源文件或输出目录位于 NFS/SMB 的情况。'
+                            '启用后小文件不再分批转换，增量渲染的文档不暂存')
+    parser.add_argument('--stage-dir', help='本地暂存目录（默认 /dev/shm 或系统临时目录）')
+    parser.add_argument('--cpu-affinity', choices=['off', 'cores', 'numa'],
+                       help='把每个转换线程（及其pandoc进程）绑定到一组CPU：cores 平均分配，'
+                            'numa 按NUMA节点分组（默认使用配置 DOCUFLOW_CPU_AFFINITY，即 off；仅 Linux）')
+    parser.add_argument('--precompress', metavar='ENCODINGS',
+                       help='为 .html/.md 输出同时生成预压缩文件（供 nginx gzip_static 使用），'
+                            '逗号分隔：gzip、br、zstd，如 gzip,br；输出未变化时跳过，归档输出时忽略'
+                            '（默认使用配置 DOCUFLOW_PRECOMPRESS，即不生成）')
+    parser.add_argument('--no-microbatch', action='store_true',
+                       help='逐个转换每个文件（默认把大量小文件合并到一个pandoc进程中批量转换，输出相同）')
+    parser.add_argument('--transform', action='append', default=[], metavar='NAME',
+                       choices=list(BUILTIN_FILTERS),
+                       help='在进程内对文档AST运行内置过滤器，可重复指定，按顺序执行：'
+                            + '、'.join(BUILTIN_FILTERS))
+    parser.add_argument('--optimize-images', action='store_true',
+                       help='输出 .html/.epub 时缩小并重新编码其中的 JPEG/PNG 图片、去掉元数据，'
+                            '结果按图片哈希缓存（需要安装 Pillow）')
+    parser.add_argument('--image-max-size', type=int, metavar='PX',
+                       help='图片长边的上限（像素，0表示不缩小；'
+                            '默认使用配置 DOCUFLOW_IMAGE_MAX_DIMENSION，即 1600）')
+    parser.add_argument('--image-quality', type=int, metavar='Q',
+                       help='JPEG/WebP 编码质量 1-95（默认使用配置 DOCUFLOW_IMAGE_QUALITY，即 85）')
+    parser.add_argument('--webp', action='store_true',
+                       help='输出 .html 时把图片转为 WebP（需同时指定 --optimize-images）')
+    parser.add_argument('--timeout', type=int, metavar='SECONDS',
+                       help='单次pandoc调用的超时秒数，0表示不限制（默认按配置）')
+    parser.add_argument('--retries', type=int, metavar='N',
+                       help='暂时性失败（资源不足、被信号终止等）的自动重试次数（默认按配置）')
+    parser.add_argument('--quarantine', action='store_true',
+                       help='记录失败，跳过之前反复失败且内容与转换环境都未变化的文件')
+    parser.add_argument('--list-quarantine', action='store_true',
+                       help='列出失败记录与已隔离的文件')
+    parser.add_argument('--clear-quarantine', action='store_true',
+                       help='清除失败记录（指定文件时只清除这些文件的记录）')
     parser.add_argument('--list-formats', action='store_true',
                        help='显示支持的格式')
     
@@ -42,55 +191,306 @@ def main():
         print("支持的输入格式:")
         for ext, desc in formats.items():
             print(f"  {ext} - {desc}")
-        print("\n支持的输出格式: .md, .docx, .html, .epub")
-        return
+        print(f"\n支持的输出格式: {', '.join(get_output_formats())}")
+        try:
+            capabilities = DocumentConverter().capabilities
+        except Exception as e:
+            print(f"\n⚠️  无法检测pandoc: {e}")
+            return 1
+        print(f"\n当前可用的转换（{capabilities.pandoc_version}）:")
+        for ext in formats:
+            print(f"  {ext} -> {', '.join(capabilities.targets_for(ext)) or '无'}")
+        return 0
     
-    # 检查文件
-    valid_files = []
-    for file_path in args.files:
-        if os.path.exists(file_path) and is_supported_file(file_path):
-            valid_files.append(file_path)
-        else:
-            print(f"⚠️  跳过文件: {file_path} (不存在或不支持的格式)")
+    # 查看或清除失败记录
+    if args.list_quarantine or args.clear_quarantine:
+        from converter.quarantine import get_quarantine
+        quarantine = get_quarantine()
+        if args.clear_quarantine:
+            paths = list(expand_inputs(args.files)) if args.files else None
+            removed = quarantine.clear(paths)
+            try:
+                quarantine.save()
+            except OSError as e:
+                print(f"❌ 无法保存失败记录: {e}")
+                return 1
+            print(f"🧹 已清除 {removed} 条失败记录")
+        if args.list_quarantine:
+            print_quarantine(quarantine.entries())
+        return 0
     
-    if not valid_files:
-        print("❌ 没有找到有效的文件")
+    if not (args.files or args.files_from) or not args.format:
+        parser.error("需要指定要转换的文件（或 --files-from）和输出格式 (-f)")
+    if args.null and not args.files_from:
+        parser.error("-0 需要与 --files-from 一起使用")
+    if args.files_from and args.plan:
+        parser.error("--plan 需要预先扫描全部输入，不能与 --files-from 一起使用")
+    if args.webp and not args.optimize_images:
+        parser.error("--webp 需要与 --optimize-images 一起使用")
+    if args.image_quality is not None and not 1 <= args.image_quality <= 95:
+        parser.error("--image-quality 必须在 1-95 之间")
+    if args.image_max_size is not None and args.image_max_size < 0:
+        parser.error("--image-max-size 不能为负数")
+    if args.files_from and args.files_from != '-' and not os.path.isfile(args.files_from):
+        print(f"❌ 路径列表文件不存在: {args.files_from}")
         return 1
     
+    # 检查文件；--files-from 的路径在转换过程中逐个读取与检查
+    valid_files = None
+    if not args.files_from:
+        valid_files = list(expand_inputs(args.files))
+        if not valid_files:
+            print("❌ 没有找到有效的文件")
+            return 1
+    
     # 创建转换器
     try:
-        converter = DocumentConverter()
+        staging = None
+        if args.stage or args.stage_dir:
+            from config import config
+            from converter.staging import StagingArea
+            staging = StagingArea(args.stage_dir or config.conversion.staging_dir,
+                                  config.conversion.staging_max_size)
+        precompress = None
+        if args.precompress is not None:
+            from converter.precompress import Precompressor
+            precompress = Precompressor(args.precompress) if args.precompress else False
+        filters = [create_builtin_filter(name, args.format) for name in args.transform]
+        image_optimizer = None
+        if args.optimize_images and args.format.lower() in ('.html', '.epub'):
+            from config import config
+            from converter.images import ImageOptimizer
+            image_optimizer = ImageOptimizer(
+                max_dimension=config.conversion.image_max_dimension
+                if args.image_max_size is None else args.image_max_size,
+                quality=config.conversion.image_quality
+                if args.image_quality is None else args.image_quality,
+                webp=args.webp or config.conversion.image_webp
+            )
+            filters.append(image_optimizer)
+        output_layout = None
+        if args.layout or args.source_root:
+            from config import config
+            from converter.layout import OutputLayout
+            layout = args.layout or config.conversion.output_layout
+            source_root = args.source_root or config.conversion.output_source_root
+            if layout == 'mirror' and source_root is None and valid_files:
+                source_dirs = [os.path.dirname(os.path.abspath(path)) for path in valid_files
+                               if not is_archive_file(path)]
+                source_root = os.path.commonpath(source_dirs) if source_dirs else None
+            output_layout = OutputLayout(layout, source_root)
+        converter = DocumentConverter(
+            filters=filters,
+            staging=staging,
+            precompress=precompress,
+            output_layout=output_layout,
+            timeout=args.timeout
+        )
+        from config import config
+        if args.retries is not None:
+            config.conversion.retry_attempts = max(0, args.retries)
+        if args.quarantine or config.conversion.quarantine:
+            from converter.quarantine import get_quarantine
+            converter.quarantine = get_quarantine()
     except Exception as e:
         print(f"❌ 转换器初始化失败: {e}")
         return 1
     
-    # 执行转换
-    print(f"🚀 开始转换 {len(valid_files)} 个文件...")
-    success_count = 0
+    # 流式输入在转换过程中逐个检查，只统计已是最新而跳过的文件数
+    streamed = {'first': None, 'up_to_date': 0}
     
-    for file_path in valid_files:
-        try:
-            print(f"📄 转换: {os.path.basename(file_path)}")
-            output_file = converter.convert_file(
-                file_path, 
-                args.format, 
-                args.output, 
-                args.keep_name
-            )
-            
-            if output_file:
-                print(f"✅ 成功: {output_file}")
-                success_count += 1
+    def stream_inputs():
+        """逐个读取 --files-from 的路径（位置参数中的文件在前），跳过注定失败或已是最新的文件"""
+        paths = itertools.chain(args.files, iter_path_list(args.files_from, args.null))
+        for file_path in expand_inputs(paths):
+            if streamed['first'] is None:
+                streamed['first'] = file_path
+            if is_archive_file(file_path):
+                yield file_path
+                continue
+            skip = check_file(converter, file_path, args.format, args.output, args.keep_name,
+                              skip_up_to_date=args.skip_up_to_date and not args.archive)
+            if skip is None:
+                yield file_path
+            elif skip[0] == SKIP_UP_TO_DATE:
+                streamed['up_to_date'] += 1
             else:
-                print(f"❌ 失败: {file_path}")
-                
+                print(f"⚠️  跳过文件: {file_path} ({SKIP_LABELS[skip[0]]}: {skip[1]})")
+    
+    if args.files_from:
+        stats = get_throughput_stats()
+    else:
+        # 扫描输入：按能力索引校验格式，检查大小与是否已是最新，注定失败的文件不进入转换
+        try:
+            stats = get_throughput_stats()
+            plan = plan_conversion(converter, valid_files, args.format, args.output, args.keep_name,
+                                   max_workers=args.jobs, stats=stats,
+                                   skip_up_to_date=args.skip_up_to_date and not args.archive)
+        except Exception as e:
+            print(f"❌ {e}")
+            return 1
+    
+        if args.plan:
+            print_plan(plan, stats)
+            return 0
+    
+        # 已是最新的文件只报告数量；归档成员的问题在转换归档时报告
+        up_to_date = plan.skipped_by_reason().get(SKIP_UP_TO_DATE, [])
+        for path, reason, message in plan.skipped:
+            if reason != SKIP_UP_TO_DATE and path in valid_files:
+                print(f"⚠️  跳过文件: {path} ({SKIP_LABELS[reason]}: {message})")
+        if up_to_date:
+            print(f"⏭️  输出已是最新，跳过 {len(up_to_date)} 个文件")
+        valid_files = plan.files
+    
+        if not valid_files:
+            print("❌ 没有可以转换的文件")
+            return 1
+    
+    # 输出目标
+    sink = None
+    if args.archive:
+        try:
+            sink = ArchiveSink(args.archive)
         except Exception as e:
-            print(f"❌ 错误: {file_path} - {e}")
+            print(f"❌ 无法创建归档: {e}")
+            return 1
+    
+    # 执行转换
+    if args.files_from:
+        source = "标准输入" if args.files_from == '-' else args.files_from
+        print(f"🚀 开始转换（从{source}逐个读取路径，{args.jobs} 个并发）...")
+    else:
+        print(f"🚀 开始转换 {len(valid_files)} 个文件（{args.jobs} 个并发，"
+              f"预计 {format_duration(plan.estimated_seconds)}）...")
+    # 未在命令行指定的选项按配置决定
+    options = converter.conversion_options(dict(
+        incremental=args.incremental,
+        html_assets=args.html_assets,
+        asset_dir=args.asset_dir,
+        extract_media=args.extract_media,
+        media_dir=args.media_dir
+    ))
+    
+    counts = {'success': 0, 'total': 0, 'quarantined': 0}
+    
+    def report(result):
+        """打印单个文件的结果"""
+        name = f"{result.file_path}:{result.member}" if result.member else result.file_path
+        if result.status == QUARANTINED:
+            counts['quarantined'] += 1
+            print(f"🚫 已隔离: {name} - {result.error}")
+            return
+        if result.status != CANCELLED:
+            counts['total'] += 1
+        if result.ok:
+            counts['success'] += 1
+            suffix = " (内容未变化，跳过写入)" if result.status == UNCHANGED else ""
+            if result.duplicate_of:
+                suffix += f" (与 {result.duplicate_of} 内容相同，未重新转换)"
+            print(f"✅ 成功: {name} -> {result.output_path}{suffix}")
+            section_stats = converter.incremental_stats
+            if options['incremental'] and section_stats and args.jobs == 1:
+                print(f"   ♻️  增量渲染: 共 {section_stats['sections']} 节，"
+                      f"重新渲染 {section_stats['rendered']} 节，复用缓存 {section_stats['cached']} 节")
+        elif result.status == FAILED:
+            print(f"❌ 错误: {name} - {result.error}")
+    
+    # 记录本次运行的吞吐量，用于之后的耗时估算
+    converter.throughput_stats = stats
+    scheduler = None
+    if args.cpu_affinity:
+        from config import config
+        from converter.scheduler import ConversionScheduler
+        scheduler = ConversionScheduler(args.jobs, config.conversion.reserved_interactive_workers,
+                                        affinity=args.cpu_affinity)
+    engine = ConversionEngine(converter, max_workers=args.jobs, dedup=args.dedup,
+                              priority=args.priority, microbatch=0 if args.no_microbatch else None,
+                              scheduler=scheduler)
+    try:
+        if args.files_from:
+            # 惰性读取输入，同时在途的任务数有上限，不保留结果列表
+            for result in engine.iter_run(stream_inputs(), args.format, args.output,
+                                          args.keep_name, sink=sink, **options):
+                report(result)
+        else:
+            engine.run(valid_files, args.format, args.output, args.keep_name,
+                       sink=sink, on_result=report, **options)
+    except Exception as e:
+        print(f"❌ {e}")
+    success_count = counts['success']
+    total_count = counts['total']
+    
+    try:
+        stats.save()
+    except OSError as e:
+        print(f"⚠️  无法保存吞吐量统计: {e}")
+    if converter.quarantine is not None:
+        try:
+            converter.quarantine.save()
+        except OSError as e:
+            print(f"⚠️  无法保存失败记录: {e}")
+    
+    if sink:
+        sink.close()
+    
+    print(f"\n📊 转换完成: {success_count}/{total_count} 成功")
+    if streamed['up_to_date']:
+        print(f"⏭️  输出已是最新，跳过 {streamed['up_to_date']} 个文件")
+    print(f"💾 写入 {converter.write_stats['written']} 个，"
+          f"未变化 {converter.write_stats['unchanged']} 个")
+    if counts['quarantined']:
+        print(f"🚫 已隔离，跳过 {counts['quarantined']} 个文件"
+              f"（--list-quarantine 查看，--clear-quarantine 重新尝试）")
+    batch_stats = converter.batch_stats
+    if batch_stats['fallbacks']:
+        print(f"🧺 批量转换: {batch_stats['batches']} 批，{batch_stats['batched']} 个文件批量完成，"
+              f"{batch_stats['fallbacks']} 个改为逐个转换"
+              f"（其中 {batch_stats['failed_batches']} 批整批失败，原因见日志）")
+    if converter.retry_stats['retries']:
+        print(f"🔄 自动重试: {converter.retry_stats['retries']} 次，"
+              f"{converter.retry_stats['recovered']} 个文件重试后成功")
+    
+    dedup_stats = converter.dedup_stats
+    if dedup_stats['duplicates']:
+        print(f"🔁 重复输入: {dedup_stats['duplicates']} 个未重新转换 "
+              f"(跳过 {format_file_size(dedup_stats['bytes_skipped'])} 输入，"
+              f"节省约 {dedup_stats['seconds_saved']:.1f} 秒转换时间，"
+              f"共享 {format_file_size(dedup_stats['bytes_shared'])} 输出)")
+    
+    if options['html_assets'] == 'shared' or options['extract_media']:
+        stats = converter.asset_stats
+        print(f"🗂️  共享资源: 新增 {stats['stored']} 个 ({format_file_size(stats['bytes_written'])})，"
+              f"去重 {stats['deduplicated']} 个 (节省 {format_file_size(stats['bytes_saved'])})")
+    
+    if converter.output_layout.renamed:
+        print(f"🔀 重名输出: {converter.output_layout.renamed} 个输出在文件名后加上了源路径哈希")
+    
+    if converter.staging and converter.staging.stats['staged']:
+        staging_stats = converter.staging.stats
+        print(f"🚚 本地暂存: {staging_stats['staged']} 个文件，"
+              f"读入 {format_file_size(staging_stats['bytes_in'])}，"
+              f"写回 {format_file_size(staging_stats['bytes_out'])}")
+    
+    if image_optimizer and image_optimizer.stats['images']:
+        image_stats = image_optimizer.stats
+        print(f"🖼️  图片优化: {image_stats['images']} 张图片 (缓存命中 {image_stats['cached']} 张)，"
+              f"{format_file_size(image_stats['bytes_in'])} -> "
+              f"{format_file_size(image_stats['bytes_out'])}")
     
-    print(f"\n📊 转换完成: {success_count}/{len(valid_files)} 成功")
+    precompress_stats = None if sink else converter.precompress_stats
+    if precompress_stats and (precompress_stats['files'] or precompress_stats['skipped']):
+        saved = precompress_stats['bytes_in'] - precompress_stats['bytes_out']
+        print(f"🗜️  预压缩: {precompress_stats['files']} 个输出，"
+              f"未变化跳过 {precompress_stats['skipped']} 个，"
+              f"压缩后共 {format_file_size(precompress_stats['bytes_out'])} "
+              f"(节省 {format_file_size(saved)})")
     
-    if success_count > 0:
-        output_dir = args.output or os.path.dirname(valid_files[0])
+    if sink:
+        print(f"📦 输出归档: {sink.archive_path} ({sink.entry_count} 个条目)")
+    elif success_count > 0:
+        first_input = valid_files[0] if valid_files else streamed['first']
+        output_dir = args.output or os.path.dirname(os.path.abspath(first_input))
         print(f"📁 输出目录: {output_dir}")
     
     return 0 if success_count > 0 else 1
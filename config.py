@@ -2,13 +2,16 @@
 """
 DocuFlow 配置管理模块
 集中管理所有配置项，支持环境变量和验证
+
+导入本模块不会创建配置或日志文件：全局配置在首次访问 config 时创建，
+日志由入口程序调用 config.setup_logging() 配置
 """
 
 import os
-import logging
 from pathlib import Path
 from dataclasses import dataclass, field
 from typing import Dict, List, Set
+from utils.file_utils import SUPPORTED_FORMATS, OUTPUT_FORMATS, CONVERSION_MATRIX
 
 @dataclass
 class AppInfo:
@@ -26,6 +29,8 @@ class WindowSettings:
     height: int = int(os.getenv('DOCUFLOW_WINDOW_HEIGHT', 700))
     resizable: bool = os.getenv('DOCUFLOW_RESIZABLE', 'true').lower() == 'true'
     center_on_screen: bool = os.getenv('DOCUFLOW_CENTER', 'true').lower() == 'true'
+    refresh_fps: int = int(os.getenv('DOCUFLOW_UI_REFRESH_FPS', 30))  # 进度与日志的刷新帧率
+    log_capacity: int = int(os.getenv('DOCUFLOW_LOG_CAPACITY', 10000))  # 结果日志最多保留条数
 
 @dataclass
 class FileFormat:
@@ -36,35 +41,21 @@ class FileFormat:
 @dataclass
 class FileSettings:
     """文件相关设置"""
+    # 支持的格式与转换矩阵均由 utils.file_utils 中的唯一转换表生成，
+    # 当前pandoc实际支持的转换见 converter.capabilities
     # 支持的输入格式
     supported_input_formats: Dict[str, FileFormat] = field(default_factory=lambda: {
-        '.pdf': FileFormat('.pdf', 'PDF文档'),
-        '.docx': FileFormat('.docx', 'Word文档'),
-        '.xlsx': FileFormat('.xlsx', 'Excel表格'),
-        '.pptx': FileFormat('.pptx', 'PowerPoint演示文稿'),
-        '.md': FileFormat('.md', 'Markdown文档'),
-        '.html': FileFormat('.html', 'HTML文档'),
-        '.txt': FileFormat('.txt', '纯文本文档'),
+        ext: FileFormat(ext, desc) for ext, desc in SUPPORTED_FORMATS.items()
     })
     
     # 支持的输出格式
     supported_output_formats: Dict[str, FileFormat] = field(default_factory=lambda: {
-        '.md': FileFormat('.md', 'Markdown (.md)'),
-        '.html': FileFormat('.html', 'HTML (.html)'),
-        '.txt': FileFormat('.txt', '纯文本 (.txt)'),
-        '.pdf': FileFormat('.pdf', 'PDF文档 (.pdf)'),
-        '.docx': FileFormat('.docx', 'Word文档 (.docx)'),
+        ext: FileFormat(ext, f"{desc} ({ext})") for ext, desc in OUTPUT_FORMATS.items()
     })
 
     # 转换矩阵
     conversion_matrix: Dict[str, List[str]] = field(default_factory=lambda: {
-        '.pdf': ['.md', '.html', '.txt', '.docx'],
-        '.docx': ['.md', '.html', '.txt', '.pdf'],
-        '.xlsx': ['.html', '.docx'],
-        '.pptx': ['.pdf', '.docx'],
-        '.md': ['.html', '.pdf', '.docx'],
-        '.html': ['.md', '.txt', '.pdf', '.docx'],
-        '.txt': ['.md', '.html', '.docx'],
+        source: list(targets) for source, targets in CONVERSION_MATRIX.items()
     })
 
     @property
@@ -85,6 +76,52 @@ class ConversionSettings:
     keep_original_name: bool = os.getenv('DOCUFLOW_KEEP_ORIGINAL_NAME', 'true').lower() == 'true'
     command_timeout: int = int(os.getenv('DOCUFLOW_COMMAND_TIMEOUT', 30))  # 30秒超时
     pandoc_extra_args: List[str] = field(default_factory=list)
+    incremental: bool = os.getenv('DOCUFLOW_INCREMENTAL', 'false').lower() == 'true'  # Markdown分节增量渲染
+    cache_dir: Path = Path(os.getenv('DOCUFLOW_CACHE_DIR', Path.home() / '.cache' / 'docuflow'))
+    html_assets: str = os.getenv('DOCUFLOW_HTML_ASSETS', 'inline')  # inline: 内嵌资源; shared: 共享资源目录
+    extract_media: bool = os.getenv('DOCUFLOW_EXTRACT_MEDIA', 'false').lower() == 'true'  # docx/epub转md时去重提取媒体
+    # 历史吞吐量统计，用于估算耗时；None表示使用缓存目录下的 throughput.json
+    stats_file: Path = Path(os.environ['DOCUFLOW_STATS_FILE']) if os.getenv('DOCUFLOW_STATS_FILE') else None
+    # 转换优先级：interactive（交互式）、normal、bulk（大批量）
+    priority: str = os.getenv('DOCUFLOW_PRIORITY', 'normal')
+    reserved_interactive_workers: int = int(os.getenv('DOCUFLOW_RESERVED_INTERACTIVE_WORKERS', 1))  # 只处理交互式任务的线程数
+    # 批次内内容相同的输入只转换一次：auto(reflink，不支持时复制)、hardlink、copy、off
+    dedup: str = os.getenv('DOCUFLOW_DEDUP', 'auto')
+    # 不超过此大小的文件分批合并到一个pandoc进程中转换（字节），0表示逐个转换
+    microbatch_max_size: int = int(os.getenv('DOCUFLOW_MICROBATCH_MAX_SIZE', 16 * 1024))
+    # 源文件与输出目录位于网络文件系统时，先把源文件与资源复制到本地暂存区再转换
+    staging: bool = os.getenv('DOCUFLOW_STAGING', 'false').lower() == 'true'
+    staging_dir: Path = Path(os.environ['DOCUFLOW_STAGING_DIR']) if os.getenv('DOCUFLOW_STAGING_DIR') else None  # None表示 /dev/shm 或系统临时目录
+    staging_max_size: int = int(os.getenv('DOCUFLOW_STAGING_MAX_SIZE', 512 * 1024 * 1024))  # 暂存区总大小上限
+    # 转换线程的CPU亲和性：off、cores(平均分配CPU)、numa(按NUMA节点分组)
+    cpu_affinity: str = os.getenv('DOCUFLOW_CPU_AFFINITY', 'off')
+    # 为 .html/.md 输出同时生成的预压缩文件，逗号分隔：gzip、br、zstd；为空表示不生成
+    precompress: str = os.getenv('DOCUFLOW_PRECOMPRESS', '')
+    # 图片优化（--optimize-images）：长边上限（像素，0表示不缩小）、JPEG/WebP质量、HTML输出是否转为WebP
+    image_max_dimension: int = int(os.getenv('DOCUFLOW_IMAGE_MAX_DIMENSION', 1600))
+    image_quality: int = int(os.getenv('DOCUFLOW_IMAGE_QUALITY', 85))
+    image_webp: bool = os.getenv('DOCUFLOW_IMAGE_WEBP', 'false').lower() == 'true'
+    # 指定输出目录时的目录布局：flat(全部放在输出目录中)、mirror(重建源目录结构)、hash(按路径哈希分到子目录)
+    output_layout: str = os.getenv('DOCUFLOW_OUTPUT_LAYOUT', 'flat')
+    output_source_root: Path = Path(os.environ['DOCUFLOW_OUTPUT_SOURCE_ROOT']) if os.getenv('DOCUFLOW_OUTPUT_SOURCE_ROOT') else None  # mirror 布局的源目录，None表示当前目录
+    # 单次pandoc调用的超时（秒），0表示不限制
+    pandoc_timeout: int = int(os.getenv('DOCUFLOW_PANDOC_TIMEOUT', 0))
+    # 暂时性失败（资源不足、被信号终止等）的自动重试次数与首次重试前的等待（秒，之后每次加倍）
+    retry_attempts: int = int(os.getenv('DOCUFLOW_RETRY_ATTEMPTS', 2))
+    retry_backoff: float = float(os.getenv('DOCUFLOW_RETRY_BACKOFF', 1.0))
+    # 跳过反复失败的输入：失败记录文件（None表示缓存目录下的 quarantine.json）与隔离所需的失败次数
+    quarantine: bool = os.getenv('DOCUFLOW_QUARANTINE', 'false').lower() == 'true'
+    quarantine_file: Path = Path(os.environ['DOCUFLOW_QUARANTINE_FILE']) if os.getenv('DOCUFLOW_QUARANTINE_FILE') else None
+    quarantine_after: int = int(os.getenv('DOCUFLOW_QUARANTINE_AFTER', 2))
+
+def _parse_module_levels(spec):
+    """解析 "模块=级别,..." 形式的日志级别设置"""
+    levels = {}
+    for item in spec.split(','):
+        name, _, level = item.partition('=')
+        if name.strip() and level.strip():
+            levels[name.strip()] = level.strip().upper()
+    return levels
 
 @dataclass
 class LoggingSettings:
@@ -92,6 +129,12 @@ class LoggingSettings:
     level: str = os.getenv('DOCUFLOW_LOG_LEVEL', 'INFO').upper()
     file: Path = Path(os.getenv('DOCUFLOW_LOG_FILE', 'docuflow.log'))
     format: str = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    json: bool = os.getenv('DOCUFLOW_LOG_JSON', 'false').lower() == 'true'  # 日志文件使用 JSON Lines 格式
+    max_bytes: int = int(os.getenv('DOCUFLOW_LOG_MAX_BYTES', 10 * 1024 * 1024))  # 超过后轮转，0表示不轮转
+    backup_count: int = int(os.getenv('DOCUFLOW_LOG_BACKUP_COUNT', 5))
+    # 按模块设置的日志级别，如 DOCUFLOW_LOG_LEVELS="converter=DEBUG,ui=WARNING"
+    module_levels: Dict[str, str] = field(
+        default_factory=lambda: _parse_module_levels(os.getenv('DOCUFLOW_LOG_LEVELS', '')))
 
 @dataclass
 class Config:
@@ -105,7 +148,7 @@ class Config:
     def __post_init__(self):
         """初始化后处理"""
         self._validate()
-        self.setup_logging()
+        self._logging_configured = False
     
     def _validate(self):
         """验证配置"""
@@ -114,6 +157,10 @@ class Config:
             self.window.width = 400
         if self.window.height < 300:
             self.window.height = 300
+        if self.window.refresh_fps <= 0:
+            self.window.refresh_fps = 30
+        if self.window.log_capacity <= 0:
+            self.window.log_capacity = 10000
             
         # 验证文件大小限制
         if self.conversion.max_file_size <= 0:
@@ -122,17 +169,80 @@ class Config:
         # 验证工作线程数
         if self.conversion.max_workers <= 0:
             self.conversion.max_workers = 1
+            
+        # 验证优先级设置
+        if self.conversion.priority not in ('interactive', 'normal', 'bulk'):
+            self.conversion.priority = 'normal'
+        if self.conversion.reserved_interactive_workers < 0:
+            self.conversion.reserved_interactive_workers = 0
+            
+        # 验证HTML资源处理方式
+        if self.conversion.html_assets not in ('inline', 'shared'):
+            self.conversion.html_assets = 'inline'
+            
+        # 验证重复输入处理方式
+        if self.conversion.dedup not in ('auto', 'hardlink', 'copy', 'off'):
+            self.conversion.dedup = 'auto'
+        if self.conversion.microbatch_max_size < 0:
+            self.conversion.microbatch_max_size = 0
+            
+        # 验证暂存区大小
+        if self.conversion.staging_max_size <= 0:
+            self.conversion.staging_max_size = 512 * 1024 * 1024
+            
+        # 验证CPU亲和性设置
+        if self.conversion.cpu_affinity not in ('off', 'cores', 'numa'):
+            self.conversion.cpu_affinity = 'off'
+            
+        # 验证预压缩设置（未知的压缩方式忽略）
+        encodings = [item.strip().lower() for item in self.conversion.precompress.split(',')]
+        self.conversion.precompress = ','.join(
+            encoding for encoding in encodings if encoding in ('gzip', 'br', 'zstd')
+        )
+            
+        # 验证图片优化设置
+        if self.conversion.image_max_dimension < 0:
+            self.conversion.image_max_dimension = 0
+        if not 1 <= self.conversion.image_quality <= 95:
+            self.conversion.image_quality = 85
+            
+        # 验证输出目录布局
+        if self.conversion.output_layout not in ('flat', 'mirror', 'hash'):
+            self.conversion.output_layout = 'flat'
+            
+        # 验证超时、重试与隔离设置
+        if self.conversion.pandoc_timeout < 0:
+            self.conversion.pandoc_timeout = 0
+        if self.conversion.retry_attempts < 0:
+            self.conversion.retry_attempts = 0
+        if self.conversion.retry_backoff < 0:
+            self.conversion.retry_backoff = 0.0
+        if self.conversion.quarantine_after < 1:
+            self.conversion.quarantine_after = 1
+            
+        # 验证日志轮转设置
+        if self.logging.max_bytes < 0:
+            self.logging.max_bytes = 0
+        if self.logging.backup_count < 1:
+            self.logging.backup_count = 1
+            
+        # 吞吐量统计文件默认位于缓存目录
+        if self.conversion.stats_file is None:
+            self.conversion.stats_file = self.conversion.cache_dir / 'throughput.json'
+        if self.conversion.quarantine_file is None:
+            self.conversion.quarantine_file = self.conversion.cache_dir / 'quarantine.json'
     
     def setup_logging(self):
-        """设置日志"""
-        logging.basicConfig(
-            level=getattr(logging, self.logging.level),
-            format=self.logging.format,
-            handlers=[
-                logging.FileHandler(self.logging.file, encoding='utf-8'),
-                logging.StreamHandler()
-            ]
-        )
+        """设置日志（重复调用只生效一次，日志文件在写入第一条日志时才创建）
+        
+        日志调用只放入内存队列，由后台线程写入文件与终端（见 utils.log_utils）。
+        """
+        if self._logging_configured:
+            return
+        self._logging_configured = True
+        
+        from utils.log_utils import setup_queue_logging
+        self._log_listener = setup_queue_logging(self.logging)
     
     def get_file_dialog_filter(self, format_type: str = 'input') -> str:
         """获取文件对话框过滤器"""
@@ -157,11 +267,23 @@ class Config:
         """获取命令超时时间"""
         return self.conversion.command_timeout
 
-# 全局配置实例
-config = Config()
+# 全局配置实例（首次访问时创建）
+_config = None
 
-# 支持的转换类型
-SUPPORTED_CONVERSIONS = config.files.conversion_matrix
+def get_config() -> Config:
+    """获取全局配置实例"""
+    global _config
+    if _config is None:
+        _config = Config()
+    return _config
 
-# 命令超时时间
-COMMAND_TIMEOUT = config.conversion.command_timeout
\ No newline at end of file
+def __getattr__(name):
+    """延迟创建模块级配置：config、SUPPORTED_CONVERSIONS（支持的转换类型）、
+    COMMAND_TIMEOUT（命令超时时间）"""
+    if name == 'config':
+        return get_config()
+    if name == 'SUPPORTED_CONVERSIONS':
+        return get_config().files.conversion_matrix
+    if name == 'COMMAND_TIMEOUT':
+        return get_config().conversion.command_timeout
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
\ No newline at end of file
@@ -4,5 +4,9 @@ DocuFlow 转换器模块
 """
 
 from .document_converter import DocumentConverter
+from .output import DirectorySink, ArchiveSink
+from .engine import ConversionEngine, ConversionResult
+from .filters import FilterPipeline
 
-__all__ = ['DocumentConverter']
\ No newline at end of file
+__all__ = ['DocumentConverter', 'DirectorySink', 'ArchiveSink', 'ConversionEngine',
+           'ConversionResult', 'FilterPipeline']
\ No newline at end of file
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+DocuFlow - 转换线程的 CPU 亲和性
+多路服务器上并发的 pandoc 进程会在各 CPU 插槽之间迁移，GHC 运行时的缓存随之失效。
+启用后调度器的每个工作线程（槽位）绑定到一组 CPU（os.sched_setaffinity），
+由它启动的 pandoc 进程继承该 CPU 集合：
+
+- cores: 把当前进程可用的 CPU 平均分给各槽位
+- numa: 按 /sys/devices/system/node 的节点分组，槽位按 CPU 数比例分到各节点，
+  每个槽位的 CPU 都在同一节点内；相邻的槽位轮流落在不同节点上
+
+pandoc 使用多线程运行时（-threaded）构建时，另传入与 CPU 集合大小一致的 +RTS -N；
+单线程运行时（如 Alpine 上的静态构建）不支持 -N，只绑定 CPU。
+仅 Linux 支持，其他平台忽略该设置。
+"""
+
+import os
+import glob
+import threading
+import subprocess
+
+# CPU 亲和性模式
+AFFINITY_MODES = ('off', 'cores', 'numa')
+
+# NUMA 节点信息
+NODE_DIR = '/sys/devices/system/node'
+
+_local = threading.local()
+_rts_threaded = None
+_rts_lock = threading.Lock()
+
+
+def is_supported():
+    """当前平台是否支持设置线程的 CPU 亲和性"""
+    return hasattr(os, 'sched_setaffinity') and hasattr(os, 'sched_getaffinity')
+
+
+def parse_cpulist(text):
+    """解析内核的 CPU 列表格式，如 "0-3,8,10-11"
+
+    Returns:
+        list: CPU 编号列表（升序）
+    """
+    cpus = set()
+    for item in text.strip().split(','):
+        if not item:
+            continue
+        first, _, last = item.partition('-')
+        cpus.update(range(int(first), int(last or first) + 1))
+    return sorted(cpus)
+
+
+def numa_nodes():
+    """读取各 NUMA 节点中当前进程可用的 CPU
+
+    Returns:
+        list: 每个节点的 CPU 编号列表；没有节点信息时只有一组（全部可用 CPU）
+    """
+    available = os.sched_getaffinity(0)
+    nodes = []
+    for path in sorted(glob.glob(os.path.join(NODE_DIR, 'node[0-9]*', 'cpulist')),
+                       key=lambda path: int(os.path.basename(os.path.dirname(path))[4:])):
+        try:
+            with open(path, 'r', encoding='ascii') as f:
+                cpus = [cpu for cpu in parse_cpulist(f.read()) if cpu in available]
+        except (OSError, ValueError):
+            continue
+        if cpus:
+            nodes.append(cpus)
+    return nodes or [sorted(available)]
+
+
+def _split(cpus, count):
+    """把一组 CPU 连续地分成 count 份（大小相差不超过 1）；份数多于 CPU 时轮流共用"""
+    if count <= len(cpus):
+        size, extra = divmod(len(cpus), count)
+        chunks, start = [], 0
+        for index in range(count):
+            end = start + size + (1 if index < extra else 0)
+            chunks.append(frozenset(cpus[start:end]))
+            start = end
+        return chunks
+    return [frozenset([cpus[index % len(cpus)]]) for index in range(count)]
+
+
+def plan_cpu_slots(slots, mode):
+    """为工作线程槽位分配 CPU 集合
+
+    Args:
+        slots: 槽位数
+        mode: 亲和性模式（见 AFFINITY_MODES）
+
+    Returns:
+        list: 每个槽位的 CPU 集合（frozenset）；不绑定时返回空列表
+    """
+    if mode == 'off' or slots <= 0 or not is_supported():
+        return []
+    if mode not in AFFINITY_MODES:
+        raise Exception(f"未知的 CPU 亲和性模式: {mode}（可用: {', '.join(AFFINITY_MODES)}）")
+
+    groups = numa_nodes() if mode == 'numa' else [sorted(os.sched_getaffinity(0))]
+
+    # 按 CPU 数比例把槽位分到各组（最大余数法），每组至少一个槽位时才使用该组
+    total = sum(len(cpus) for cpus in groups)
+    shares = [slots * len(cpus) / total for cpus in groups]
+    counts = [int(share) for share in shares]
+    for index in sorted(range(len(groups)), key=lambda index: shares[index] - counts[index],
+                        reverse=True)[:slots - sum(counts)]:
+        counts[index] += 1
+
+    # 各组的槽位轮流排列，负载较低时线程也分散在不同节点上
+    per_group = [_split(cpus, count) for cpus, count in zip(groups, counts) if count]
+    plan = []
+    for index in range(max(len(chunks) for chunks in per_group)):
+        plan.extend(chunks[index] for chunks in per_group if index < len(chunks))
+    return plan
+
+
+def pin_current_thread(cpus):
+    """把当前线程绑定到一组 CPU，之后由它启动的 pandoc 进程继承该集合"""
+    os.sched_setaffinity(0, cpus)
+    _local.cpus = frozenset(cpus)
+
+
+def _pandoc_rts_threaded():
+    """pandoc 是否使用多线程运行时构建（只检查一次）"""
+    global _rts_threaded
+    with _rts_lock:
+        if _rts_threaded is None:
+            try:
+                result = subprocess.run(["pandoc", "+RTS", "--info", "-RTS"],
+                                        capture_output=True, text=True, timeout=10)
+                # 运行时类型如 rts_thr、rts_thr_debug；单线程为 rts_v
+                _rts_threaded = result.returncode == 0 and '_thr' in result.stdout
+            except (OSError, subprocess.SubprocessError):
+                _rts_threaded = False
+        return _rts_threaded
+
+
+def pandoc_rts_args():
+    """当前线程已绑定 CPU 时，与之匹配的 pandoc 运行时参数
+
+    Returns:
+        list: ["+RTS", "-N<CPU数>", "-RTS"]；未绑定或 pandoc 不支持 -N 时为空列表
+    """
+    cpus = getattr(_local, 'cpus', None)
+    if not cpus or not _pandoc_rts_threaded():
+        return []
+    return ["+RTS", f"-N{len(cpus)}", "-RTS"]
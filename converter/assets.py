@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+DocuFlow - 内容寻址的共享资源库
+将 HTML 输出中的图片、样式表等资源提取到按内容哈希命名的共享目录，
+同一批次中相同的资源只保存一份
+"""
+
+import os
+import re
+import base64
+import hashlib
+import mimetypes
+import threading
+import uuid
+from urllib.parse import unquote
+
+# 需要提取资源的标签属性，如 <img src="..."> 与 <link href="...">
+RESOURCE_ATTR_RE = re.compile(
+    r'(<(?:img|script|source|audio|video|embed|link)\b[^>]*?\s(?:src|href|poster)=)(["\'])(.*?)\2',
+    re.IGNORECASE | re.DOTALL
+)
+# 内联样式块
+STYLE_BLOCK_RE = re.compile(r'<style\b([^>]*)>(.*?)</style>', re.IGNORECASE | re.DOTALL)
+# 样式表中的 url(...) 引用
+CSS_URL_RE = re.compile(r'url\(\s*(["\']?)([^)"\']+)\1\s*\)', re.IGNORECASE)
+# data URI
+DATA_URI_RE = re.compile(r'^data:([^;,]*)(;base64)?,(.*)$', re.IGNORECASE | re.DOTALL)
+
+# 资源文件名中使用的哈希长度
+HASH_LENGTH = 20
+
+
+class AssetStore:
+    """内容寻址的资源库，资源以 <哈希><扩展名> 命名"""
+
+    def __init__(self, root):
+        """初始化资源库
+
+        Args:
+            root: 资源目录
+        """
+        self.root = os.path.abspath(str(root))
+        self._lock = threading.Lock()
+
+        # 统计信息
+        self.stats = {'stored': 0, 'deduplicated': 0, 'bytes_written': 0, 'bytes_saved': 0}
+
+    def add_bytes(self, data, extension):
+        """保存资源内容
+
+        Args:
+            data: 资源字节数据
+            extension: 扩展名（如 .png）
+
+        Returns:
+            str: 资源在库中的绝对路径
+        """
+        digest = hashlib.sha256(data).hexdigest()[:HASH_LENGTH]
+        asset_path = os.path.join(self.root, f"{digest}{extension.lower()}")
+
+        if os.path.exists(asset_path):
+            self._count('deduplicated', 'bytes_saved', len(data))
+            return asset_path
+
+        os.makedirs(self.root, exist_ok=True)
+        tmp_path = f"{asset_path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, asset_path)
+
+        self._count('stored', 'bytes_written', len(data))
+        return asset_path
+
+    def add_file(self, file_path):
+        """保存资源文件
+
+        Args:
+            file_path: 资源文件路径
+
+        Returns:
+            str: 资源在库中的绝对路径
+        """
+        extension = os.path.splitext(file_path)[1]
+        with open(file_path, 'rb') as f:
+            data = f.read()
+
+        # 样式表中引用的相对资源一并入库
+        if extension.lower() == '.css':
+            css = data.decode('utf-8', errors='replace')
+            data = self._externalize_css(css, [os.path.dirname(file_path)]).encode('utf-8')
+
+        return self.add_bytes(data, extension)
+
+    def externalize_html(self, html, output_path, base_dirs):
+        """将 HTML 中的本地资源与 data URI 提取到资源库并改写引用
+
+        远程资源（http/https 等）保持不变，无法找到的本地资源也保持不变。
+
+        Args:
+            html: HTML 文本
+            output_path: HTML 输出文件路径，用于计算相对引用
+            base_dirs: 解析相对路径时依次查找的目录列表
+
+        Returns:
+            str: 改写后的 HTML 文本
+        """
+        output_dir = os.path.dirname(os.path.abspath(output_path))
+
+        def replace_style(match):
+            css = self._externalize_css(match.group(2), base_dirs)
+            asset_path = self.add_bytes(css.encode('utf-8'), '.css')
+            return f'<link rel="stylesheet" href="{self._relative_url(asset_path, output_dir)}" />'
+
+        def replace_attr(match):
+            asset_path = self._store_reference(match.group(3), base_dirs)
+            if asset_path is None:
+                return match.group(0)
+            url = self._relative_url(asset_path, output_dir)
+            return f"{match.group(1)}{match.group(2)}{url}{match.group(2)}"
+
+        html = STYLE_BLOCK_RE.sub(replace_style, html)
+        return RESOURCE_ATTR_RE.sub(replace_attr, html)
+
+    def _externalize_css(self, css, base_dirs):
+        """将样式表中的 url(...) 引用入库，改写为相对资源库根目录的路径"""
+        def replace_url(match):
+            asset_path = self._store_reference(match.group(2), base_dirs)
+            if asset_path is None:
+                return match.group(0)
+            return f'url("{os.path.basename(asset_path)}")'
+
+        return CSS_URL_RE.sub(replace_url, css)
+
+    def _store_reference(self, reference, base_dirs):
+        """保存引用指向的资源，无法处理时返回None"""
+        reference = reference.strip()
+        data_match = DATA_URI_RE.match(reference)
+        if data_match:
+            mime_type, is_base64, payload = data_match.groups()
+            try:
+                if is_base64:
+                    data = base64.b64decode(payload)
+                else:
+                    data = unquote(payload).encode('utf-8')
+            except ValueError:
+                return None
+            extension = mimetypes.guess_extension(mime_type.strip() or 'text/plain') or '.bin'
+            return self.add_bytes(data, extension)
+
+        # 远程资源、锚点与绝对URL不处理
+        if not reference or reference.startswith('#') or re.match(r'^[a-zA-Z][\w+.-]*:|^//', reference):
+            return None
+
+        relative_path = unquote(reference.split('#', 1)[0].split('?', 1)[0])
+        for base_dir in base_dirs:
+            candidate = os.path.join(base_dir, relative_path)
+            if os.path.isfile(candidate):
+                if os.path.commonpath([os.path.abspath(candidate), self.root]) == self.root:
+                    return os.path.abspath(candidate)
+                return self.add_file(candidate)
+
+        return None
+
+    @staticmethod
+    def _relative_url(asset_path, output_dir):
+        """计算从输出目录到资源的相对URL"""
+        return os.path.relpath(asset_path, output_dir).replace(os.sep, '/')
+
+    def _count(self, key, bytes_key, size):
+        """更新统计信息"""
+        with self._lock:
+            self.stats[key] += 1
+            self.stats[bytes_key] += size
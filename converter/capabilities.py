@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+DocuFlow - 转换能力索引
+由本项目支持的转换矩阵（utils.file_utils.CONVERSION_MATRIX）与当前安装的
+pandoc 实际支持的读写格式求交集，编译为只读的集合与映射，O(1) 查询。
+所有入口在安排转换任务前都通过它校验，不会为注定失败的任务启动 pandoc。
+本模块在首次校验时才导入（dataclasses/typing 较重）。
+"""
+
+import subprocess
+import threading
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import FrozenSet, Mapping, Optional, Tuple
+from utils.file_utils import CONVERSION_MATRIX, OUTPUT_FORMATS, get_file_extension
+
+# 各扩展名对应的pandoc读写器名称
+PANDOC_FORMATS = MappingProxyType({
+    '.docx': 'docx',
+    '.md': 'markdown',
+    '.html': 'html',
+    '.htm': 'html',
+    '.epub': 'epub',
+})
+
+
+@dataclass(frozen=True)
+class CapabilityIndex:
+    """只读的转换能力索引"""
+    pandoc_version: str
+    pairs: FrozenSet[Tuple[str, str]]
+    targets: Mapping[str, Tuple[str, ...]]
+    input_extensions: FrozenSet[str]
+    output_extensions: FrozenSet[str]
+
+    @classmethod
+    def build(cls, readers, writers, pandoc_version=""):
+        """由pandoc的读写格式列表编译能力索引
+
+        Args:
+            readers: pandoc支持的输入格式名称集合
+            writers: pandoc支持的输出格式名称集合
+            pandoc_version: pandoc版本信息
+
+        Returns:
+            CapabilityIndex: 能力索引
+        """
+        pairs = frozenset(
+            (source, target)
+            for source, source_targets in CONVERSION_MATRIX.items()
+            for target in source_targets
+            if PANDOC_FORMATS[source] in readers and PANDOC_FORMATS[target] in writers
+        )
+        targets = MappingProxyType({
+            source: tuple(target for target in source_targets if (source, target) in pairs)
+            for source, source_targets in CONVERSION_MATRIX.items()
+        })
+        return cls(
+            pandoc_version=pandoc_version,
+            pairs=pairs,
+            targets=targets,
+            input_extensions=frozenset(source for source, _ in pairs),
+            output_extensions=frozenset(target for _, target in pairs),
+        )
+
+    def can_convert(self, source_format, target_format):
+        """检查是否支持从源格式转换到目标格式（扩展名，大小写不敏感）"""
+        return (source_format.lower(), target_format.lower()) in self.pairs
+
+    def targets_for(self, source_format):
+        """获取源格式可转换到的目标格式"""
+        return self.targets.get(source_format.lower(), ())
+
+    def check(self, file_path, output_format) -> Optional[str]:
+        """检查文件能否转换为目标格式
+
+        Args:
+            file_path: 源文件路径
+            output_format: 输出格式
+
+        Returns:
+            str: 不能转换的原因，可以转换时返回None
+        """
+        source = get_file_extension(file_path)
+        target = output_format.lower()
+        if (source, target) in self.pairs:
+            return None
+        if source not in CONVERSION_MATRIX:
+            return f"不支持的文件格式: {source or '无扩展名'}"
+        if target not in OUTPUT_FORMATS:
+            return f"不支持的输出格式: {output_format}"
+        if target in CONVERSION_MATRIX[source]:
+            return f"当前pandoc不支持从{source}转换到{target}"
+        return f"不支持从{source}转换到{output_format}"
+
+
+# 进程内只探测一次pandoc
+_index = None
+_index_lock = threading.Lock()
+
+
+def _pandoc_lines(*args):
+    """运行pandoc并返回输出的各行"""
+    try:
+        result = subprocess.run(["pandoc"] + list(args), capture_output=True, text=True,
+                                check=False)
+    except FileNotFoundError:
+        from converter.document_converter import PANDOC_MISSING_MESSAGE
+        raise Exception(PANDOC_MISSING_MESSAGE)
+    if result.returncode != 0:
+        raise Exception("Pandoc未安装或无法运行")
+    return [line.strip() for line in result.stdout.splitlines() if line.strip()]
+
+
+def get_capability_index():
+    """获取当前环境的转换能力索引（首次调用时探测pandoc，结果在进程内缓存）
+
+    Returns:
+        CapabilityIndex: 能力索引
+    """
+    global _index
+    if _index is not None:
+        return _index
+
+    with _index_lock:
+        if _index is None:
+            version = _pandoc_lines("--version")
+            _index = CapabilityIndex.build(
+                readers=frozenset(_pandoc_lines("--list-input-formats")),
+                writers=frozenset(_pandoc_lines("--list-output-formats")),
+                pandoc_version=version[0] if version else "",
+            )
+    return _index
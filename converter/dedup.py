@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+DocuFlow - 批次内重复输入检测
+同一份文档常以不同路径出现在一个批次中（各部门、各年度的副本）。
+先按大小分组，大小相同的文件再比较开头部分的哈希，仍相同时才计算完整哈希；
+每组只转换第一个文件，其余文件的输出由代表文件的输出复制而来（reflink、硬链接或普通复制）。
+
+除内容外，以下因素也会影响输出，只有它们也相同的文件才归为一组：
+  - 转换为 .html/.epub 时文档没有标题会使用文件名，因此文件名需相同
+  - 共享资源目录或媒体提取时，输出中的资源相对路径取决于输出目录
+  - 引用了本地资源（图片、样式表）的 .md/.html 需位于同一目录
+转换为 .docx/.epub 时元数据时间戳取自代表文件的修改时间。
+"""
+
+import os
+import re
+import shutil
+import hashlib
+from converter.output import commit_file, make_temp_path, UNCHANGED
+from utils.file_utils import get_file_extension
+
+# 重复输出的生成方式：auto 优先 reflink，不支持时复制；hardlink 优先硬链接；off 不检测重复
+DEDUP_MODES = ('auto', 'hardlink', 'copy', 'off')
+
+# 生成方式
+REFLINK = "reflink"
+HARDLINK = "hardlink"
+COPY = "copy"
+
+# 各模式依次尝试的生成方式
+DEDUP_METHODS = {
+    'auto': (REFLINK, COPY),
+    'hardlink': (HARDLINK, COPY),
+    'copy': (COPY,),
+}
+
+# 先比较开头部分的哈希，不同的文件通常在这里就能区分
+HEAD_SIZE = 64 * 1024
+CHUNK_SIZE = 1024 * 1024
+
+# 可能引用本地资源的文本格式，及其中的资源引用
+TEXT_FORMATS = ('.md', '.html', '.htm')
+LOCAL_RESOURCE_RE = re.compile(rb'!\[|<img\b|<link\b|\bsrc\s*=|\burl\(', re.IGNORECASE)
+
+# Linux 的 FICLONE ioctl（btrfs、xfs 等支持写时复制的文件系统）
+FICLONE = 0x40049409
+
+
+def _head_digest(file_path):
+    """文件开头部分的哈希"""
+    with open(file_path, 'rb') as f:
+        return hashlib.blake2b(f.read(HEAD_SIZE)).hexdigest()
+
+
+def _full_digest(file_path, scan_resources):
+    """完整哈希，并检查是否引用本地资源
+
+    Returns:
+        tuple: (十六进制哈希值, 是否引用本地资源)
+    """
+    digest = hashlib.blake2b()
+    has_resources = False
+    tail = b''
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+            # 保留上一块的结尾，避免引用恰好跨越块边界
+            if scan_resources and not has_resources:
+                has_resources = LOCAL_RESOURCE_RE.search(tail + chunk) is not None
+                tail = chunk[-16:]
+    return digest.hexdigest(), has_resources
+
+
+def _output_context(file_path, output_format, output_dir, options, has_resources):
+    """除内容外影响输出的因素"""
+    file_dir, file_name = os.path.split(os.path.abspath(file_path))
+    context = []
+    if output_format.lower() in ('.html', '.epub'):
+        context.append(os.path.splitext(file_name)[0])
+    if options.get('html_assets') == 'shared' or options.get('extract_media'):
+        context.append(os.path.abspath(output_dir) if output_dir else file_dir)
+    if has_resources:
+        context.append(file_dir)
+    return tuple(context)
+
+
+def find_duplicates(file_paths, output_format, output_dir=None, options=None):
+    """查找批次中内容相同、输出也相同的输入
+
+    Args:
+        file_paths: 源文件路径列表（不含归档）
+        output_format: 输出格式
+        output_dir: 输出目录
+        options: 转换选项（html_assets、extract_media 等）
+
+    Returns:
+        dict: 重复文件的下标 -> 代表文件（输入顺序中第一个）的下标
+    """
+    options = options or {}
+
+    # 1. 按大小分组，大小唯一的文件不需要读取
+    by_size = {}
+    for index, file_path in enumerate(file_paths):
+        try:
+            by_size.setdefault(os.path.getsize(file_path), []).append(index)
+        except OSError:
+            continue
+
+    duplicates = {}
+    for size, indexes in by_size.items():
+        if len(indexes) < 2:
+            continue
+
+        # 2. 比较开头部分
+        by_head = {}
+        for index in indexes:
+            try:
+                by_head.setdefault(_head_digest(file_paths[index]), []).append(index)
+            except OSError:
+                continue
+
+        for candidates in by_head.values():
+            if len(candidates) < 2:
+                continue
+
+            # 3. 完整哈希（文件不大于开头部分时，开头哈希即完整哈希），加上影响输出的因素
+            groups = {}
+            for index in candidates:
+                file_path = file_paths[index]
+                scan = get_file_extension(file_path) in TEXT_FORMATS
+                if size <= HEAD_SIZE and not scan:
+                    digest, has_resources = None, False
+                else:
+                    try:
+                        digest, has_resources = _full_digest(file_path, scan)
+                    except OSError:
+                        continue
+                key = (get_file_extension(file_path), digest,
+                       _output_context(file_path, output_format, output_dir, options,
+                                       has_resources))
+                groups.setdefault(key, []).append(index)
+
+            for group in groups.values():
+                for index in group[1:]:
+                    duplicates[index] = group[0]
+    return duplicates
+
+
+def _reflink(source_path, target_path):
+    """写时复制克隆文件内容（不支持时抛出 OSError）"""
+    try:
+        import fcntl
+    except ImportError:
+        raise OSError("当前平台不支持 reflink")
+    with open(source_path, 'rb') as src, open(target_path, 'wb') as dst:
+        fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+
+
+def materialize(source_path, output_path, mode='auto'):
+    """由代表文件的输出生成重复文件的输出
+
+    与普通输出一样先在输出目录生成临时文件，内容与已有输出相同时跳过写入，否则原子替换。
+
+    Args:
+        source_path: 代表文件的输出路径
+        output_path: 重复文件的输出路径
+        mode: 生成方式（见 DEDUP_MODES）
+
+    Returns:
+        tuple: (写入状态, 实际使用的生成方式)，保留了内容相同的已有输出时生成方式为None
+    """
+    try:
+        if os.path.samefile(source_path, output_path):
+            return UNCHANGED, HARDLINK
+    except OSError:
+        pass
+
+    methods = DEDUP_METHODS.get(mode)
+    if methods is None:
+        raise Exception(f"未知的重复输出生成方式: {mode}")
+
+    tmp_path = make_temp_path(output_path)
+    for method in methods:
+        try:
+            if method == REFLINK:
+                _reflink(source_path, tmp_path)
+            elif method == HARDLINK:
+                os.remove(tmp_path)
+                os.link(source_path, tmp_path)
+            else:
+                shutil.copyfile(source_path, tmp_path)
+            break
+        except OSError:
+            if method == COPY:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+            if not os.path.exists(tmp_path):
+                open(tmp_path, 'wb').close()
+    status = commit_file(tmp_path, output_path)
+    return status, (None if status == UNCHANGED else method)
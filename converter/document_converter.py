@@ -5,126 +5,1101 @@ DocuFlow - 文档转换器核心逻辑
 """
 
 import os
+import re
+import itertools
+import posixpath
 import subprocess
 import tempfile
 import shutil
-from utils.file_utils import get_file_extension, get_supported_formats
+import threading
+import time
+from utils.file_utils import get_file_extension, get_supported_formats, get_scratch_dir
+from utils.archive_utils import ARCHIVE_EXTENSIONS, is_archive_file
+from converter.output import WRITTEN, UNCHANGED, DirectorySink
+from converter.filters import FilterPipeline
+from converter.preflight import preflight, check_stream_head
+from converter.affinity import pandoc_rts_args
+
+# 可通过标准输入直接读取的格式及其pandoc读取器名称
+STDIN_READERS = {
+    ".md": "markdown",
+    ".html": "html",
+    ".htm": "html",
+}
+
+# 流式转换时用于检测标题的开头字节数
+STREAM_HEAD_SIZE = 64 * 1024
+# 文档自带标题：YAML 元数据中的 title、pandoc 标题块或 HTML <title>
+TITLE_RE = re.compile(rb'^title\s*:|\A%[ \t]|<title[\s>]', re.IGNORECASE | re.MULTILINE)
+
+# pandoc未安装时的提示
+PANDOC_MISSING_MESSAGE = "Pandoc未安装，请先安装Pandoc: https://pandoc.org/installing.html"
 
 class DocumentConverter:
     """文档转换器类"""
     
-    def __init__(self):
-        """初始化转换器"""
-        # 检查pandoc是否安装
-        self.check_dependencies()
+    def __init__(self, cache_dir=None, filters=None, staging=None, precompress=None,
+                 output_layout=None, timeout=None):
+        """初始化转换器
+        
+        Args:
+            cache_dir: 增量渲染缓存目录，如果为None则使用配置中的缓存目录
+            filters: 进程内AST过滤器列表（见 converter.filters），按顺序作用于每个文档
+            staging: 本地暂存区（converter.staging.StagingArea），源文件与输出目录位于
+                网络文件系统时先复制到本地再转换；False 表示不暂存，如果为None则按配置决定
+            precompress: 输出到目录时为 .html/.md 同时生成的预压缩文件
+                （converter.precompress.Precompressor 或压缩方式列表，如 "gzip,br"）；
+                False 表示不生成，如果为None则按配置决定
+            output_layout: 输出目录布局（converter.layout.OutputLayout），指定输出目录时决定
+                输出在其中的位置，并为重名的输出改名；如果为None则按配置决定
+            timeout: 单次pandoc调用的超时（秒），0表示不限制，如果为None则按配置决定
+        """
+        self.cache_dir = cache_dir
+        self.filters = FilterPipeline(filters or ())
+        self._staging = staging
+        self._output_layout = output_layout
+        self._timeout = timeout
+        self._incremental_renderer = None
+        self._asset_stores = {}
+        self._directory_sink = DirectorySink(precompress)
+        # 保护按需创建的共享对象（资源库、增量渲染器），转换器可被多个线程同时使用
+        self._init_lock = threading.Lock()
+        
+        # 输出写入统计：written 为实际写入，unchanged 为内容未变化而跳过
+        self.write_stats = {WRITTEN: 0, UNCHANGED: 0}
+        self._stats_lock = threading.Lock()
         
-        # 支持的转换格式映射（已移除PDF转换功能）
-        self.conversion_map = {
-            ".docx": [".md", ".html", ".epub"],
-            ".md": [".docx", ".html", ".epub"],
-            ".html": [".md", ".docx", ".epub"],
-            ".epub": [".md", ".docx", ".html"]
-        }
+        # 重复输入统计：跳过转换的文件数与输入字节数、估计节省的转换耗时、
+        # 以 reflink/硬链接共享而未占用额外空间的输出字节数
+        self.dedup_stats = {'duplicates': 0, 'bytes_skipped': 0, 'seconds_saved': 0.0,
+                            'bytes_shared': 0}
+        
+        # 吞吐量统计（converter.planner.ThroughputStats），设置后记录每个文件的转换耗时
+        self.throughput_stats = None
+        
+        # 失败记录（converter.quarantine.Quarantine），设置后记录每个文件的失败，
+        # 成功时清除其记录；引擎据此跳过已隔离的输入
+        self.quarantine = None
+        
+        # 自动重试统计：暂时性失败的重试次数、重试后成功的文件数
+        self.retry_stats = {'retries': 0, 'recovered': 0}
+        
+        # 批量转换统计：批次数、批量转换成功的文件数、改为逐个转换的文件数、整批失败的批次数
+        self.batch_stats = {'batches': 0, 'batched': 0, 'fallbacks': 0, 'failed_batches': 0}
+        
+        # pandoc在首次需要时才检查（见 capabilities），创建转换器不启动子进程
+    
+    def add_filter(self, action):
+        """注册进程内AST过滤器，返回过滤器本身（可用作装饰器）"""
+        return self.filters.add(action)
+    
+    @property
+    def staging(self):
+        """本地暂存区，未启用时为None（首次访问时读取配置）"""
+        with self._init_lock:
+            if self._staging is None:
+                from config import config
+                self._staging = False
+                if config.conversion.staging:
+                    from converter.staging import StagingArea
+                    self._staging = StagingArea(config.conversion.staging_dir,
+                                                config.conversion.staging_max_size)
+            return self._staging or None
+    
+    @property
+    def output_layout(self):
+        """输出目录布局（首次访问时读取配置）"""
+        with self._init_lock:
+            if self._output_layout is None:
+                from config import config
+                from converter.layout import OutputLayout
+                self._output_layout = OutputLayout(config.conversion.output_layout,
+                                                   config.conversion.output_source_root)
+            return self._output_layout
+    
+    @property
+    def pandoc_timeout(self):
+        """单次pandoc调用的超时秒数，None表示不限制（首次访问时读取配置）"""
+        if self._timeout is None:
+            from config import config
+            self._timeout = config.conversion.pandoc_timeout
+        return self._timeout or None
+    
+    @property
+    def precompress_stats(self):
+        """预压缩统计，未启用预压缩时为None"""
+        precompressor = self._directory_sink.precompressor
+        return precompressor.stats if precompressor is not None else None
+    
+    @property
+    def capabilities(self):
+        """转换能力索引（首次访问时探测pandoc，进程内只探测一次）"""
+        from converter.capabilities import get_capability_index
+        return get_capability_index()
     
     def check_dependencies(self):
-        """检查依赖是否安装"""
-        try:
-            result = subprocess.run(["pandoc", "--version"], 
-                                   capture_output=True, 
-                                   text=True, 
-                                   check=False)
-            if result.returncode != 0:
-                raise Exception("Pandoc未安装或无法运行")
-        except FileNotFoundError:
-            raise Exception("Pandoc未安装，请先安装Pandoc: https://pandoc.org/installing.html")
+        """检查依赖是否安装
+        
+        Returns:
+            str: pandoc版本信息（pandoc --version 的第一行）
+        """
+        return self.capabilities.pandoc_version
+    
+    @property
+    def pandoc_version(self):
+        """pandoc版本信息（首次访问时检查pandoc）"""
+        return self.check_dependencies()
+    
+    @property
+    def conversion_map(self):
+        """当前可用的转换格式映射（只读）"""
+        return self.capabilities.targets
     
     def can_convert(self, source_format, target_format):
         """检查是否支持从源格式转换到目标格式"""
-        if source_format not in self.conversion_map:
-            return False
-        return target_format in self.conversion_map[source_format]
+        return self.capabilities.can_convert(source_format, target_format)
+    
+    def check_conversion(self, file_path, output_format):
+        """在安排转换前检查文件能否转换为目标格式
+        
+        Args:
+            file_path: 源文件路径
+            output_format: 输出格式
+            
+        Returns:
+            str: 不能转换的原因，可以转换时返回None
+        """
+        return self.capabilities.check(file_path, output_format)
     
-    def convert_file(self, file_path, output_format, output_dir=None, keep_original_name=True):
+    def convert_file(self, file_path, output_format, output_dir=None, keep_original_name=True,
+                     priority=None, **options):
         """转换文件
         
+        其他参数与 convert_file_detailed 相同。
+        
+        Args:
+            priority: 优先级通道（"interactive"、"normal" 或 "bulk"）。指定时任务交给
+                进程内共享的调度器，与其他批次按优先级排队；如果为None则在当前线程直接转换
+        
+        Returns:
+            str: 输出文件路径，如果转换失败则返回None
+        """
+        if priority is not None:
+            from converter.scheduler import get_scheduler
+            scheduler = get_scheduler()
+            # 已在调度器的工作线程中时直接转换，避免等待自己所在的线程池
+            if not scheduler.in_worker():
+                output_path, _ = scheduler.submit(
+                    self.convert_file_detailed, file_path, output_format, output_dir,
+                    keep_original_name, priority=priority, **options
+                ).result()
+                return output_path
+        output_path, _ = self.convert_file_detailed(
+            file_path, output_format, output_dir, keep_original_name, **options
+        )
+        return output_path
+    
+    def convert_file_detailed(self, file_path, output_format, output_dir=None,
+                              keep_original_name=True, incremental=None, html_assets=None,
+                              asset_dir=None, extract_media=None, media_dir=None, sink=None,
+                              seq=None, output_path=None):
+        """转换文件并返回输出的写入状态
+        
+        输出先写入同目录临时文件，与已有输出内容相同时跳过写入，否则原子替换。
+        
         Args:
             file_path: 源文件路径
             output_format: 输出格式 (如 .html, .md)
             output_dir: 输出目录，如果为None则使用源文件目录
             keep_original_name: 是否保留原文件名
+            incremental: 是否启用增量渲染（仅 .md 转 .html 时生效），如果为None则按配置决定
+            html_assets: HTML资源处理方式，"inline"内嵌到每个文件，
+                "shared"提取到按内容哈希去重的共享资源目录；如果为None则按配置决定
+            asset_dir: 共享资源目录，如果为None则使用输出目录下的assets
+            extract_media: 是否提取 .docx/.epub 中的媒体文件（仅转换为 .md 时生效），
+                媒体按内容哈希去重保存到共享媒体目录；如果为None则按配置决定
+            media_dir: 共享媒体目录，如果为None则使用输出目录下的media
+            sink: 输出目标，如果为None则写入文件系统目录；
+                使用 ArchiveSink 时输出路径为归档内的相对路径
+            seq: 提交序号，归档输出按序号顺序写入条目
+            output_path: 已确定的输出路径（如归档成员），如果为None则按输出目录布局确定
             
         Returns:
-            str: 输出文件路径，如果转换失败则返回None
+            tuple: (输出文件路径, 写入状态)，写入状态为 "written" 或 "unchanged"
+        """
+        sink = sink or self._directory_sink
+        options = self.conversion_options(dict(incremental=incremental, html_assets=html_assets,
+                                               extract_media=extract_media))
+        incremental, html_assets = options['incremental'], options['html_assets']
+        extract_media = options['extract_media']
+        attempt = 0
+        while True:
+            # 吞吐量只记录成功的那次尝试，不计入失败的尝试与退避等待
+            started = time.perf_counter()
+            try:
+                result_path, status = self._convert_to_sink(
+                    file_path, output_format, output_dir, keep_original_name, incremental,
+                    html_assets, asset_dir, extract_media, media_dir, sink, seq, output_path
+                )
+                break
+            except Exception as e:
+                delay = self._retry_delay(e, attempt)
+                if delay is None:
+                    sink.discard(seq)
+                    self._record_outcome(file_path, output_format, options, e)
+                    raise
+            # 暂时性失败（资源不足、被信号终止等）按退避重试
+            attempt += 1
+            with self._stats_lock:
+                self.retry_stats['retries'] += 1
+            time.sleep(delay)
+        
+        if attempt:
+            with self._stats_lock:
+                self.retry_stats['recovered'] += 1
+        self._record_outcome(file_path, output_format, options)
+        self._record_write(status)
+        if self.throughput_stats is not None:
+            self.throughput_stats.record(get_file_extension(file_path), output_format,
+                                         os.path.getsize(file_path),
+                                         time.perf_counter() - started)
+        return result_path, status
+    
+    def convert_batch_detailed(self, file_paths, output_format, output_dir=None,
+                               keep_original_name=True, sink=None, seqs=None):
+        """在一个pandoc进程中转换一批小文件，输出与逐个转换相同（见 converter.microbatch）
+        
+        批量中失败的文件改为逐个转换；整批失败（如pandoc不支持 `pandoc lua`）时全部逐个转换。
+        
+        Args:
+            file_paths: 源文件路径列表（转换需在 converter.microbatch.BATCH_PAIRS 中）
+            output_format: 输出格式
+            output_dir: 输出目录，如果为None则使用源文件目录
+            keep_original_name: 是否保留原文件名
+            sink: 输出目标
+            seqs: 与 file_paths 对应的提交序号列表
+        
+        Returns:
+            list: 与输入一一对应，成功时为 (输出文件路径, 写入状态)，失败时为异常对象
+        """
+        from converter.microbatch import run_batch
+        sink = sink or self._directory_sink
+        seqs = list(seqs) if seqs is not None else [None] * len(file_paths)
+        results = [None] * len(file_paths)
+        
+        # 与逐个转换相同的检查
+        positions, output_paths = [], []
+        for position, file_path in enumerate(file_paths):
+            reason = self.check_conversion(file_path, output_format) or preflight(file_path)
+            if reason:
+                sink.discard(seqs[position])
+                results[position] = Exception(reason)
+                continue
+            positions.append(position)
+            output_paths.append(self._prepare_output_path(file_path, output_format, output_dir,
+                                                          keep_original_name, sink))
+        
+        outputs = [None] * len(positions)
+        started = time.perf_counter()
+        failed_batch = False
+        if positions:
+            try:
+                with tempfile.TemporaryDirectory(prefix="docuflow_batch_",
+                                                 dir=get_scratch_dir()) as work_dir:
+                    outputs = run_batch(self._run_pandoc,
+                                        [file_paths[position] for position in positions],
+                                        output_format, work_dir)
+            except Exception as e:
+                # 整批失败（如pandoc不支持 `pandoc lua`、批量脚本结果不完整）时全部逐个转换
+                import logging
+                logging.getLogger(__name__).warning(
+                    "批量转换失败，%d 个文件改为逐个转换: %s", len(positions), e
+                )
+                failed_batch = True
+        # 批量转换的耗时平均分摊到成功的文件
+        batched = sum(1 for data in outputs if data is not None)
+        with self._stats_lock:
+            self.batch_stats['batches'] += 1
+            self.batch_stats['batched'] += batched
+            self.batch_stats['fallbacks'] += len(positions) - batched
+            self.batch_stats['failed_batches'] += failed_batch
+        elapsed = (time.perf_counter() - started) / max(1, batched)
+        
+        for position, output_path, data in zip(positions, output_paths, outputs):
+            file_path = file_paths[position]
+            try:
+                if data is None:
+                    results[position] = self.convert_file_detailed(
+                        file_path, output_format, output_dir, keep_original_name,
+                        sink=sink, seq=seqs[position]
+                    )
+                    continue
+                try:
+                    status = sink.commit_bytes(data, output_path, seqs[position])
+                except Exception:
+                    sink.discard(seqs[position])
+                    raise
+                self._record_outcome(file_path, output_format, {})
+                self._record_write(status)
+                if self.throughput_stats is not None:
+                    self.throughput_stats.record(get_file_extension(file_path), output_format,
+                                                 os.path.getsize(file_path), elapsed)
+                results[position] = (output_path, status)
+            except Exception as e:
+                results[position] = e
+        return results
+    
+    @staticmethod
+    def conversion_options(options=None):
+        """补全转换选项：未指定（或为None）的选项使用配置中的默认值
+        
+        Args:
+            options: 转换选项（convert_file_detailed 的关键字参数）
+            
+        Returns:
+            dict: 补全后的选项
+        """
+        from config import config
+        resolved = dict(incremental=config.conversion.incremental,
+                        html_assets=config.conversion.html_assets,
+                        extract_media=config.conversion.extract_media)
+        for key, value in (options or {}).items():
+            if value is not None or key not in resolved:
+                resolved[key] = value
+        return resolved
+    
+    def _retry_delay(self, error, attempt):
+        """失败后重试前的等待秒数，不应重试（非暂时性失败或已达重试次数）时返回None"""
+        from converter.quarantine import is_transient
+        from config import config
+        if attempt >= config.conversion.retry_attempts or not is_transient(error):
+            return None
+        return config.conversion.retry_backoff * (2 ** attempt)
+    
+    def quarantine_context(self, output_format, incremental=False, html_assets="inline",
+                           extract_media=False, **_):
+        """失败记录使用的转换环境签名：pandoc版本、过滤器、输出格式与影响输出的选项"""
+        from converter.quarantine import make_context
+        return make_context(self._toolchain(), output_format,
+                            dict(incremental=bool(incremental), html_assets=html_assets,
+                                 extract_media=bool(extract_media)))
+    
+    def _toolchain(self):
+        """工具链描述：pandoc版本与过滤器名称"""
+        names = [getattr(action, '__name__', type(action).__name__) for action in self.filters]
+        return [self.pandoc_version] + names
+    
+    def quarantined(self, file_path, output_format, **options):
+        """查找已隔离的输入（未设置 quarantine 时总是返回None）
+        
+        Args:
+            file_path: 源文件路径
+            output_format: 输出格式
+            **options: 传给 convert_file_detailed 的其他选项
+            
+        Returns:
+            dict: 失败记录，未被隔离时返回None
         """
+        if self.quarantine is None:
+            return None
+        return self.quarantine.lookup(file_path, self.quarantine_context(output_format, **options))
+    
+    def _record_outcome(self, file_path, output_format, options, error=None):
+        """在失败记录中记录转换失败，或在成功时清除记录
+        
+        环境问题（pandoc未安装、读写文件出错、暂时性失败）与文档内容无关，不计入失败记录。
+        """
+        if self.quarantine is None:
+            return
+        if error is not None:
+            from converter.quarantine import is_transient, error_chain
+            if is_transient(error) or any(
+                    isinstance(cause, OSError) or str(cause) == PANDOC_MISSING_MESSAGE
+                    for cause in error_chain(error)):
+                return
+        context = self.quarantine_context(output_format, **options)
+        if error is None:
+            self.quarantine.record_success(file_path, context)
+        else:
+            self.quarantine.record_failure(file_path, context, error, self.pandoc_version,
+                                           output_format)
+    
+    def _convert_to_sink(self, file_path, output_format, output_dir, keep_original_name,
+                         incremental, html_assets, asset_dir, extract_media, media_dir, sink, seq,
+                         output_path=None):
+        """执行单个文件的转换并提交到输出目标"""
         # 获取文件信息
         file_dir, file_name = os.path.split(file_path)
         file_base, file_ext = os.path.splitext(file_name)
         
-        # 检查格式支持
-        if not self.can_convert(file_ext.lower(), output_format.lower()):
-            raise Exception(f"不支持从{file_ext}转换到{output_format}")
+        # 检查格式支持，再读取文件头检查内容，不为注定失败的输入启动pandoc
+        reason = self.check_conversion(file_path, output_format) or preflight(file_path)
+        if reason:
+            raise Exception(reason)
         
-        # 确定输出目录
+        # 确定输出目录与路径；共享资源与媒体目录默认位于输出目录（而不是布局中的子目录）下
+        if output_path is None:
+            output_path = self._prepare_output_path(file_path, output_format, output_dir,
+                                                    keep_original_name, sink)
+        else:
+            sink.prepare(os.path.dirname(output_path))
         if not output_dir:
-            output_dir = file_dir if file_dir else os.getcwd()
-        
-        # 确保输出目录存在
-        if output_dir:
-            os.makedirs(output_dir, exist_ok=True)
+            output_dir = os.path.dirname(output_path)
         
-        # 确定输出文件名
-        if keep_original_name:
-            output_name = f"{file_base}{output_format}"
-        else:
-            output_name = f"{file_base}_converted{output_format}"
+        # 共享资源库
+        asset_store = None
+        if sink.is_archive and (html_assets == "shared" or extract_media):
+            raise Exception("归档输出不支持共享资源目录或媒体提取")
+        if html_assets == "shared" and output_format.lower() == ".html":
+            asset_store = self.get_asset_store(asset_dir or os.path.join(output_dir, "assets"))
+        elif html_assets not in ("inline", "shared"):
+            raise Exception(f"未知的HTML资源处理方式: {html_assets}")
         
-        output_path = os.path.join(output_dir, output_name)
+        # 共享媒体目录
+        if (extract_media and output_format.lower() == ".md"
+                and file_ext.lower() in (".docx", ".epub")):
+            asset_store = self.get_asset_store(media_dir or os.path.join(output_dir, "media"))
         
         # 执行转换
         try:
-            return self._convert_with_pandoc(file_path, output_path, file_ext, output_format)
+            # 增量渲染按章节缓存pandoc输出，注册了过滤器时不使用，也不经过本地暂存；
+            # 包含脚注、示例列表或重复标题的文档不能分节渲染，整篇转换
+            html = None
+            if (incremental and not self.filters and file_ext.lower() == ".md"
+                    and output_format.lower() == ".html"):
+                html = self._get_incremental_renderer().render(file_path)
+            if html is not None:
+                if asset_store:
+                    html = asset_store.externalize_html(html, output_path, [file_dir or os.getcwd()])
+                status = sink.commit_bytes(html.encode('utf-8'), output_path, seq)
+            else:
+                status = self._convert_with_pandoc(file_path, output_path, file_ext, output_format,
+                                                   asset_store, sink, seq)
         except Exception as e:
-            raise Exception(f"转换失败: {str(e)}")
+            raise Exception(f"转换失败: {str(e)}") from e
+        
+        return output_path, status
+    
+    def output_path_for(self, file_path, output_format, output_dir=None, keep_original_name=True,
+                        sink=None):
+        """确定源文件的输出路径（不创建目录）
+        
+        指定输出目录或输出到归档时按输出目录布局放置；与其他源文件的输出重名时改名。
+        同一源文件多次调用得到相同的路径，批次按输入顺序预先调用，先输入的文件保留原文件名。
+        
+        Args:
+            file_path: 源文件路径
+            output_format: 输出格式
+            output_dir: 输出目录，如果为None则使用源文件目录
+            keep_original_name: 是否保留原文件名
+            sink: 输出目标，如果为None则写入文件系统目录
+            
+        Returns:
+            str: 输出文件路径
+        """
+        sink = sink or self._directory_sink
+        file_dir, file_name = os.path.split(file_path)
+        layout = self.output_layout
+        if output_dir or sink.is_archive:
+            output_dir = os.path.join(output_dir or "", layout.subdir(file_path))
+        else:
+            output_dir = sink.default_output_dir(file_dir)
+        output_path = os.path.join(output_dir, self._output_name(os.path.splitext(file_name)[0],
+                                                                 output_format, keep_original_name))
+        return layout.claim(file_path, output_path)
+    
+    def _prepare_output_path(self, file_path, output_format, output_dir, keep_original_name, sink):
+        """确定输出文件路径并确保输出目录存在"""
+        output_path = self.output_path_for(file_path, output_format, output_dir,
+                                           keep_original_name, sink)
+        sink.prepare(os.path.dirname(output_path))
+        return output_path
+    
+    def materialize_duplicate(self, source_output, file_path, output_format, output_dir=None,
+                              keep_original_name=True, mode="auto", saved_seconds=0.0):
+        """由内容相同的代表文件的输出生成重复文件的输出，不再运行pandoc
+        
+        Args:
+            source_output: 代表文件的输出路径
+            file_path: 重复的源文件路径
+            output_format: 输出格式
+            output_dir: 输出目录，如果为None则使用源文件目录
+            keep_original_name: 是否保留原文件名
+            mode: 生成方式（见 converter.dedup.DEDUP_MODES）
+            saved_seconds: 代表文件的转换耗时，计入节省的耗时
+            
+        Returns:
+            tuple: (输出文件路径, 写入状态)
+        """
+        from converter.dedup import materialize, REFLINK, HARDLINK
+        output_path = self._prepare_output_path(file_path, output_format, output_dir,
+                                                keep_original_name, self._directory_sink)
+        status, method = materialize(source_output, output_path, mode)
+        self._directory_sink.precompress(output_path, status)
+        
+        self._record_write(status)
+        with self._stats_lock:
+            self.dedup_stats['duplicates'] += 1
+            self.dedup_stats['bytes_skipped'] += os.path.getsize(file_path)
+            self.dedup_stats['seconds_saved'] += saved_seconds
+            if method in (REFLINK, HARDLINK):
+                self.dedup_stats['bytes_shared'] += os.path.getsize(output_path)
+        return output_path, status
+    
+    @staticmethod
+    def _output_name(file_base, output_format, keep_original_name):
+        """确定输出文件名"""
+        if keep_original_name:
+            return f"{file_base}{output_format}"
+        return f"{file_base}_converted{output_format}"
     
-    def _convert_with_pandoc(self, input_path, output_path, input_format, output_format):
-        """使用pandoc执行转换"""
-        # 准备pandoc命令
-        cmd = ["pandoc", input_path, "-o", output_path]
+    def iter_convert_archive(self, archive_path, output_format, output_dir=None,
+                             keep_original_name=True, sink=None, seq_counter=None, **options):
+        """直接转换 zip/tar 归档中的文档，无需先解压
+        
+        .md/.html 成员通过标准输入流式传给pandoc；其他格式（如 .docx/.epub）、
+        注册了过滤器或启用了增量渲染、共享资源等选项时，成员先写入本地临时目录（优先 /dev/shm）再转换。
+        输出保留成员在归档中的目录结构（不使用输出目录布局），与其他输出重名时改名。
         
-        # 添加特定格式的参数
+        Args:
+            archive_path: 归档路径
+            output_format: 输出格式
+            output_dir: 输出目录，如果为None则使用归档所在目录下与归档同名的目录
+            keep_original_name: 是否保留原文件名
+            sink: 输出目标
+            seq_counter: 提交序号计数器（如 itertools.count()），与其他输入共用以保持顺序
+            **options: 传给 convert_file_detailed 的其他选项
+            
+        Yields:
+            tuple: (成员路径, 输出文件路径, 写入状态, 错误信息)，失败时前两项之后为None
+        """
+        sink = sink or self._directory_sink
+        if not output_dir:
+            archive_dir, archive_name = os.path.split(archive_path)
+            archive_stem = archive_name
+            for extension in ARCHIVE_EXTENSIONS:
+                if archive_name.lower().endswith(extension):
+                    archive_stem = archive_name[:-len(extension)]
+                    break
+            output_dir = os.path.join(sink.default_output_dir(archive_dir), archive_stem)
+        
+        spill_dir = None
+        try:
+            from utils.archive_utils import iter_archive_members
+            for member in iter_archive_members(archive_path):
+                seq = next(seq_counter) if seq_counter is not None else None
+                member_dir, member_file = posixpath.split(member.name)
+                target_dir = os.path.join(output_dir, *member_dir.split('/')) if member_dir else output_dir
+                
+                try:
+                    reason = self.check_conversion(member.name, output_format)
+                    if reason:
+                        raise Exception(reason)
+                    
+                    # 成员输出不使用输出目录布局（子目录取决于成员路径而不是暂存文件），
+                    # 以 归档路径/成员路径 登记，重名时的改名在每次运行中相同
+                    output_path = self.output_layout.claim(
+                        os.path.join(archive_path, *member.name.split('/')),
+                        os.path.join(target_dir, self._output_name(
+                            os.path.splitext(member_file)[0], output_format, keep_original_name))
+                    )
+                    if (member.extension in STDIN_READERS and not self.filters
+                            and options.get('html_assets', 'inline') == 'inline'
+                            and not any(value for key, value in options.items()
+                                        if key != 'html_assets')):
+                        output_path, status = self._convert_member_stream(
+                            member, output_format, output_path, sink, seq
+                        )
+                    else:
+                        # 需要随机访问的格式先写入本地临时目录
+                        if spill_dir is None:
+                            spill_dir = tempfile.mkdtemp(prefix="docuflow_archive_",
+                                                         dir=get_scratch_dir())
+                        spill_path = os.path.join(spill_dir, member_file)
+                        with open(spill_path, 'wb') as f:
+                            shutil.copyfileobj(member.fileobj, f, 1024 * 1024)
+                        os.utime(spill_path, (member.mtime, member.mtime))
+                        try:
+                            output_path, status = self.convert_file_detailed(
+                                spill_path, output_format, target_dir, keep_original_name,
+                                sink=sink, seq=seq, output_path=output_path, **options
+                            )
+                        finally:
+                            os.remove(spill_path)
+                except Exception as e:
+                    sink.discard(seq)
+                    yield member.name, None, None, str(e)
+                    continue
+                
+                yield member.name, output_path, status, None
+        finally:
+            if spill_dir:
+                shutil.rmtree(spill_dir, ignore_errors=True)
+    
+    def _convert_member_stream(self, member, output_format, output_path, sink, seq):
+        """将归档成员通过标准输入流式传给pandoc转换"""
+        file_base = os.path.splitext(posixpath.basename(member.name))[0]
+        sink.prepare(os.path.dirname(output_path))
+        
+        # 读取开头部分判断文档是否自带标题，没有时与按文件转换一样使用文件名作为页面标题
+        head = member.fileobj.read(STREAM_HEAD_SIZE)
+        reason = check_stream_head(member.name, head, complete=len(head) < STREAM_HEAD_SIZE)
+        if reason:
+            raise Exception(reason)
+        
+        args = ["-f", STDIN_READERS[member.extension]]
         if output_format.lower() == ".html":
-            cmd.extend(["--standalone", "--self-contained"])
+            args.extend(["--standalone", "--self-contained"])
+            if not TITLE_RE.search(head):
+                args.extend(["--metadata", f"pagetitle={file_base}"])
         elif output_format.lower() == ".epub":
-            cmd.extend(["--epub-cover-image=", "--epub-metadata="])
+            args.extend(["--epub-cover-image=", "--epub-metadata="])
+        
+        tmp_path = sink.temp_path(output_path)
+        args.extend(["-o", tmp_path])
+        try:
+            self._run_pandoc_stream(args, member.fileobj, source_date_epoch=member.mtime,
+                                    head=head)
+        except Exception as e:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise Exception(f"转换失败: {str(e)}") from e
+        
+        status = sink.commit_file(tmp_path, output_path, seq)
+        self._record_write(status)
+        return output_path, status
+    
+    def _convert_with_pandoc(self, input_path, output_path, input_format, output_format,
+                             asset_store=None, sink=None, seq=None):
+        """使用pandoc执行转换
+        
+        启用暂存区时，源文件与资源先复制到本地（见 converter.staging），
+        共享资源与共享媒体目录的转换同样读取本地副本。
+        
+        Returns:
+            str: 写入状态，"written" 或 "unchanged"
+        """
+        sink = sink or self._directory_sink
+        staging = self.staging
+        if staging is None:
+            return self._convert_staged(input_path, output_path, input_format, output_format,
+                                        asset_store, sink, seq)
+        
+        # 源文件与资源先复制到本地暂存区，pandoc在本地读写，输出再一次性写回
+        resource_bases = self._resource_bases(input_path)
+        if asset_store and output_format.lower() == ".html":
+            resource_bases = self._shared_asset_bases(input_path)
+        with staging.stage(input_path, resource_bases) as staged:
+            return self._convert_staged(input_path, output_path, input_format, output_format,
+                                        asset_store, sink, seq, staged)
+    
+    def _convert_staged(self, input_path, output_path, input_format, output_format,
+                        asset_store, sink, seq, staged=None):
+        """按输出方式执行转换，staged 为暂存到本地的任务（没有暂存时为None）"""
+        if asset_store and output_format.lower() == ".html":
+            return self._convert_html_with_shared_assets(input_path, output_path, asset_store,
+                                                         sink, staged)
+        if asset_store and output_format.lower() == ".md":
+            return self._convert_markdown_with_shared_media(input_path, output_path, asset_store,
+                                                            sink, staged)
+        return self._run_pandoc_to_sink(input_path, output_path, input_format, output_format,
+                                        sink, seq, staged)
+    
+    def _resource_bases(self, input_path):
+        """pandoc查找相对路径资源的目录，按搜索顺序"""
+        if self.filters:
+            return [os.path.dirname(os.path.abspath(input_path)), "."]
+        return ["."]
+    
+    def _run_pandoc_to_sink(self, input_path, output_path, input_format, output_format, sink,
+                            seq, staged=None):
+        """运行pandoc生成输出并提交
+        
+        Args:
+            staged: 暂存到本地的任务（converter.staging.StagedInput），
+                设置时从本地副本读取，输出写入暂存目录后一次性提交
+        """
+        # 先输出到临时文件，再提交
+        tmp_path = staged.output_path(output_path) if staged else sink.temp_path(output_path)
+        
+        # 经过过滤器的 .docx/.epub 需要把内嵌媒体提取出来，写出阶段才能找到（转换为 .md 时保留原引用）
+        media_dir = None
+        if (self.filters and input_format.lower() in (".docx", ".epub")
+                and output_format.lower() != ".md"):
+            media_dir = tempfile.mkdtemp(prefix="docuflow_media_", dir=get_scratch_dir())
+        
+        try:
+            # 准备pandoc命令
+            args, input_data = self._pandoc_source(input_path, output_format, media_dir, staged)
+            args.extend(["-o", tmp_path])
+            
+            # 添加特定格式的参数
+            if output_format.lower() == ".html":
+                args.extend(["--standalone", "--self-contained"])
+            elif output_format.lower() == ".epub":
+                args.extend(["--epub-cover-image=", "--epub-metadata="])
+            
+            # 执行命令，以源文件修改时间作为输出元数据时间戳，使未变化的输入得到相同的输出
+            self._run_pandoc(args, input_data=input_data,
+                             source_date_epoch=os.path.getmtime(input_path))
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        finally:
+            if media_dir:
+                shutil.rmtree(media_dir, ignore_errors=True)
+        
+        if staged:
+            with open(tmp_path, 'rb') as f:
+                data = f.read()
+            self.staging.record_output(len(data))
+            return sink.commit_bytes(data, output_path, seq)
+        return sink.commit_file(tmp_path, output_path, seq)
+    
+    def _pandoc_source(self, input_path, output_format, media_dir=None, staged=None):
+        """构造pandoc命令的输入部分
+        
+        没有注册过滤器时由pandoc直接读取源文件。否则先读取为JSON AST，
+        在进程内一次遍历运行整个过滤器链，写出阶段再从标准输入读取处理后的AST，
+        无论注册多少个过滤器都只启动两个pandoc进程。
+        
+        Args:
+            input_path: 源文件路径
+            output_format: 输出格式
+            media_dir: 提取媒体文件的目录，如果为None则不提取
+            staged: 暂存到本地的任务，设置时读取本地副本，资源副本目录排在资源搜索路径最前
+            
+        Returns:
+            tuple: (pandoc参数列表, 标准输入数据)，直接读取源文件时标准输入数据为None
+        """
+        source_path = staged.path if staged else input_path
+        media_args = [f"--extract-media={media_dir}"] if media_dir else []
+        resource_bases = self._resource_bases(input_path)
+        if not self.filters:
+            resource_args = staged.resource_args(resource_bases) if staged else []
+            return [source_path] + media_args + resource_args, None
+        
+        import json
+        input_format = get_file_extension(input_path)
+        result = self._run_pandoc([source_path, "-t", "json"] + media_args
+                                  + self.filters.reader_args(input_format))
+        # 过滤器读取的相对路径资源：提取的媒体、暂存的资源副本，其后为pandoc的资源搜索路径
+        resource_paths = ([media_dir] if media_dir else []) \
+            + ([staged.resource_dir] if staged and staged.resource_dir else []) + resource_bases
+        doc = self.filters.apply(json.loads(result.stdout), output_format, resource_paths)
+        
+        if staged:
+            args = ["-f", "json"] + staged.resource_args(resource_bases)
+        else:
+            args = ["-f", "json", f"--resource-path={os.pathsep.join(resource_bases)}"]
+        # 从标准输入读取时pandoc不知道文件名，与直接转换一样用文件名作为HTML页面标题
+        meta = doc.get('meta', {})
+        if output_format.lower() == ".html" and 'title' not in meta and 'pagetitle' not in meta:
+            file_base = os.path.splitext(os.path.basename(input_path))[0]
+            args.extend(["--metadata", f"pagetitle={file_base}"])
+        return args, json.dumps(doc, ensure_ascii=False).encode('utf-8')
+    
+    @staticmethod
+    def _shared_asset_bases(input_path):
+        """共享资源转换中pandoc查找相对路径资源的目录，按搜索顺序"""
+        return [os.path.dirname(os.path.abspath(input_path)), "."]
+    
+    def _convert_html_with_shared_assets(self, input_path, output_path, asset_store, sink,
+                                         staged=None):
+        """转换为引用共享资源库的HTML，而不是把资源内嵌到每个文件"""
+        source_dir = os.path.dirname(os.path.abspath(input_path))
+        resource_bases = self._shared_asset_bases(input_path)
+        
+        with tempfile.TemporaryDirectory(prefix="docuflow_media_") as media_dir:
+            args, input_data = self._pandoc_source(input_path, ".html", media_dir, staged)
+            result = self._run_pandoc(args + ["-t", "html", "--standalone"] + (
+                staged.resource_args(resource_bases) if staged
+                else [f"--resource-path={os.pathsep.join(resource_bases)}"]
+            ), input_data=input_data)
+            html = result.stdout.decode('utf-8')
+            html = asset_store.externalize_html(html, output_path, [media_dir, source_dir])
+        
+        data = html.encode('utf-8')
+        if staged:
+            self.staging.record_output(len(data))
+        return sink.commit_bytes(data, output_path)
+    
+    def _convert_markdown_with_shared_media(self, input_path, output_path, media_store, sink,
+                                            staged=None):
+        """转换为Markdown，并将提取的媒体文件按内容哈希去重保存到共享媒体目录"""
+        with tempfile.TemporaryDirectory(prefix="docuflow_media_") as extract_dir:
+            args, input_data = self._pandoc_source(input_path, ".md", extract_dir, staged)
+            result = self._run_pandoc(args + ["-t", "markdown"], input_data=input_data)
+            markdown = result.stdout.decode('utf-8')
+            
+            # 收集提取出的媒体文件，较长的路径优先替换，避免前缀误替换
+            extracted = []
+            for root, dirs, filenames in os.walk(extract_dir):
+                for filename in filenames:
+                    extracted.append(os.path.join(root, filename))
+            extracted.sort(key=len, reverse=True)
+            
+            output_dir = os.path.dirname(os.path.abspath(output_path))
+            for media_path in extracted:
+                stored_path = media_store.add_file(media_path)
+                relative_url = os.path.relpath(stored_path, output_dir).replace(os.sep, '/')
+                markdown = markdown.replace(media_path.replace(os.sep, '/'), relative_url)
+                markdown = markdown.replace(media_path, relative_url)
         
-        # 执行命令
-        result = subprocess.run(cmd, capture_output=True, text=True, check=False)
+        data = markdown.encode('utf-8')
+        if staged:
+            self.staging.record_output(len(data))
+        return sink.commit_bytes(data, output_path)
+    
+    def get_asset_store(self, asset_dir):
+        """获取指定目录的共享资源库，同一目录在整个批次中共用一个实例
+        
+        Args:
+            asset_dir: 资源目录
+            
+        Returns:
+            AssetStore: 资源库
+        """
+        asset_dir = os.path.abspath(str(asset_dir))
+        with self._init_lock:
+            if asset_dir not in self._asset_stores:
+                from converter.assets import AssetStore
+                self._asset_stores[asset_dir] = AssetStore(asset_dir)
+            return self._asset_stores[asset_dir]
+    
+    def _record_write(self, status):
+        """记录输出写入状态"""
+        with self._stats_lock:
+            self.write_stats[status] += 1
+    
+    @property
+    def asset_stats(self):
+        """所有共享资源库（含共享媒体目录）的汇总统计信息"""
+        totals = {'stored': 0, 'deduplicated': 0, 'bytes_written': 0, 'bytes_saved': 0}
+        for store in list(self._asset_stores.values()):
+            for key in totals:
+                totals[key] += store.stats[key]
+        return totals
+    
+    def _run_pandoc(self, args, input_data=None, source_date_epoch=None):
+        """执行pandoc命令
+        
+        Args:
+            args: pandoc参数列表（不含程序名）
+            input_data: 通过标准输入传给pandoc的字节数据
+            source_date_epoch: 写入 .docx/.epub 元数据的时间戳，固定后相同输入得到相同输出
+            
+        Returns:
+            subprocess.CompletedProcess: 执行结果，stdout为字节串
+        """
+        timeout = self.pandoc_timeout
+        try:
+            result = subprocess.run(["pandoc"] + pandoc_rts_args() + list(args),
+                                    input=input_data,
+                                    capture_output=True,
+                                    env=self._pandoc_env(source_date_epoch),
+                                    timeout=timeout,
+                                    check=False)
+        except FileNotFoundError:
+            raise Exception(PANDOC_MISSING_MESSAGE)
+        except subprocess.TimeoutExpired:
+            raise Exception(f"pandoc 转换超时（超过 {timeout} 秒）")
         
         if result.returncode != 0:
-            error_msg = result.stderr.strip() or "未知错误"
-            raise Exception(error_msg)
+            raise Exception(self._pandoc_error(result.returncode, result.stderr))
         
-        return output_path
+        return result
+    
+    def _run_pandoc_stream(self, args, fileobj, source_date_epoch=None, head=b""):
+        """执行pandoc命令，将文件对象的内容分块写入标准输入
+        
+        Args:
+            args: pandoc参数列表（需包含 -o 输出路径）
+            fileobj: 可读取输入内容的文件对象
+            source_date_epoch: 写入 .docx/.epub 元数据的时间戳
+            head: 已从文件对象中读出的开头部分，先于剩余内容写入
+        """
+        with tempfile.TemporaryFile() as stderr_file:
+            try:
+                process = subprocess.Popen(["pandoc"] + pandoc_rts_args() + list(args),
+                                           stdin=subprocess.PIPE,
+                                           stdout=subprocess.DEVNULL,
+                                           stderr=stderr_file,
+                                           env=self._pandoc_env(source_date_epoch))
+            except FileNotFoundError:
+                raise Exception(PANDOC_MISSING_MESSAGE)
+            # 超时后终止pandoc，写入标准输入的阻塞也随之结束
+            timeout = self.pandoc_timeout
+            expired = threading.Event()
+            
+            def kill():
+                expired.set()
+                process.kill()
+            
+            timer = None
+            if timeout:
+                timer = threading.Timer(timeout, kill)
+                timer.daemon = True
+                timer.start()
+            try:
+                process.stdin.write(head)
+                shutil.copyfileobj(fileobj, process.stdin, 1024 * 1024)
+                process.stdin.close()
+            except BrokenPipeError:
+                # pandoc提前退出，错误信息见stderr
+                pass
+            returncode = process.wait()
+            if timer is not None:
+                timer.cancel()
+            
+            if expired.is_set():
+                raise Exception(f"pandoc 转换超时（超过 {timeout} 秒）")
+            if returncode != 0:
+                stderr_file.seek(0)
+                raise Exception(self._pandoc_error(returncode, stderr_file.read()))
     
-    def batch_convert(self, file_paths, output_format, output_dir=None, keep_original_name=True):
+    @staticmethod
+    def _pandoc_error(returncode, stderr):
+        """由pandoc的退出码与错误输出构造错误信息"""
+        error_msg = stderr.decode('utf-8', errors='replace').strip()
+        if returncode < 0:
+            # 被信号终止（如内存不足时被系统杀死），通常不是文档本身的问题
+            signal_msg = f"pandoc 被信号 {-returncode} 终止"
+            return f"{signal_msg}: {error_msg}" if error_msg else signal_msg
+        return error_msg or "未知错误"
+    
+    @staticmethod
+    def _pandoc_env(source_date_epoch):
+        """构造pandoc进程的环境变量"""
+        if source_date_epoch is not None and "SOURCE_DATE_EPOCH" not in os.environ:
+            return dict(os.environ, SOURCE_DATE_EPOCH=str(int(source_date_epoch)))
+        return None
+    
+    def _get_incremental_renderer(self):
+        """获取增量渲染器（首次使用时创建）"""
+        with self._init_lock:
+            if self._incremental_renderer is None:
+                cache_dir = self.cache_dir
+                if cache_dir is None:
+                    from config import config
+                    cache_dir = config.conversion.cache_dir
+                from converter.incremental import IncrementalRenderer
+                self._incremental_renderer = IncrementalRenderer(self, cache_dir)
+            return self._incremental_renderer
+    
+    @property
+    def incremental_stats(self):
+        """最近一次增量渲染的统计信息（章节数、重新渲染数、缓存复用数），整篇转换时为None"""
+        if self._incremental_renderer is None:
+            return None
+        return self._incremental_renderer.last_stats
+    
+    def iter_convert(self, file_paths, output_format, output_dir=None, keep_original_name=True,
+                     max_workers=None, sink=None, window=None, priority=None, **options):
+        """流式批量转换，按完成顺序逐个产出结果
+        
+        与 batch_convert 不同，失败不会被忽略，每个输入都产出包含状态、错误信息、
+        耗时与大小的结果，调用方可以在整批完成前开始后续处理（上传、建立索引等）。
+        输入可以是惰性的可迭代对象，同时在途的任务数有上限，内存占用与输入总数无关。
+        
+        Args:
+            file_paths: 源文件路径的可迭代对象（如目录扫描生成器），可包含 zip/tar 归档
+            output_format: 输出格式
+            output_dir: 输出目录，如果为None则使用源文件目录
+            keep_original_name: 是否保留原文件名
+            max_workers: 同时转换的文件数，如果为None则使用配置中的 max_workers
+            sink: 输出目标，由调用方负责关闭
+            window: 同时在途的任务数上限，如果为None则为并发数的两倍
+            priority: 优先级通道，如果为None则使用配置中的 priority
+            **options: 传给 convert_file_detailed 的其他选项
+            
+        Yields:
+            ConversionResult: 转换结果（见 converter.engine），包含输入、输出、状态、
+                错误信息、耗时与输入/输出大小
+        """
+        from converter.engine import ConversionEngine
+        engine = ConversionEngine(self, max_workers=max_workers, dedup="off", priority=priority)
+        yield from engine.iter_run(file_paths, output_format, output_dir, keep_original_name,
+                                   sink=sink, window=window, **options)
+    
+    def batch_convert(self, file_paths, output_format, output_dir=None, keep_original_name=True,
+                      incremental=None, html_assets=None, asset_dir=None,
+                      extract_media=None, media_dir=None, sink=None, dedup="auto"):
         """批量转换文件
         
+        输出到目录时，内容相同的输入只转换一次，其余输出由其输出生成（见 converter.dedup）。
+        
         Args:
-            file_paths: 源文件路径列表
+            file_paths: 源文件路径（列表或任意可迭代对象），可包含 zip/tar 归档
             output_format: 输出格式
             output_dir: 输出目录
             keep_original_name: 是否保留原文件名
+            incremental: 是否启用增量渲染，如果为None则按配置决定
+            html_assets: HTML资源处理方式（"inline" 或 "shared"），如果为None则按配置决定
+            asset_dir: 共享资源目录，整个批次共用
+            extract_media: 是否提取 .docx/.epub 中的媒体文件并去重保存，如果为None则按配置决定
+            media_dir: 共享媒体目录，整个批次共用
+            sink: 输出目标（如 ArchiveSink），条目按输入顺序写入；由调用方负责关闭
+            dedup: 重复输入的处理方式（"auto"、"hardlink"、"copy" 或 "off"），归档输出时不检测
             
         Returns:
             list: 成功转换的文件路径列表
         """
+        # 查找重复输入与转换都要遍历输入，生成器只能遍历一次
+        file_paths = list(file_paths)
         converted_files = []
+        options = self.conversion_options(dict(
+            incremental=incremental, html_assets=html_assets, asset_dir=asset_dir,
+            extract_media=extract_media, media_dir=media_dir
+        ))
+        seq_counter = itertools.count()
+        
+        # 重复输入：文件路径 -> 代表文件路径
+        representatives = {}
+        if dedup != "off" and (sink is None or not sink.is_archive):
+            from converter.dedup import find_duplicates
+            candidates = [path for path in file_paths if not is_archive_file(path)]
+            representatives = {candidates[duplicate]: candidates[representative]
+                               for duplicate, representative in find_duplicates(
+                                   candidates, output_format, output_dir, options).items()}
+        converted = {}
         
         for file_path in file_paths:
+            # 归档输入：直接转换其中的文档
+            if is_archive_file(file_path):
+                try:
+                    for _, output_path, _, error in self.iter_convert_archive(
+                            file_path, output_format, output_dir, keep_original_name,
+                            sink=sink, seq_counter=seq_counter, **options):
+                        if output_path:
+                            converted_files.append(output_path)
+                except Exception:
+                    # 损坏的归档不影响其他文件
+                    pass
+                continue
+            
+            # 不能转换的文件不安排任务，也不占用提交序号
+            if self.check_conversion(file_path, output_format):
+                continue
+            
             try:
-                output_path = self.convert_file(
-                    file_path, output_format, output_dir, keep_original_name
-                )
+                representative = representatives.get(file_path)
+                if representative is not None:
+                    if representative not in converted:
+                        continue
+                    source_output, elapsed = converted[representative]
+                    output_path, _ = self.materialize_duplicate(
+                        source_output, file_path, output_format, output_dir, keep_original_name,
+                        dedup, saved_seconds=elapsed
+                    )
+                else:
+                    started = time.perf_counter()
+                    output_path = self.convert_file(
+                        file_path, output_format, output_dir, keep_original_name,
+                        sink=sink, seq=next(seq_counter), **options
+                    )
+                    converted[file_path] = (output_path, time.perf_counter() - started)
                 if output_path:
                     converted_files.append(output_path)
             except Exception:
@@ -0,0 +1,472 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+DocuFlow - 并发转换引擎
+使用线程池同时运行多个 pandoc 进程，单个文件失败不影响其他文件，
+支持在批次进行中取消。任务提交到进程内共享的调度器（见 converter.scheduler），
+按优先级通道与提交方公平分配线程
+"""
+
+import os
+import time
+import itertools
+import threading
+from utils.archive_utils import is_archive_file
+from converter.output import WRITTEN, UNCHANGED
+
+# 转换结果状态（成功时为 output 模块中的 WRITTEN/UNCHANGED）
+FAILED = "failed"
+CANCELLED = "cancelled"
+# 之前反复失败且输入与转换环境都未变化，本次直接跳过（见 converter.quarantine）
+QUARANTINED = "quarantined"
+
+
+class ConversionResult:
+    """单个文件（或归档成员）的转换结果"""
+
+    __slots__ = ('file_path', 'output_path', 'status', 'error', 'member', 'duplicate_of',
+                 'elapsed', 'input_size', 'output_size')
+
+    def __init__(self, file_path, output_path=None, status=FAILED, error=None, member=None,
+                 duplicate_of=None, elapsed=None, input_size=None, output_size=None):
+        """初始化转换结果
+
+        Args:
+            file_path: 源文件路径（归档成员为归档路径）
+            output_path: 输出文件路径，失败或取消时为None
+            status: WRITTEN、UNCHANGED、FAILED、CANCELLED 或 QUARANTINED
+            error: 失败原因
+            member: 归档成员路径，普通文件为None
+            duplicate_of: 内容相同的代表文件路径，输出由其输出生成而未重新转换时设置
+            elapsed: 转换耗时（秒），未开始转换时为None
+            input_size: 输入大小（字节），未知时为None
+            output_size: 输出大小（字节），输出到归档或转换失败时为None
+        """
+        self.file_path = file_path
+        self.output_path = output_path
+        self.status = status
+        self.error = error
+        self.member = member
+        self.duplicate_of = duplicate_of
+        self.elapsed = elapsed
+        self.input_size = input_size
+        self.output_size = output_size
+
+    @property
+    def ok(self):
+        """是否转换成功"""
+        return self.status in (WRITTEN, UNCHANGED)
+
+    @property
+    def name(self):
+        """显示用的名称"""
+        return f"{self.file_path}:{self.member}" if self.member else self.file_path
+
+    def __repr__(self):
+        return f"ConversionResult({self.name!r}, status={self.status!r})"
+
+
+def _log_result(logger, result):
+    """记录单个结果（日志经队列写出，不阻塞）"""
+    if result.ok:
+        logger.debug("%s -> %s (%s)", result.name, result.output_path, result.status,
+                     extra={'status': result.status, 'duplicate_of': result.duplicate_of,
+                            'elapsed': result.elapsed})
+    else:
+        logger.info("%s: %s %s", result.name, result.status, result.error or "",
+                    extra={'status': result.status})
+
+
+def _file_size(path):
+    """文件大小，文件不存在时返回None"""
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return None
+
+
+class ConversionEngine:
+    """并发转换引擎"""
+
+    def __init__(self, converter=None, max_workers=None, dedup=None, priority=None, weight=1.0,
+                 scheduler=None, microbatch=None):
+        """初始化转换引擎
+
+        Args:
+            converter: DocumentConverter 实例，如果为None则创建新实例
+            max_workers: 本引擎同时转换的文件数上限，如果为None则使用配置中的 max_workers
+            dedup: 重复输入的处理方式（见 converter.dedup.DEDUP_MODES），
+                如果为None则使用配置中的 dedup
+            priority: 优先级通道（"interactive"、"normal" 或 "bulk"），
+                如果为None则使用配置中的 priority
+            weight: 同一通道内与其他提交方公平分配时的权重
+            scheduler: 调度器，如果为None则使用进程内共享的调度器
+            microbatch: 合并到一个pandoc进程批量转换的小文件大小上限（字节，见 converter.microbatch），
+                0表示不批量，如果为None则使用配置中的 microbatch_max_size
+        """
+        if converter is None:
+            from converter.document_converter import DocumentConverter
+            converter = DocumentConverter()
+        if max_workers is None or dedup is None or priority is None or microbatch is None:
+            from config import config
+            max_workers = config.conversion.max_workers if max_workers is None else max_workers
+            dedup = config.conversion.dedup if dedup is None else dedup
+            priority = config.conversion.priority if priority is None else priority
+            microbatch = config.conversion.microbatch_max_size if microbatch is None else microbatch
+        self.converter = converter
+        self.max_workers = max(1, max_workers)
+        self.dedup = dedup
+        self.priority = priority
+        self.weight = weight
+        self.microbatch = max(0, microbatch)
+        self._scheduler = scheduler
+        self._cancel_event = threading.Event()
+
+    def cancel(self):
+        """取消当前批次：尚未开始的文件不再转换，正在转换的文件会完成"""
+        self._cancel_event.set()
+
+    @property
+    def cancelled(self):
+        """当前批次是否已取消"""
+        return self._cancel_event.is_set()
+
+    def _submit(self, fn, *args):
+        """按本引擎的优先级与并发上限提交任务"""
+        if self._scheduler is None:
+            from converter.scheduler import get_scheduler
+            self._scheduler = get_scheduler()
+        self._scheduler.ensure_workers(self.max_workers)
+        return self._scheduler.submit(fn, *args, priority=self.priority, submitter=self,
+                                      weight=self.weight, max_running=self.max_workers)
+
+    def run(self, file_paths, output_format, output_dir=None, keep_original_name=True,
+            sink=None, on_result=None, **options):
+        """并发转换一批文件
+
+        普通文件先通过能力索引校验，不能转换的文件直接记为失败，不进入线程池；
+        其余文件按输入顺序分配提交序号，并发转换；归档输入在普通文件之后依次读取。
+        使用 ArchiveSink 时条目仍按序号顺序写入，结果与串行转换一致。
+        输出到目录时，内容相同的输入只转换一次，其余输出由其输出生成（见 converter.dedup）。
+        大量小文件分批合并到一个pandoc进程中转换（见 converter.microbatch），输出不变。
+
+        Args:
+            file_paths: 源文件路径列表，可包含 zip/tar 归档
+            output_format: 输出格式
+            output_dir: 输出目录
+            keep_original_name: 是否保留原文件名
+            sink: 输出目标，由调用方负责关闭
+            on_result: 每完成一个文件时调用的回调，参数为 ConversionResult；
+                在调用 run 的线程中执行
+            **options: 传给 convert_file_detailed 的其他选项，未指定的按配置决定
+
+        Returns:
+            list: ConversionResult 列表，普通文件按输入顺序，随后为归档成员
+            
+        Raises:
+            Exception: pandoc不可用时，在开始任何转换前抛出
+        """
+        import logging
+        from concurrent.futures import as_completed
+
+        logger = logging.getLogger(__name__)
+
+        def emit(result):
+            """记录日志并通知调用方"""
+            _log_result(logger, result)
+            if on_result:
+                on_result(result)
+
+        self._cancel_event.clear()
+        options = self.converter.conversion_options(options)
+        files = [path for path in file_paths if not is_archive_file(path)]
+        archives = [path for path in file_paths if is_archive_file(path)]
+        seq_counter = itertools.count()
+
+        results = [None] * len(files)
+        jobs = []
+        for index, path in enumerate(files):
+            reason = self.converter.check_conversion(path, output_format) \
+                or self._reserve_output(path, output_format, output_dir, keep_original_name, sink)
+            if reason:
+                results[index] = ConversionResult(path, error=reason)
+            else:
+                results[index] = self._quarantined(path, output_format, options)
+            if results[index] is not None:
+                emit(results[index])
+            else:
+                jobs.append(index)
+
+        # 重复输入跟随其代表文件，不单独提交
+        followers = {}
+        if self.dedup != 'off' and (sink is None or not sink.is_archive):
+            from converter.dedup import find_duplicates
+            duplicates = find_duplicates([files[index] for index in jobs], output_format,
+                                         output_dir, options)
+            for duplicate, representative in duplicates.items():
+                followers.setdefault(jobs[representative], []).append(jobs[duplicate])
+            jobs = [index for position, index in enumerate(jobs) if position not in duplicates]
+
+        # 小文件分批（有重复输入跟随的文件单独转换），批次从其第一个文件的位置提交；
+        # 批量转换由pandoc直接读取源文件，启用本地暂存时不分批
+        batches = {}
+        if self.microbatch and not self.converter.filters and self.converter.staging is None:
+            from converter.microbatch import plan_batches
+            for batch in plan_batches([(index, files[index]) for index in jobs
+                                       if index not in followers],
+                                      output_format, self.max_workers, self.microbatch, options):
+                batches[batch[0]] = batch
+        batched = {index for batch in batches.values() for index in batch}
+
+        seqs = {index: next(seq_counter) for index in jobs}
+        futures = []
+        for index in jobs:
+            if index in batches:
+                futures.append(self._submit(self._convert_batch, files, batches[index],
+                                            [seqs[member] for member in batches[index]],
+                                            output_format, output_dir, keep_original_name, sink))
+            elif index not in batched:
+                futures.append(self._submit(self._convert_group, files, index,
+                                            followers.get(index, ()), seqs[index], output_format,
+                                            output_dir, keep_original_name, sink, options))
+        for future in as_completed(futures):
+            for index, result in future.result():
+                results[index] = result
+                emit(result)
+
+        for archive_path in archives:
+            for result in self._convert_archive(archive_path, output_format, output_dir,
+                                                keep_original_name, sink, seq_counter, options):
+                results.append(result)
+                emit(result)
+
+        return results
+
+    def iter_run(self, file_paths, output_format, output_dir=None, keep_original_name=True,
+                 sink=None, window=None, **options):
+        """流式并发转换，按完成顺序逐个产出结果
+
+        file_paths 可以是任意可迭代对象（包括惰性扫描目录的生成器），只在有空闲位置时
+        才读取下一个输入，同时在途的任务不超过 window 个，内存占用与输入总数无关。
+        提交序号按读取顺序分配，归档输入在读到时依次转换，ArchiveSink 的条目顺序与 run 一致。
+        不做批次内重复检测（需要预先看到全部输入）。
+
+        取消后不再读取新的输入，尚未开始的任务产出 CANCELLED 结果；
+        调用方提前停止迭代时，尚未开始的任务被放弃，正在转换的文件会完成。
+
+        Args:
+            file_paths: 源文件路径的可迭代对象，可包含 zip/tar 归档
+            output_format: 输出格式
+            output_dir: 输出目录
+            keep_original_name: 是否保留原文件名
+            sink: 输出目标，由调用方负责关闭
+            window: 同时在途的任务数上限，如果为None则为并发数的两倍
+            **options: 传给 convert_file_detailed 的其他选项，未指定的按配置决定
+
+        Yields:
+            ConversionResult: 每个文件（或归档成员）的结果
+
+        Raises:
+            Exception: pandoc不可用时，在开始任何转换前抛出
+        """
+        import logging
+        from concurrent.futures import wait, FIRST_COMPLETED
+
+        logger = logging.getLogger(__name__)
+        window = max(1, window or self.max_workers * 2)
+        self._cancel_event.clear()
+        options = self.converter.conversion_options(options)
+        seq_counter = itertools.count()
+        pending = {}
+
+        def finished(block):
+            """取出已完成的任务结果，block 为真时至少等待一个"""
+            if block:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            else:
+                done = [future for future in pending if future.done()]
+            for future in done:
+                del pending[future]
+                result = future.result()
+                _log_result(logger, result)
+                yield result
+
+        try:
+            for path in file_paths:
+                if self.cancelled:
+                    break
+                if is_archive_file(path):
+                    for result in self._convert_archive(path, output_format, output_dir,
+                                                        keep_original_name, sink, seq_counter,
+                                                        options):
+                        _log_result(logger, result)
+                        yield result
+                    continue
+
+                reason = self.converter.check_conversion(path, output_format) \
+                    or self._reserve_output(path, output_format, output_dir, keep_original_name,
+                                            sink)
+                result = ConversionResult(path, error=reason, input_size=_file_size(path)) \
+                    if reason else self._quarantined(path, output_format, options)
+                if result is not None:
+                    _log_result(logger, result)
+                    yield result
+                    continue
+
+                seq = next(seq_counter)
+                pending[self._submit(self._convert_one, path, seq, output_format, output_dir,
+                                     keep_original_name, sink, options)] = seq
+                yield from finished(len(pending) >= window)
+
+            while pending:
+                yield from finished(True)
+        finally:
+            # 调用方提前停止迭代：放弃尚未开始的任务，等待正在转换的文件完成
+            for future, seq in pending.items():
+                if future.cancel() and sink is not None:
+                    sink.discard(seq)
+            wait(pending)
+
+    def _reserve_output(self, file_path, output_format, output_dir, keep_original_name, sink):
+        """按输入顺序预先分配输出路径，使重名输出中保留原文件名的总是先输入的文件
+
+        Returns:
+            str: 无法确定输出路径的原因，成功时返回None
+        """
+        try:
+            self.converter.output_path_for(file_path, output_format, output_dir,
+                                           keep_original_name, sink)
+        except Exception as e:
+            return str(e)
+        return None
+
+    def _quarantined(self, file_path, output_format, options):
+        """已隔离的输入返回 QUARANTINED 结果，否则返回None"""
+        entry = self.converter.quarantined(file_path, output_format, **options)
+        if entry is None:
+            return None
+        return ConversionResult(file_path, status=QUARANTINED,
+                                error=f"之前已失败 {entry['failures']} 次: "
+                                      f"{(entry['error'].splitlines() or [''])[0]}",
+                                input_size=_file_size(file_path))
+
+    def _convert_group(self, files, index, duplicates, seq, output_format, output_dir,
+                       keep_original_name, sink, options):
+        """在工作线程中转换代表文件，再由其输出生成重复文件的输出
+
+        Returns:
+            list: [(输入下标, ConversionResult), ...]，代表文件在前
+        """
+        file_path = files[index]
+        result = self._convert_one(file_path, seq, output_format, output_dir,
+                                   keep_original_name, sink, options)
+        results = [(index, result)]
+
+        for duplicate in duplicates:
+            duplicate_path = files[duplicate]
+            if not result.ok:
+                results.append((duplicate, ConversionResult(duplicate_path, status=result.status,
+                                                            error=result.error,
+                                                            duplicate_of=file_path)))
+                continue
+            started = time.perf_counter()
+            try:
+                output_path, status = self.converter.materialize_duplicate(
+                    result.output_path, duplicate_path, output_format, output_dir,
+                    keep_original_name, self.dedup, saved_seconds=result.elapsed
+                )
+                results.append((duplicate, ConversionResult(
+                    duplicate_path, output_path, status, duplicate_of=file_path,
+                    elapsed=time.perf_counter() - started, input_size=result.input_size,
+                    output_size=result.output_size
+                )))
+            except Exception as e:
+                results.append((duplicate, ConversionResult(duplicate_path, error=str(e),
+                                                            duplicate_of=file_path)))
+        return results
+
+    def _convert_batch(self, files, indexes, seqs, output_format, output_dir, keep_original_name,
+                       sink):
+        """在工作线程中批量转换一批小文件
+
+        Returns:
+            list: [(输入下标, ConversionResult), ...]
+        """
+        if self.cancelled:
+            for seq in seqs:
+                if sink is not None:
+                    sink.discard(seq)
+            return [(index, ConversionResult(files[index], status=CANCELLED)) for index in indexes]
+
+        paths = [files[index] for index in indexes]
+        input_sizes = [_file_size(path) for path in paths]
+        started = time.perf_counter()
+        outcomes = self.converter.convert_batch_detailed(paths, output_format, output_dir,
+                                                         keep_original_name, sink=sink, seqs=seqs)
+        # 批次内的文件共用一个pandoc进程，耗时按文件数平均分摊
+        elapsed = (time.perf_counter() - started) / len(paths)
+
+        results = []
+        for index, path, input_size, outcome in zip(indexes, paths, input_sizes, outcomes):
+            if isinstance(outcome, Exception):
+                result = ConversionResult(path, error=str(outcome), elapsed=elapsed,
+                                          input_size=input_size)
+            else:
+                output_path, status = outcome
+                output_size = None if sink is not None and sink.is_archive \
+                    else _file_size(output_path)
+                result = ConversionResult(path, output_path, status, elapsed=elapsed,
+                                          input_size=input_size, output_size=output_size)
+            results.append((index, result))
+        return results
+
+    def _convert_one(self, file_path, seq, output_format, output_dir, keep_original_name,
+                     sink, options):
+        """在工作线程中转换单个文件，异常转换为失败结果"""
+        if self.cancelled:
+            if sink is not None:
+                sink.discard(seq)
+            return ConversionResult(file_path, status=CANCELLED)
+
+        input_size = _file_size(file_path)
+        started = time.perf_counter()
+        try:
+            output_path, status = self.converter.convert_file_detailed(
+                file_path, output_format, output_dir, keep_original_name,
+                sink=sink, seq=seq, **options
+            )
+        except Exception as e:
+            return ConversionResult(file_path, error=str(e), elapsed=time.perf_counter() - started,
+                                    input_size=input_size)
+        elapsed = time.perf_counter() - started
+        output_size = None if sink is not None and sink.is_archive else _file_size(output_path)
+        return ConversionResult(file_path, output_path, status, elapsed=elapsed,
+                                input_size=input_size, output_size=output_size)
+
+    def _convert_archive(self, archive_path, output_format, output_dir, keep_original_name,
+                         sink, seq_counter, options):
+        """依次转换归档中的文档"""
+        if self.cancelled:
+            yield ConversionResult(archive_path, status=CANCELLED)
+            return
+
+        try:
+            # 成员依次转换，两次产出之间的时间即该成员的耗时
+            started = time.perf_counter()
+            for member_name, output_path, status, error in self.converter.iter_convert_archive(
+                    archive_path, output_format, output_dir, keep_original_name,
+                    sink=sink, seq_counter=seq_counter, **options):
+                elapsed = time.perf_counter() - started
+                if output_path:
+                    output_size = None if sink is not None and sink.is_archive \
+                        else _file_size(output_path)
+                    yield ConversionResult(archive_path, output_path, status, member=member_name,
+                                           elapsed=elapsed, output_size=output_size)
+                else:
+                    yield ConversionResult(archive_path, error=error, member=member_name,
+                                           elapsed=elapsed)
+                if self.cancelled:
+                    break
+                started = time.perf_counter()
+        except Exception as e:
+            yield ConversionResult(archive_path, error=f"无法读取归档: {e}")
@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+DocuFlow - 进程内 AST 过滤器
+在 pandoc 的读取与写出之间，直接在进程内对 JSON AST 运行已注册的 Python 过滤器，
+而不是为每个 --filter 启动一个进程并往返序列化一次 JSON。
+AST 只解析一次，所有过滤器在同一次遍历中依次作用于每个元素。
+
+过滤器与 pandocfilters 的 action 约定相同：action(key, value, format, meta)，
+返回None保留元素，返回元素替换，返回列表则替换为多个元素（空列表即删除）。
+有状态的过滤器可以提供 for_document(doc) 方法，返回只用于该文档的过滤器，
+使同一个过滤器链可以被多个线程同时使用；需要读取本地资源（如图片）的过滤器改为提供
+for_resources(doc, format, resource_paths) 方法，额外得到输出格式与解析相对路径的目录列表；
+可以提供 reader_args 属性，声明读取阶段需要的pandoc参数。
+"""
+
+import posixpath
+
+# 输出扩展名对应的pandoc格式名称，作为过滤器的 format 参数
+OUTPUT_FORMAT_NAMES = {
+    '.md': 'markdown',
+    '.html': 'html',
+    '.docx': 'docx',
+    '.epub': 'epub',
+}
+
+
+class FilterPipeline:
+    """按注册顺序在一次遍历中运行的过滤器链"""
+
+    def __init__(self, filters=()):
+        """初始化过滤器链
+
+        Args:
+            filters: 过滤器（action 可调用对象）列表
+        """
+        self._filters = list(filters)
+
+    def add(self, action):
+        """注册过滤器，返回过滤器本身（可用作装饰器）"""
+        self._filters.append(action)
+        return action
+
+    def __len__(self):
+        return len(self._filters)
+
+    def __iter__(self):
+        return iter(self._filters)
+
+    def reader_args(self, input_format):
+        """读取阶段需要的额外pandoc参数
+
+        Args:
+            input_format: 输入扩展名（如 .docx）
+
+        Returns:
+            list: pandoc参数
+        """
+        args = []
+        for action in self._filters:
+            for arg in getattr(action, 'reader_args', {}).get(input_format.lower(), ()):
+                if arg not in args:
+                    args.append(arg)
+        return args
+
+    def apply(self, doc, output_format="", resource_paths=()):
+        """对pandoc JSON文档运行所有过滤器（原地修改）
+
+        Args:
+            doc: json.loads 得到的pandoc文档（含 blocks 与 meta）
+            output_format: 输出扩展名或pandoc格式名称
+            resource_paths: 解析文档中相对路径资源的目录列表，按pandoc资源搜索路径的顺序
+
+        Returns:
+            dict: 处理后的文档
+        """
+        fmt = OUTPUT_FORMAT_NAMES.get(output_format.lower(), output_format.lstrip('.'))
+        meta = doc.get('meta', {})
+        actions = []
+        for action in self._filters:
+            if hasattr(action, 'for_resources'):
+                action = action.for_resources(doc, fmt, list(resource_paths))
+            elif hasattr(action, 'for_document'):
+                action = action.for_document(doc)
+            actions.append(action)
+        doc['blocks'] = self._walk(doc.get('blocks', []), actions, fmt, meta)
+        return doc
+
+    def _walk(self, node, actions, fmt, meta):
+        """自顶向下遍历，每个元素依次经过所有过滤器后再遍历其子元素"""
+        if isinstance(node, list):
+            result = []
+            for item in node:
+                if isinstance(item, dict) and 't' in item:
+                    for replacement in self._apply_filters(item, actions, fmt, meta):
+                        if 'c' in replacement:
+                            replacement['c'] = self._walk(replacement['c'], actions, fmt, meta)
+                        result.append(replacement)
+                else:
+                    result.append(self._walk(item, actions, fmt, meta))
+            return result
+        if isinstance(node, dict):
+            return {key: self._walk(value, actions, fmt, meta) for key, value in node.items()}
+        return node
+
+    @staticmethod
+    def _apply_filters(element, actions, fmt, meta):
+        """让元素依次经过所有过滤器，返回替换后的元素列表"""
+        elements = [element]
+        for action in actions:
+            replaced = []
+            for item in elements:
+                result = action(item['t'], item.get('c'), fmt, meta)
+                if result is None:
+                    replaced.append(item)
+                elif isinstance(result, list):
+                    replaced.extend(result)
+                else:
+                    replaced.append(result)
+            elements = replaced
+            if not elements:
+                break
+        return elements
+
+
+def _str(text):
+    """构造 Str 元素"""
+    return {'t': 'Str', 'c': text}
+
+
+class LinkRewriter:
+    """改写链接目标
+
+    默认把指向其他文档的相对链接改为转换后的扩展名，如 chapter2.md#intro -> chapter2.html#intro，
+    使批量转换后的文档之间的链接仍然有效。
+    """
+
+    def __init__(self, extensions=None, rewrite=None):
+        """初始化链接改写
+
+        Args:
+            extensions: 扩展名映射，如 {'.md': '.html'}
+            rewrite: 自定义改写函数 url -> url，指定时优先使用
+        """
+        self.extensions = {ext.lower(): new_ext for ext, new_ext in (extensions or {}).items()}
+        self.rewrite = rewrite
+
+    def __call__(self, key, value, fmt, meta):
+        if key != 'Link':
+            return None
+        attr, inlines, (url, title) = value
+        new_url = self.rewrite(url) if self.rewrite else self._rewrite_extension(url)
+        if new_url == url:
+            return None
+        return {'t': 'Link', 'c': [attr, inlines, [new_url, title]]}
+
+    def _rewrite_extension(self, url):
+        """改写相对链接的扩展名，保留 #片段 与 ?查询"""
+        if not url or '://' in url or url.startswith(('#', 'mailto:', '/', 'data:')):
+            return url
+        marks = [index for index in (url.find('#'), url.find('?')) if index >= 0]
+        cut = min(marks) if marks else len(url)
+        base, ext = posixpath.splitext(url[:cut])
+        new_ext = self.extensions.get(ext.lower())
+        if new_ext is None:
+            return url
+        return f"{base}{new_ext}{url[cut:]}"
+
+
+class HeadingNumberer:
+    """为标题添加层级编号，如 "1.2 安装"
+
+    带 unnumbered 类（{-} 或 {.unnumbered}）的标题不编号，也不影响计数。
+    """
+
+    def __init__(self, max_level=3):
+        """初始化标题编号
+
+        Args:
+            max_level: 编号的最大标题级别
+        """
+        self.max_level = max_level
+        self._counters = [0] * max_level
+
+    def for_document(self, doc):
+        """每个文档使用独立的计数器，从 1 开始编号"""
+        return HeadingNumberer(self.max_level)
+
+    def __call__(self, key, value, fmt, meta):
+        if key != 'Header':
+            return None
+        level, attr, inlines = value
+        if level > self.max_level or 'unnumbered' in attr[1]:
+            return None
+
+        self._counters[level - 1] += 1
+        for index in range(level, self.max_level):
+            self._counters[index] = 0
+        number = '.'.join(str(count) for count in self._counters[:level])
+        return {'t': 'Header', 'c': [level, attr, [_str(number), {'t': 'Space'}] + inlines]}
+
+
+class TrackedChangeStripper:
+    """清除 .docx 修订痕迹：接受插入，丢弃删除与批注
+
+    读取 .docx 时使用 --track-changes=all，pandoc会把修订与批注保留为带类名的 Span。
+    """
+
+    reader_args = {'.docx': ('--track-changes=all',)}
+
+    # 整体删除的 Span 类
+    DROP_CLASSES = frozenset(('deletion', 'comment-start', 'comment-end',
+                              'paragraph-insertion', 'paragraph-deletion'))
+
+    def __call__(self, key, value, fmt, meta):
+        if key != 'Span':
+            return None
+        attr, inlines = value
+        classes = attr[1]
+        if 'insertion' in classes:
+            return inlines
+        if self.DROP_CLASSES.intersection(classes):
+            return []
+        return None
+
+
+# 内置过滤器，命令行通过名称启用
+BUILTIN_FILTERS = {
+    'rewrite-links': lambda output_format: LinkRewriter(
+        {ext: output_format for ext in ('.md', '.docx', '.html', '.htm', '.epub')}
+    ),
+    'number-headings': lambda output_format: HeadingNumberer(),
+    'strip-changes': lambda output_format: TrackedChangeStripper(),
+}
+
+
+def create_builtin_filter(name, output_format):
+    """按名称创建内置过滤器
+
+    Args:
+        name: 过滤器名称（见 BUILTIN_FILTERS）
+        output_format: 输出扩展名
+
+    Returns:
+        过滤器
+    """
+    if name not in BUILTIN_FILTERS:
+        raise Exception(f"未知的过滤器: {name}（可用: {', '.join(BUILTIN_FILTERS)}）")
+    return BUILTIN_FILTERS[name](output_format)
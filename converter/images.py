@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+DocuFlow - 图片优化
+由 .docx 转换的文档常带有全分辨率截图，内嵌到 .html 或打包进 .epub 后输出可达几十 MB。
+图片优化作为进程内过滤器（见 converter.filters）运行在 pandoc 写出之前：
+
+- 长边超过上限的图片按比例缩小，按 EXIF 方向旋转后去掉 EXIF、XMP、文本块等元数据
+- JPEG 以指定质量重新编码（渐进式），PNG 重新压缩；输出为 HTML 时可改为 WebP
+- 重新编码后没有缩小尺寸、也没有变小的图片保留原编码，只无损去掉元数据（见 strip_metadata）；
+  转为 WebP 没有变小时按原格式处理
+- 同一文档中的图片在线程池中并行处理，结果按图片内容与参数的哈希缓存，
+  再次转换或不同文档引用相同图片时直接复用
+
+动图、SVG、EMF 等其他格式保持不变。需要安装 Pillow。
+"""
+
+import io
+import os
+import hashlib
+import threading
+from urllib.parse import unquote
+
+# 参与优化的输出格式（pandoc格式名称）；WebP 只用于 HTML，部分阅读器不支持 EPUB 中的 WebP
+OPTIMIZE_FORMATS = ('html', 'epub')
+WEBP_FORMATS = ('html',)
+
+# 可以重新编码的图片扩展名 -> Pillow 格式
+IMAGE_FORMATS = {
+    '.jpg': 'JPEG',
+    '.jpeg': 'JPEG',
+    '.png': 'PNG',
+}
+
+# 默认参数
+DEFAULT_MAX_DIMENSION = 1600
+DEFAULT_QUALITY = 85
+
+# 无损去除元数据时保留的 JPEG 段：JFIF、Adobe（颜色变换）与以此标识开头的 APP2（ICC 配置）
+JPEG_KEEP_APPS = (0xE0, 0xEE)
+JPEG_ICC_MARKER = b'ICC_PROFILE\0'
+# 无损去除元数据时保留的 PNG 辅助块：透明色、颜色配置与动画，文本、EXIF、时间等其余辅助块去掉
+PNG_KEEP_CHUNKS = (b'tRNS', b'iCCP', b'sRGB', b'gAMA', b'cHRM', b'sBIT', b'cICP', b'mDCV',
+                   b'cLLI', b'bKGD', b'pHYs', b'acTL', b'fcTL', b'fdAT')
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+
+def strip_metadata(data, image_format):
+    """不重新编码，去掉 JPEG/PNG 中的 EXIF、XMP、IPTC、注释与文本块等元数据
+
+    Args:
+        data: 图片内容
+        image_format: Pillow 格式名称（'JPEG' 或 'PNG'）
+
+    Returns:
+        bytes: 去掉元数据后的内容；无法解析时返回None
+    """
+    try:
+        if image_format == 'JPEG':
+            return _strip_jpeg(data)
+        if image_format == 'PNG':
+            return _strip_png(data)
+    except (IndexError, ValueError):
+        pass
+    return None
+
+
+def _strip_jpeg(data):
+    """去掉 JPEG 的 APP1-APP15（ICC 配置与 Adobe 段除外）与注释段，以及 EOI 之后的数据"""
+    if data[:2] != b'\xff\xd8':
+        return None
+    output = [data[:2]]
+    position = 2
+    while True:
+        if data[position] != 0xFF:
+            return None
+        marker = data[position + 1]
+        if marker == 0xFF:
+            # 填充字节
+            position += 1
+            continue
+        if marker == 0xD9 or 0xD0 <= marker <= 0xD7 or marker == 0x01:
+            return None
+        length = int.from_bytes(data[position + 2:position + 4], 'big')
+        segment = data[position:position + 2 + length]
+        if len(segment) < 4 or len(segment) != 2 + length:
+            return None
+        if marker == 0xDA:
+            # 扫描数据中的 0xFF 之后只能是 0x00 或 RST，第一个 EOI 即图片结尾
+            end = data.find(b'\xff\xd9', position + 2 + length)
+            if end < 0:
+                return None
+            output.append(data[position:end + 2])
+            return b''.join(output)
+        is_app = 0xE0 <= marker <= 0xEF
+        if marker == 0xFE or (is_app and marker not in JPEG_KEEP_APPS
+                              and not (marker == 0xE2 and segment[4:16] == JPEG_ICC_MARKER)):
+            position += 2 + length
+            continue
+        output.append(segment)
+        position += 2 + length
+
+
+def _strip_png(data):
+    """去掉 PNG 中不影响显示的辅助块"""
+    if data[:8] != PNG_SIGNATURE:
+        return None
+    output = [PNG_SIGNATURE]
+    position = 8
+    while position < len(data):
+        length = int.from_bytes(data[position:position + 4], 'big')
+        chunk_type = data[position + 4:position + 8]
+        end = position + 12 + length
+        if len(chunk_type) != 4 or end > len(data):
+            return None
+        # 首字母大写的是关键块
+        if chunk_type[:1].isupper() or chunk_type in PNG_KEEP_CHUNKS:
+            output.append(data[position:end])
+        position = end
+        if chunk_type == b'IEND':
+            return b''.join(output)
+    return None
+
+
+def _image_urls(node):
+    """遍历pandoc JSON文档，返回所有 Image 元素的地址"""
+    if isinstance(node, list):
+        for item in node:
+            yield from _image_urls(item)
+    elif isinstance(node, dict):
+        if node.get('t') == 'Image':
+            yield node['c'][2][0]
+        for value in node.values():
+            if isinstance(value, (list, dict)):
+                yield from _image_urls(value)
+
+
+class _ImageRewriter:
+    """把文档中的图片地址替换为优化后的文件"""
+
+    def __init__(self, replacements):
+        self.replacements = replacements
+
+    def __call__(self, key, value, fmt, meta):
+        if key != 'Image':
+            return None
+        attr, inlines, (url, title) = value
+        new_url = self.replacements.get(url)
+        if new_url is None:
+            return None
+        return {'t': 'Image', 'c': [attr, inlines, [new_url, title]]}
+
+
+class ImageOptimizer:
+    """缩小并重新编码 .html/.epub 输出中的图片，可被多个转换线程同时使用"""
+
+    def __init__(self, cache_dir=None, max_dimension=DEFAULT_MAX_DIMENSION,
+                 quality=DEFAULT_QUALITY, webp=False, max_workers=None):
+        """初始化图片优化
+
+        Args:
+            cache_dir: 缓存目录，如果为None则使用配置中的缓存目录
+            max_dimension: 图片长边的上限（像素），0表示不缩小
+            quality: JPEG/WebP 的编码质量（1-95）
+            webp: 输出为 HTML 时是否把 JPEG/PNG 转为 WebP
+            max_workers: 并行处理图片的线程数，如果为None则为CPU核数
+        """
+        try:
+            import PIL
+        except ImportError:
+            raise Exception("图片优化需要安装 Pillow: pip install Pillow")
+        if cache_dir is None:
+            from config import config
+            cache_dir = config.conversion.cache_dir
+        self.cache_dir = os.path.join(str(cache_dir), 'images')
+        self.max_dimension = max(0, max_dimension)
+        self.quality = min(95, max(1, quality))
+        self.webp = webp
+        self.max_workers = max_workers or os.cpu_count() or 1
+        # 参数与 Pillow 版本都参与缓存键，变化后重新处理
+        self._signature = (f"{PIL.__version__}\0{self.max_dimension}\0{self.quality}\0"
+                           .encode('utf-8'))
+        self._executor = None
+        self._lock = threading.Lock()
+
+        # 统计：处理的图片数、重新编码的图片数、命中缓存的图片数、原始与优化后的总字节数
+        self.stats = {'images': 0, 'optimized': 0, 'cached': 0, 'bytes_in': 0, 'bytes_out': 0}
+
+    def for_resources(self, doc, fmt, resource_paths):
+        """并行优化文档引用的本地图片，返回替换图片地址的过滤器"""
+        if fmt not in OPTIMIZE_FORMATS:
+            return _ImageRewriter({})
+        target = 'WEBP' if self.webp and fmt in WEBP_FORMATS else None
+
+        sources = {}
+        for url in set(_image_urls(doc.get('blocks', []))):
+            path = self._resolve(url, resource_paths)
+            if path and os.path.splitext(path)[1].lower() in IMAGE_FORMATS:
+                sources[url] = path
+        if not sources:
+            return _ImageRewriter({})
+
+        urls = list(sources)
+        results = self._get_executor().map(lambda url: self.optimize(sources[url], target), urls)
+        return _ImageRewriter({url: result for url, result in zip(urls, results)
+                               if result is not None})
+
+    @staticmethod
+    def _resolve(url, resource_paths):
+        """按资源搜索路径查找本地图片，远程地址与不存在的文件返回None"""
+        if not url or '://' in url or url.startswith(('data:', '#')):
+            return None
+        for candidate in dict.fromkeys((url, unquote(url))):
+            if os.path.isabs(candidate):
+                if os.path.isfile(candidate):
+                    return candidate
+                continue
+            for base in resource_paths:
+                path = os.path.join(base, candidate)
+                if os.path.isfile(path):
+                    return os.path.abspath(path)
+        return None
+
+    def _get_executor(self):
+        """获取处理图片的线程池（首次使用时创建）"""
+        with self._lock:
+            if self._executor is None:
+                from concurrent.futures import ThreadPoolExecutor
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                    thread_name_prefix="docuflow-image")
+            return self._executor
+
+    def optimize(self, path, target=None):
+        """优化单个图片
+
+        Args:
+            path: 图片路径
+            target: 转换的目标格式（'WEBP'），如果为None则保持原格式
+
+        Returns:
+            str: 优化后的缓存文件路径；无法处理（如动图、损坏的文件）时返回None
+        """
+        with open(path, 'rb') as f:
+            data = f.read()
+        source_format = IMAGE_FORMATS[os.path.splitext(path)[1].lower()]
+        output_format = target or source_format
+        extension = '.webp' if output_format == 'WEBP' else os.path.splitext(path)[1].lower()
+
+        digest = hashlib.sha256(self._signature + output_format.encode('ascii') + b'\0' + data)
+        key = digest.hexdigest()
+        cache_path = os.path.join(self.cache_dir, key[:2], key + extension)
+        if os.path.exists(cache_path):
+            self._record(len(data), os.path.getsize(cache_path), cached=True)
+            return cache_path
+
+        try:
+            encoded, transformed = self._encode(data, output_format)
+        except Exception:
+            # Pillow 无法处理的图片（损坏、像素数过多等）保持不变
+            return None
+        if encoded is None:
+            return None
+        # 没有缩小或旋转、重新编码后也没有变小时保留原编码，只去掉元数据
+        if not transformed and len(encoded) >= len(data):
+            if output_format != source_format:
+                return self.optimize(path)
+            encoded = strip_metadata(data, source_format) or encoded
+
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        tmp_path = f"{cache_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(encoded)
+        os.replace(tmp_path, cache_path)
+        self._record(len(data), len(encoded), cached=False)
+        return cache_path
+
+    def _encode(self, data, output_format):
+        """缩小并重新编码图片
+
+        Returns:
+            tuple: (编码后的内容, 是否缩小了尺寸或按 EXIF 方向旋转)；动图返回 (None, False)
+        """
+        from PIL import Image, ImageOps
+
+        with Image.open(io.BytesIO(data)) as source:
+            if getattr(source, 'is_animated', False):
+                return None, False
+            # 去掉 EXIF 后方向信息随之丢失，需要旋转的图片只能使用重新编码的结果
+            rotated = source.getexif().get(0x0112, 1) not in (0, 1)
+            image = ImageOps.exif_transpose(source)
+        # 只保留颜色配置与调色板透明色，其余元数据不写入
+        icc_profile = image.info.get('icc_profile')
+        image.info = {key: value for key, value in image.info.items() if key == 'transparency'}
+
+        resized = bool(self.max_dimension) and max(image.size) > self.max_dimension
+        if resized:
+            image.thumbnail((self.max_dimension, self.max_dimension), Image.LANCZOS)
+
+        has_alpha = image.mode in ('RGBA', 'LA', 'PA') or \
+            (image.mode == 'P' and 'transparency' in image.info)
+        output = io.BytesIO()
+        options = {'icc_profile': icc_profile} if icc_profile else {}
+        if output_format == 'WEBP':
+            if image.mode not in ('RGB', 'RGBA'):
+                image = image.convert('RGBA' if has_alpha else 'RGB')
+            image.save(output, 'WEBP', quality=self.quality, method=6, **options)
+        elif output_format == 'JPEG':
+            if image.mode not in ('RGB', 'L', 'CMYK'):
+                image = image.convert('RGB')
+            image.save(output, 'JPEG', quality=self.quality, optimize=True, progressive=True,
+                       **options)
+        else:
+            image.save(output, 'PNG', optimize=True, **options)
+        return output.getvalue(), resized or rotated
+
+    def _record(self, size_in, size_out, cached):
+        """更新统计"""
+        with self._lock:
+            self.stats['images'] += 1
+            self.stats['cached' if cached else 'optimized'] += 1
+            self.stats['bytes_in'] += size_in
+            self.stats['bytes_out'] += size_out
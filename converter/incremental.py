@@ -0,0 +1,354 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+DocuFlow - Markdown 分节增量渲染
+将大型 Markdown 文档按章节切分，按内容哈希缓存每节渲染结果，
+再次转换时只重新渲染发生变化的章节
+
+脚注、示例列表的编号与标题的自动 id 在整篇文档范围内分配，分节渲染无法与整篇转换一致；
+包含脚注、示例列表或重复标题的文档不分节，由调用方整篇转换。
+高亮代码块的 id 同样按整篇文档编号，拼接片段时重新编号。
+"""
+
+import os
+import re
+import hashlib
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+# ATX 标题（# 标题）
+HEADING_RE = re.compile(r'^ {0,3}(#{1,6})(?:[ \t]+|$)')
+# 围栏代码块起止标记
+FENCE_RE = re.compile(r'^ {0,3}(`{3,}|~{3,})')
+# 引用式链接定义，如 [id]: http://example.com
+LINK_DEF_RE = re.compile(r'^ {0,3}\[(?!\^)[^\]]+\]:\s*\S', re.MULTILINE)
+# 脚注引用或定义（[^1]）与行内脚注（^[...]）
+FOOTNOTE_RE = re.compile(r'\[\^[^\]\s]+\]|\^\[')
+# 示例列表（(@) 与 (@label)），编号在整篇文档范围内分配
+EXAMPLE_RE = re.compile(r'^ {0,3}\(@[\w-]*\)[ \t]')
+# Setext 标题的下划线
+SETEXT_RE = re.compile(r'^ {0,3}(=+|-+)[ \t]*$')
+# 标题属性，如 {#id .class}
+HEADING_ATTR_RE = re.compile(r'\s*\{[^}]*\}\s*$')
+# 高亮代码块及其行号锚点的自动 id（cb1、cb1-1），按代码块在整篇文档中的序号分配：
+# 没有指定 id 的代码块（包括未高亮的）都占用一个序号
+CODE_BLOCK_RE = re.compile(
+    r'<div class="sourceCode" id="cb\d+"|<pre(?![^>]*\b(?:id=|class="sourceCode))[^>]*><code')
+# 原始 HTML 的 <pre> 会被误计为代码块
+RAW_PRE_RE = re.compile(r'<pre\b', re.IGNORECASE)
+CODE_ID_RE = re.compile(r'((?:id|href)="#?cb)(\d+)(?=[-"])')
+# 本地图片引用，如 ![alt](images/a.png)
+IMAGE_RE = re.compile(r'!\[[^\]]*\]\(\s*<?([^)\s>]+)')
+
+# 片段模板：配合 --standalone 使用，仅输出正文以便嵌入资源
+FRAGMENT_TEMPLATE = "$body$\n"
+# 页面外壳中正文的占位符，结束标记之后为外壳的剩余部分
+SHELL_PLACEHOLDER = "DOCUFLOW-INCREMENTAL-BODY"
+SHELL_END = "DOCUFLOW-INCREMENTAL-END"
+# 页面外壳中依赖正文内容的部分（如代码高亮样式）：片段包含对应标记时，
+# 在外壳源文本中加入同类元素，使外壳与整篇转换一致
+SHELL_PROBES = (
+    ('class="sourceCode', "```python\npass\n```"),
+    ('class="math', "$x$\n\n$$x$$"),
+)
+
+
+def split_front_matter(text):
+    """拆分 YAML 元数据块
+
+    Args:
+        text: Markdown 文本
+
+    Returns:
+        tuple: (元数据块文本, 正文文本)，没有元数据块时前者为空字符串
+    """
+    if not text.startswith('---'):
+        return "", text
+
+    lines = text.splitlines(keepends=True)
+    if lines[0].rstrip() != '---':
+        return "", text
+
+    for i in range(1, len(lines)):
+        if lines[i].rstrip() in ('---', '...'):
+            return "".join(lines[:i + 1]), "".join(lines[i + 1:])
+
+    return "", text
+
+
+def split_sections(text, max_level=2):
+    """按标题将 Markdown 正文切分为章节
+
+    围栏代码块中的 # 行不会被视为标题。
+
+    Args:
+        text: Markdown 正文
+        max_level: 参与切分的最大标题级别
+
+    Returns:
+        list: 章节文本列表
+    """
+    sections = []
+    current = []
+    fence = None
+
+    for line in text.splitlines(keepends=True):
+        fence_match = FENCE_RE.match(line)
+        if fence:
+            if fence_match and fence_match.group(1)[0] == fence[0] \
+                    and len(fence_match.group(1)) >= len(fence):
+                fence = None
+        elif fence_match:
+            fence = fence_match.group(1)
+        else:
+            heading = HEADING_RE.match(line)
+            # 标题前只有空行时不单独成节（如元数据块之后的空行）
+            if heading and len(heading.group(1)) <= max_level \
+                    and any(part.strip() for part in current):
+                sections.append("".join(current))
+                current = []
+        current.append(line)
+
+    if current:
+        sections.append("".join(current))
+
+    return sections
+
+
+def _heading_id(title):
+    """近似 pandoc 为标题自动生成的 id，用于判断标题是否重复"""
+    explicit = re.search(r'\{[^}]*#([^\s}]+)', title)
+    if explicit:
+        return explicit.group(1)
+    title = HEADING_ATTR_RE.sub('', title).strip().rstrip('#').strip().lower()
+    identifier = re.sub(r'\s+', '-', re.sub(r'[^\w\s.-]', '', title))
+    return identifier.lstrip('0123456789.-_') or 'section'
+
+
+def needs_full_render(text):
+    """文档是否需要整篇渲染：包含脚注、示例列表或原始 HTML 的 <pre>，或有自动 id 相同的标题
+
+    围栏代码块中的内容不计入。
+
+    Args:
+        text: Markdown 正文
+
+    Returns:
+        bool: 是否不能分节渲染
+    """
+    ids = set()
+    fence = None
+    previous = ""
+    for line in text.splitlines():
+        fence_match = FENCE_RE.match(line)
+        if fence:
+            if fence_match and fence_match.group(1)[0] == fence[0] \
+                    and len(fence_match.group(1)) >= len(fence):
+                fence = None
+            continue
+        if fence_match:
+            fence = fence_match.group(1)
+            previous = ""
+            continue
+        if FOOTNOTE_RE.search(line) or EXAMPLE_RE.match(line) or RAW_PRE_RE.search(line):
+            return True
+
+        title = None
+        heading = HEADING_RE.match(line)
+        if heading:
+            title = line[heading.end():]
+        elif previous.strip() and SETEXT_RE.match(line) and not HEADING_RE.match(previous):
+            title = previous
+        if title is not None:
+            identifier = _heading_id(title)
+            if identifier in ids:
+                return True
+            ids.add(identifier)
+        previous = line
+    return False
+
+
+class IncrementalRenderer:
+    """Markdown 到 HTML 的增量渲染器"""
+
+    def __init__(self, converter, cache_dir, max_level=2, max_workers=None):
+        """初始化增量渲染器
+
+        Args:
+            converter: DocumentConverter 实例，用于执行 pandoc
+            cache_dir: 片段缓存目录
+            max_level: 参与切分的最大标题级别
+            max_workers: 并行渲染章节的线程数
+        """
+        self.converter = converter
+        self.cache_dir = os.path.join(str(cache_dir), 'fragments')
+        self.max_level = max_level
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.template_path = os.path.join(str(cache_dir), 'fragment.html')
+
+        # 最近一次渲染的统计信息，整篇转换的文档为None
+        self.last_stats = {'sections': 0, 'rendered': 0, 'cached': 0}
+
+    def render(self, input_path):
+        """增量渲染 Markdown 文件为独立 HTML
+
+        Args:
+            input_path: 源 Markdown 文件路径
+
+        Returns:
+            str: 渲染得到的 HTML 文本；文档包含脚注、示例列表或重复标题，不能分节渲染时返回None
+        """
+        with open(input_path, 'r', encoding='utf-8') as f:
+            text = f.read()
+
+        source_dir = os.path.dirname(os.path.abspath(input_path))
+        front_matter, body = split_front_matter(text)
+        if needs_full_render(body):
+            self.last_stats = None
+            return None
+        sections = split_sections(body, self.max_level)
+
+        # 引用式链接定义可能与引用它的章节不在同一节，附加到每一节
+        link_defs = "\n".join(
+            line for line in body.splitlines() if LINK_DEF_RE.match(line)
+        )
+
+        keys = [self._section_key(section, link_defs, source_dir) for section in sections]
+        missing = [
+            (key, section) for key, section in zip(keys, sections)
+            if not os.path.exists(self._fragment_path(key))
+        ]
+        # 同一文档中重复的章节只渲染一次
+        missing = list(dict(missing).items())
+
+        if missing:
+            self._ensure_template()
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                list(executor.map(
+                    lambda item: self._render_section(item[0], item[1], link_defs, source_dir),
+                    missing
+                ))
+
+        fragments = []
+        code_blocks = 0
+        for key in keys:
+            with open(self._fragment_path(key), 'r', encoding='utf-8') as f:
+                fragment = f.read().rstrip("\n")
+            # 片段中的代码块从 cb1 开始编号，按之前章节的代码块数顺延
+            if code_blocks:
+                offset = code_blocks
+                fragment = CODE_ID_RE.sub(
+                    lambda match: f"{match.group(1)}{int(match.group(2)) + offset}", fragment)
+            code_blocks += len(CODE_BLOCK_RE.findall(fragment))
+            fragments.append(fragment)
+
+        probes = [probe for marker, probe in SHELL_PROBES
+                  if any(marker in fragment for fragment in fragments)]
+        shell_head, shell_tail = self._render_shell(front_matter, input_path, source_dir, probes)
+
+        self.last_stats = {
+            'sections': len(sections),
+            'rendered': len(missing),
+            'cached': len(sections) - len(missing),
+        }
+        return shell_head + "\n".join(fragments) + shell_tail
+
+    def _section_key(self, section, link_defs, source_dir):
+        """计算章节缓存键：章节内容、链接定义、工具链版本与引用图片的状态"""
+        digest = hashlib.sha256()
+        digest.update(self.converter.pandoc_version.encode('utf-8'))
+        digest.update(b'\0html-fragment\0')
+        digest.update(section.encode('utf-8'))
+        digest.update(b'\0')
+        digest.update(link_defs.encode('utf-8'))
+
+        for target in IMAGE_RE.findall(section):
+            image_path = os.path.join(source_dir, target)
+            try:
+                stat = os.stat(image_path)
+            except OSError:
+                continue
+            digest.update(f"\0{target}:{stat.st_size}:{stat.st_mtime_ns}".encode('utf-8'))
+
+        return digest.hexdigest()
+
+    def _fragment_path(self, key):
+        """获取片段缓存文件路径"""
+        return os.path.join(self.cache_dir, key[:2], f"{key}.html")
+
+    def _ensure_template(self):
+        """写入片段模板"""
+        if not os.path.exists(self.template_path):
+            os.makedirs(os.path.dirname(self.template_path), exist_ok=True)
+            _atomic_write(self.template_path, FRAGMENT_TEMPLATE.encode('utf-8'))
+
+    def _render_section(self, key, section, link_defs, source_dir):
+        """渲染单个章节并写入缓存"""
+        source = section
+        if link_defs:
+            source = f"{section}\n\n{link_defs}\n"
+
+        result = self.converter._run_pandoc(
+            ["-f", "markdown", "-t", "html",
+             "--standalone", "--self-contained",
+             f"--template={self.template_path}",
+             f"--resource-path={source_dir}",
+             "--metadata", "pagetitle=fragment"],
+            input_data=source.encode('utf-8')
+        )
+
+        fragment_path = self._fragment_path(key)
+        os.makedirs(os.path.dirname(fragment_path), exist_ok=True)
+        _atomic_write(fragment_path, result.stdout)
+
+    def _render_shell(self, front_matter, input_path, source_dir, probes=()):
+        """渲染包含元数据的页面外壳，返回正文占位符前后的两部分
+
+        Args:
+            front_matter: YAML 元数据块
+            input_path: 源文件路径
+            source_dir: 资源查找目录
+            probes: 正文中出现的、影响页面外壳的元素示例（见 SHELL_PROBES）
+        """
+        args = ["-f", "markdown", "-t", "html",
+                "--standalone", "--self-contained",
+                f"--resource-path={source_dir}"]
+
+        # 与整篇转换保持一致：没有标题时使用文件名作为页面标题
+        if not re.search(r'^title\s*:', front_matter, re.MULTILINE):
+            file_base = os.path.splitext(os.path.basename(input_path))[0]
+            args.extend(["--metadata", f"pagetitle={file_base}"])
+
+        source = "\n\n".join([f"{front_matter}\n{SHELL_PLACEHOLDER}", *probes, SHELL_END]) + "\n"
+        digest = hashlib.sha256()
+        digest.update(self.converter.pandoc_version.encode('utf-8'))
+        digest.update(b'\0html-shell\0')
+        digest.update("\0".join(args).encode('utf-8'))
+        digest.update(b'\0')
+        digest.update(source.encode('utf-8'))
+        shell_path = self._fragment_path(digest.hexdigest())
+
+        if os.path.exists(shell_path):
+            with open(shell_path, 'r', encoding='utf-8') as f:
+                shell = f.read()
+        else:
+            result = self.converter._run_pandoc(args, input_data=source.encode('utf-8'))
+            shell = result.stdout.decode('utf-8')
+            os.makedirs(os.path.dirname(shell_path), exist_ok=True)
+            _atomic_write(shell_path, result.stdout)
+
+        marker = f"<p>{SHELL_PLACEHOLDER}</p>"
+        end_marker = f"<p>{SHELL_END}</p>"
+        if marker not in shell or end_marker not in shell:
+            raise Exception("无法生成增量渲染页面框架")
+
+        head, rest = shell.split(marker, 1)
+        return head, rest.split(end_marker, 1)[1]
+
+
+def _atomic_write(path, data):
+    """原子写入文件，避免并发渲染时读到半写入的缓存"""
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
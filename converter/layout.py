@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+DocuFlow - 输出目录布局
+指定输出目录（或输出到归档）时，输出在其中的位置：
+
+- flat: 全部输出直接放在输出目录中（默认）
+- mirror: 按源文件相对于源目录的位置重建目录结构
+- hash: 按源文件路径的哈希分散到两级子目录（如 3f/a2/），
+  几十万个输出也不会集中在同一个目录中，同一源文件每次都落在同一子目录
+
+不同源文件的输出路径相同（如不同目录下的同名文件、同名的 .md 与 .docx）时，
+先登记的源文件（批次中按输入顺序）使用原文件名，其余在文件名后加上源文件路径的哈希，
+如 notes~1a2b3c4d.html，不再互相覆盖。归档成员仍按其在归档中的目录结构输出。
+"""
+
+import os
+import hashlib
+import threading
+
+# 输出目录布局
+LAYOUTS = ('flat', 'mirror', 'hash')
+
+# hash 布局的子目录层数，每层取哈希的 2 个十六进制字符
+HASH_LEVELS = 2
+
+# 重名时附加的源文件路径哈希长度
+SUFFIX_LENGTH = 8
+
+
+def path_digest(file_path):
+    """源文件绝对路径的哈希（十六进制）"""
+    return hashlib.sha1(os.fsencode(os.path.abspath(file_path))).hexdigest()
+
+
+class OutputLayout:
+    """计算输出路径并登记已分配的路径，可被多个转换线程同时使用"""
+
+    def __init__(self, mode='flat', source_root=None):
+        """初始化输出布局
+
+        Args:
+            mode: 布局（见 LAYOUTS）
+            source_root: mirror 布局的源目录，如果为None则使用当前目录
+        """
+        if mode not in LAYOUTS:
+            raise Exception(f"未知的输出目录布局: {mode}（可用: {', '.join(LAYOUTS)}）")
+        self.mode = mode
+        self.source_root = os.path.abspath(str(source_root or os.getcwd()))
+        self._lock = threading.Lock()
+        # 已分配的输出路径 -> 源文件；(源文件, 按布局计算的输出路径) -> 实际分配的输出路径
+        self._owners = {}
+        self._assigned = {}
+        # 统计：因重名而改名的输出数
+        self.renamed = 0
+
+    def subdir(self, file_path):
+        """源文件的输出在输出目录中的子目录（相对路径），flat 布局为空字符串
+
+        Raises:
+            Exception: mirror 布局下源文件不在源目录之下
+        """
+        if self.mode == 'hash':
+            digest = path_digest(file_path)
+            return os.path.join(*(digest[level * 2:level * 2 + 2] for level in range(HASH_LEVELS)))
+        if self.mode == 'mirror':
+            source_dir = os.path.dirname(os.path.abspath(file_path))
+            relative = os.path.relpath(source_dir, self.source_root)
+            if relative == os.pardir or relative.startswith(os.pardir + os.sep):
+                raise Exception(f"源文件不在源目录 {self.source_root} 之下: {file_path}")
+            return "" if relative == os.curdir else relative
+        return ""
+
+    def claim(self, file_path, output_path):
+        """登记源文件的输出路径，与其他源文件的输出重名时改名
+
+        同一源文件重复登记同一路径时返回相同的结果。
+
+        Args:
+            file_path: 源文件路径
+            output_path: 按布局计算的输出路径
+
+        Returns:
+            str: 分配给该源文件的输出路径
+        """
+        source = os.path.abspath(file_path)
+        key = (source, output_path)
+        with self._lock:
+            assigned = self._assigned.get(key)
+            if assigned is not None:
+                return assigned
+
+            assigned = output_path
+            owner = self._owners.setdefault(os.path.normcase(output_path), source)
+            if owner != source:
+                base, extension = os.path.splitext(output_path)
+                assigned = f"{base}~{path_digest(source)[:SUFFIX_LENGTH]}{extension}"
+                self._owners[os.path.normcase(assigned)] = source
+                self.renamed += 1
+            self._assigned[key] = assigned
+            return assigned
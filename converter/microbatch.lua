@@ -0,0 +1,81 @@
+-- DocuFlow - 小文件批量转换脚本（由 converter.microbatch 以 `pandoc lua` 运行）
+-- 标准输入为 JSON 清单 {"jobs": [{input, output, from, to, standalone, pagetitle, epoch}, ...]}，
+-- 每个文档单独读取、单独写出，与命令行逐个转换的处理相同；
+-- 每完成一个文档向标准输出写一行 JSON：{"ok": true} 或 {"error": "..."}。
+
+local TAB_STOP = 4
+local BOM = '\239\187\191'
+
+-- 与 pandoc 命令行读取输入时相同：逐行把制表符展开为空格（按字符计列），每行以换行结尾
+local function expand_tabs(text)
+  if text == '' then
+    return ''
+  end
+  local lines = {}
+  local body = text:sub(-1) == '\n' and text or text .. '\n'
+  for line in body:gmatch('(.-)\n') do
+    local parts, column, start = {}, 0, 1
+    while true do
+      local tab = line:find('\t', start, true)
+      if not tab then
+        parts[#parts + 1] = line:sub(start)
+        break
+      end
+      local chunk = line:sub(start, tab - 1)
+      column = column + utf8.len(chunk)
+      local spaces = TAB_STOP - column % TAB_STOP
+      parts[#parts + 1] = chunk .. string.rep(' ', spaces)
+      column = column + spaces
+      start = tab + 1
+    end
+    lines[#lines + 1] = table.concat(parts)
+  end
+  return table.concat(lines, '\n') .. '\n'
+end
+
+local templates = {}
+
+local function convert(job)
+  local input = assert(io.open(job.input, 'rb'))
+  local text = input:read('a')
+  input:close()
+  -- 非 UTF-8 输入由命令行按 latin1 读取，交回调用方逐个转换
+  if not utf8.len(text) then
+    error('输入不是 UTF-8 编码')
+  end
+  if text:sub(1, 3) == BOM then
+    text = text:sub(4)
+  end
+
+  local doc = pandoc.read(expand_tabs(text), job.from)
+  local options = {}
+  if job.standalone then
+    -- 与命令行一样，文档没有标题时以文件名作为页面标题
+    if doc.meta.title == nil and doc.meta.pagetitle == nil then
+      doc.meta.pagetitle = job.pagetitle
+    end
+    templates[job.to] = templates[job.to]
+      or pandoc.template.compile(pandoc.template.default(job.to))
+    options.template = templates[job.to]
+  end
+
+  local output = assert(io.open(job.output, 'wb'))
+  output:write(pandoc.write(doc, job.to, options))
+  output:close()
+end
+
+local manifest = pandoc.json.decode(io.read('a'), false)
+local environment = pandoc.system.environment()
+for _, job in ipairs(manifest.jobs) do
+  local ok, err = pcall(function ()
+    if job.epoch then
+      -- 以源文件修改时间作为 .docx 元数据时间戳，与逐个转换时的 SOURCE_DATE_EPOCH 相同
+      environment.SOURCE_DATE_EPOCH = job.epoch
+      pandoc.system.with_environment(environment, function () convert(job) end)
+    else
+      convert(job)
+    end
+  end)
+  io.write(pandoc.json.encode(ok and {ok = true} or {error = tostring(err)}), '\n')
+  io.stdout:flush()
+end
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+DocuFlow - 小文件批量转换
+数千个只有几 KB 的文档逐个转换时，绝大部分时间花在启动 pandoc 进程上。
+一批小文件交给一个 `pandoc lua` 进程（见 microbatch.lua），在进程内逐个读取、逐个套用模板写出，
+输出与逐个转换完全相同：
+
+- 与命令行一样去掉 BOM、展开制表符，没有标题时以文件名作为页面标题，
+  并以源文件修改时间作为 SOURCE_DATE_EPOCH
+- 转换为 .html 时 pandoc 的 --self-contained 处理（内嵌资源并重写标签）无法在 Lua 中调用，
+  整批输出以注释分隔拼接为一个模板，由一个 pandoc 进程统一处理后再按分隔注释拆开
+- .epub 输出含随机标识符，逐个转换也不可重现，不参与批量
+
+每批的文件数按输入大小与并发数自动确定。单个文档在批量中失败（如不是 UTF-8 编码）时
+改为逐个转换，错误信息与逐个转换一致。
+"""
+
+import os
+import re
+import json
+from converter.capabilities import PANDOC_FORMATS
+from utils.file_utils import get_file_extension
+
+# 以 `pandoc lua` 运行的批量转换脚本
+LUA_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "microbatch.lua")
+
+# 参与批量的转换（输出可重现，且不需要共享资源、媒体提取等按文件处理的选项）
+BATCH_PAIRS = frozenset({
+    ('.md', '.html'), ('.md', '.docx'),
+    ('.html', '.md'), ('.html', '.docx'),
+    ('.htm', '.md'), ('.htm', '.docx'),
+})
+
+# 少于此数的文件逐个转换即可
+MIN_BATCH_FILES = 4
+# 每批的文件数与输入总大小上限，批次过大时单个失败的影响与等待结果的时间都会变长
+MAX_BATCH_FILES = 200
+MAX_BATCH_BYTES = 2 * 1024 * 1024
+# 每个并发线程至少分到的批次数，使各线程的负载均衡、结果能陆续产出
+BATCHES_PER_WORKER = 4
+
+# pandoc HTML 模板输出的 <style> 块
+STYLE_RE = re.compile(rb'<style>.*?</style>', re.DOTALL)
+
+
+def can_batch_options(options):
+    """转换选项是否允许批量（增量渲染、共享资源、媒体提取都按文件处理）"""
+    return (options.get('html_assets', 'inline') == 'inline'
+            and not any(value for key, value in options.items() if key != 'html_assets'))
+
+
+def plan_batches(candidates, output_format, max_workers, max_size, options=None):
+    """把小文件分成批次
+
+    每批的文件数为 候选数 / (并发数 × BATCHES_PER_WORKER)，限制在 MIN_BATCH_FILES 与
+    MAX_BATCH_FILES 之间，同时每批输入总大小不超过 MAX_BATCH_BYTES。批次内保持输入顺序。
+
+    Args:
+        candidates: [(下标, 源文件路径), ...]，按输入顺序
+        output_format: 输出格式
+        max_workers: 并发数
+        max_size: 参与批量的单个文件大小上限（字节），0表示不批量
+        options: 转换选项
+
+    Returns:
+        list: 批次列表，每个批次为下标列表（至少 2 个文件）；不参与批量的文件不在其中
+    """
+    if max_size <= 0 or not can_batch_options(options or {}):
+        return []
+
+    eligible = []
+    for index, file_path in candidates:
+        if (get_file_extension(file_path), output_format.lower()) not in BATCH_PAIRS:
+            continue
+        try:
+            size = os.path.getsize(file_path)
+        except OSError:
+            continue
+        if size <= max_size:
+            eligible.append((index, size))
+    if len(eligible) < MIN_BATCH_FILES:
+        return []
+
+    per_batch = -(-len(eligible) // (max(1, max_workers) * BATCHES_PER_WORKER))
+    per_batch = max(MIN_BATCH_FILES, min(MAX_BATCH_FILES, per_batch))
+
+    batches = []
+    current, current_bytes = [], 0
+    for index, size in eligible:
+        if current and (len(current) >= per_batch or current_bytes + size > MAX_BATCH_BYTES):
+            batches.append(current)
+            current, current_bytes = [], 0
+        current.append(index)
+        current_bytes += size
+    if current:
+        batches.append(current)
+    return [batch for batch in batches if len(batch) > 1]
+
+
+def _embed_resources(run_pandoc, outputs, work_dir):
+    """对整批 HTML 输出运行一次 pandoc 的 --self-contained 处理
+
+    各输出以带随机标记的注释分隔拼接为模板（模板中的 $ 需转义），pandoc 处理后按标记拆开；
+    标记缺失或顺序不符时抛出异常。各文档相同的 <style> 块（模板自带的 CSS）只处理一次：
+    文档中以占位注释代替，处理后再换回。
+    """
+    token = os.urandom(8).hex().encode()
+    marker = re.compile(rb'<!--docuflow-' + token + rb'-(\d+|s\d+|end)-->')
+    expected = [index for index, html in enumerate(outputs) if html is not None]
+
+    styles = {}
+
+    def placeholder(match):
+        """以占位注释代替 <style> 块"""
+        key = styles.setdefault(match.group(0), len(styles))
+        return b'<!--docuflow-' + token + b'-style-%d-->' % key
+
+    documents = [STYLE_RE.sub(placeholder, outputs[index]) for index in expected]
+
+    template_path = os.path.join(work_dir, "embed.html")
+    with open(template_path, 'wb') as f:
+        for style, key in styles.items():
+            f.write(b'<!--docuflow-' + token + b'-s%d-->' % key)
+            f.write(style.replace(b'$', b'$$'))
+        for index, html in zip(expected, documents):
+            f.write(b'<!--docuflow-' + token + b'-%d-->' % index)
+            f.write(html.replace(b'$', b'$$'))
+        f.write(b'<!--docuflow-' + token + b'-end-->')
+
+    result = run_pandoc(["-f", "markdown", "-t", "html", "--standalone", "--self-contained",
+                         "--template", template_path], input_data=b"")
+    parts = marker.split(result.stdout)
+    found = parts[1::2]
+    if parts[0] or found != ([b's%d' % key for key in range(len(styles))]
+                             + [b'%d' % index for index in expected] + [b'end']):
+        raise Exception("批量输出的分隔标记不完整")
+
+    bodies = parts[2::2]
+    embedded_styles = {b'%d' % key: body for key, body in enumerate(bodies[:len(styles)])}
+    restore = re.compile(rb'<!--docuflow-' + token + rb'-style-(\d+)-->')
+    embedded = list(outputs)
+    for index, html in zip(expected, bodies[len(styles):]):
+        embedded[index] = restore.sub(lambda match: embedded_styles[match.group(1)], html)
+    return embedded
+
+
+def run_batch(run_pandoc, file_paths, output_format, work_dir):
+    """在一个pandoc进程中转换一批文件
+
+    Args:
+        run_pandoc: 执行pandoc的函数（DocumentConverter._run_pandoc）
+        file_paths: 源文件路径列表
+        output_format: 输出格式（需在 BATCH_PAIRS 中）
+        work_dir: 存放中间输出的临时目录
+
+    Returns:
+        list: 与输入一一对应的输出内容（字节串），在批量中失败的文件为None
+
+    Raises:
+        Exception: pandoc进程失败（如不支持 `pandoc lua`）时抛出，整批需逐个转换
+    """
+    output_format = output_format.lower()
+    writer = PANDOC_FORMATS[output_format]
+    fixed_epoch = "SOURCE_DATE_EPOCH" in os.environ
+
+    jobs = []
+    for index, file_path in enumerate(file_paths):
+        job = {
+            'input': os.path.abspath(file_path),
+            'output': os.path.join(work_dir, f"{index}{output_format}"),
+            'from': PANDOC_FORMATS[get_file_extension(file_path)],
+            'to': writer,
+            'standalone': output_format == ".html",
+            'pagetitle': os.path.splitext(os.path.basename(file_path))[0],
+        }
+        if not fixed_epoch:
+            job['epoch'] = str(int(os.path.getmtime(file_path)))
+        jobs.append(job)
+
+    result = run_pandoc(["lua", LUA_SCRIPT],
+                        input_data=json.dumps({'jobs': jobs}, ensure_ascii=False).encode('utf-8'))
+    statuses = [json.loads(line) for line in result.stdout.splitlines() if line.strip()]
+    if len(statuses) != len(jobs):
+        raise Exception("批量转换脚本没有返回全部结果")
+
+    outputs = []
+    for job, status in zip(jobs, statuses):
+        if status.get('ok'):
+            with open(job['output'], 'rb') as f:
+                outputs.append(f.read())
+        else:
+            outputs.append(None)
+
+    if output_format == ".html" and any(html is not None for html in outputs):
+        outputs = _embed_resources(run_pandoc, outputs, work_dir)
+    return outputs
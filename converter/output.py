@@ -0,0 +1,376 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+DocuFlow - 输出提交
+输出先写入同目录下的临时文件，与已有输出比较（先比较大小，再比较哈希），
+内容相同时跳过写入，否则通过 os.replace 原子替换。
+输出目标（sink）可以是文件系统目录，也可以是流式写入的 zip/tar 归档
+"""
+
+import os
+import time
+import shutil
+import hashlib
+import tempfile
+import threading
+
+# 提交结果
+WRITTEN = "written"
+UNCHANGED = "unchanged"
+
+# 读取文件时的块大小
+CHUNK_SIZE = 1024 * 1024
+
+
+def _current_umask():
+    """获取当前进程的 umask"""
+    mask = os.umask(0)
+    os.umask(mask)
+    return mask
+
+
+# 新建文件的默认权限，与直接 open() 创建的文件保持一致
+DEFAULT_FILE_MODE = 0o666 & ~_current_umask()
+
+
+def make_temp_path(output_path):
+    """在输出文件所在目录创建临时文件路径
+
+    临时文件保留原扩展名，便于 pandoc 根据扩展名推断输出格式。
+
+    Args:
+        output_path: 最终输出文件路径
+
+    Returns:
+        str: 已创建的空临时文件路径
+    """
+    output_dir, output_name = os.path.split(os.path.abspath(output_path))
+    extension = os.path.splitext(output_name)[1]
+    fd, tmp_path = tempfile.mkstemp(prefix=f".{output_name}.", suffix=f".tmp{extension}",
+                                    dir=output_dir)
+    os.close(fd)
+    return tmp_path
+
+
+def file_digest(file_path):
+    """计算文件的 SHA-256 哈希
+
+    Args:
+        file_path: 文件路径
+
+    Returns:
+        str: 十六进制哈希值
+    """
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _same_size(output_path, size):
+    """检查已有输出是否存在且大小相同"""
+    try:
+        return os.stat(output_path).st_size == size
+    except OSError:
+        return False
+
+
+def commit_file(tmp_path, output_path):
+    """提交临时文件为最终输出
+
+    Args:
+        tmp_path: 与输出文件位于同一目录的临时文件
+        output_path: 最终输出文件路径
+
+    Returns:
+        str: WRITTEN 或 UNCHANGED
+    """
+    try:
+        size = os.stat(tmp_path).st_size
+        if _same_size(output_path, size) and file_digest(tmp_path) == file_digest(output_path):
+            os.remove(tmp_path)
+            return UNCHANGED
+
+        os.chmod(tmp_path, DEFAULT_FILE_MODE)
+        os.replace(tmp_path, output_path)
+        return WRITTEN
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def commit_bytes(data, output_path):
+    """将内存中的输出内容提交为最终输出
+
+    Args:
+        data: 输出内容（字节串）
+        output_path: 最终输出文件路径
+
+    Returns:
+        str: WRITTEN 或 UNCHANGED
+    """
+    if _same_size(output_path, len(data)) \
+            and hashlib.sha256(data).hexdigest() == file_digest(output_path):
+        return UNCHANGED
+
+    tmp_path = make_temp_path(output_path)
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    return commit_file(tmp_path, output_path)
+
+
+class DirectorySink:
+    """输出到文件系统目录，写入前与已有输出比较"""
+
+    is_archive = False
+
+    def __init__(self, precompress=None):
+        """初始化目录输出
+
+        Args:
+            precompress: 预压缩（converter.precompress.Precompressor）或压缩方式列表，
+                为文本输出同时生成 .gz/.br/.zst 文件；False 表示不预压缩，如果为None则按配置决定
+        """
+        self._precompress = precompress
+        self._lock = threading.Lock()
+
+    @property
+    def precompressor(self):
+        """预压缩，未启用时为None（首次访问时读取配置）"""
+        with self._lock:
+            if self._precompress is None:
+                from config import config
+                self._precompress = config.conversion.precompress or False
+            if self._precompress and not hasattr(self._precompress, 'process'):
+                from converter.precompress import Precompressor
+                self._precompress = Precompressor(self._precompress)
+            return self._precompress or None
+
+    def default_output_dir(self, file_dir):
+        """未指定输出目录时使用源文件所在目录"""
+        return file_dir if file_dir else os.getcwd()
+
+    def prepare(self, output_dir):
+        """确保输出目录存在"""
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+
+    def temp_path(self, output_path):
+        """获取渲染用的临时文件路径（与输出位于同一目录）"""
+        return make_temp_path(output_path)
+
+    def commit_file(self, tmp_path, output_path, seq=None):
+        """提交临时文件"""
+        status = commit_file(tmp_path, output_path)
+        self.precompress(output_path, status)
+        return status
+
+    def commit_bytes(self, data, output_path, seq=None):
+        """提交内存中的输出内容"""
+        status = commit_bytes(data, output_path)
+        self.precompress(output_path, status, data)
+        return status
+
+    def precompress(self, output_path, status, data=None):
+        """为已提交的输出生成预压缩文件（未启用预压缩时不做任何事）"""
+        precompressor = self.precompressor
+        if precompressor is not None:
+            precompressor.process(output_path, status, data)
+
+    def discard(self, seq):
+        """放弃某个序号的输出（转换失败时调用）"""
+
+    def close(self):
+        """关闭输出"""
+
+
+class ArchiveSink:
+    """流式归档输出，支持 .zip、.tar、.tar.gz/.tgz 与 .tar.zst
+
+    每个文档转换完成后立即追加到归档中，内容通过临时文件流式写入，内存占用有界。
+    条目按提交序号排序写入，时间戳、权限与属主固定，相同输入得到相同的归档。
+    """
+
+    is_archive = True
+
+    def __init__(self, archive_path):
+        """初始化归档输出
+
+        Args:
+            archive_path: 归档文件路径，格式由扩展名决定
+        """
+        self.archive_path = os.path.abspath(str(archive_path))
+        self.kind = self._archive_kind(self.archive_path)
+        self.entry_count = 0
+
+        # 条目时间戳：优先使用 SOURCE_DATE_EPOCH，否则固定为 1980-01-01
+        self.mtime = int(os.getenv('SOURCE_DATE_EPOCH', 315532800))
+
+        self._lock = threading.Lock()
+        self._names = set()
+        self._pending = {}
+        self._next_seq = 0
+        self._spool_dir = tempfile.mkdtemp(prefix="docuflow_archive_")
+
+        archive_dir = os.path.dirname(self.archive_path)
+        os.makedirs(archive_dir, exist_ok=True)
+        fd, self._tmp_archive = tempfile.mkstemp(
+            prefix=f".{os.path.basename(self.archive_path)}.", suffix=".tmp", dir=archive_dir
+        )
+        self._raw = os.fdopen(fd, 'wb')
+        self._compressor = None
+
+        # 归档相关模块较重，仅在使用归档输出时导入
+        import gzip
+        import tarfile
+        import zipfile
+
+        if self.kind == 'zip':
+            self._archive = zipfile.ZipFile(self._raw, 'w', zipfile.ZIP_DEFLATED)
+        else:
+            stream = self._raw
+            if self.kind == 'tar.gz':
+                self._compressor = gzip.GzipFile(filename='', mode='wb', fileobj=self._raw, mtime=0)
+                stream = self._compressor
+            elif self.kind == 'tar.zst':
+                try:
+                    import zstandard
+                except ImportError:
+                    self._abort()
+                    raise Exception("写入 .tar.zst 需要安装 zstandard: pip install zstandard")
+                self._compressor = zstandard.ZstdCompressor().stream_writer(self._raw, closefd=False)
+                stream = self._compressor
+            self._archive = tarfile.open(fileobj=stream, mode='w|', format=tarfile.PAX_FORMAT)
+
+    @staticmethod
+    def _archive_kind(archive_path):
+        """根据扩展名确定归档类型"""
+        name = archive_path.lower()
+        for suffix, kind in (('.zip', 'zip'), ('.tar.gz', 'tar.gz'), ('.tgz', 'tar.gz'),
+                             ('.tar.zst', 'tar.zst'), ('.tar', 'tar')):
+            if name.endswith(suffix):
+                return kind
+        raise Exception(f"不支持的归档格式: {archive_path}（支持 .zip/.tar/.tar.gz/.tar.zst）")
+
+    def default_output_dir(self, file_dir):
+        """未指定输出目录时，条目位于归档根目录"""
+        return ""
+
+    def prepare(self, output_dir):
+        """归档输出不需要创建目录"""
+
+    def temp_path(self, output_path):
+        """获取渲染用的临时文件路径（位于本地暂存目录）"""
+        extension = os.path.splitext(output_path)[1]
+        fd, tmp_path = tempfile.mkstemp(suffix=extension, dir=self._spool_dir)
+        os.close(fd)
+        return tmp_path
+
+    def commit_file(self, tmp_path, output_path, seq=None):
+        """将临时文件追加到归档，写入后删除临时文件
+
+        Args:
+            tmp_path: 临时文件路径（由 temp_path 创建）
+            output_path: 条目在归档中的相对路径
+            seq: 提交序号，指定后按序号顺序写入；为None时立即写入
+
+        Returns:
+            str: WRITTEN
+        """
+        name = self._entry_name(output_path)
+        with self._lock:
+            if name in self._names:
+                os.remove(tmp_path)
+                raise Exception(f"归档中已存在同名条目: {name}")
+            self._names.add(name)
+
+            if seq is None:
+                self._write_entry(name, tmp_path)
+            else:
+                self._pending[seq] = (name, tmp_path)
+                self._drain()
+        return WRITTEN
+
+    def commit_bytes(self, data, output_path, seq=None):
+        """将内存中的输出内容追加到归档"""
+        tmp_path = self.temp_path(output_path)
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        return self.commit_file(tmp_path, output_path, seq)
+
+    def discard(self, seq):
+        """放弃某个序号的输出，避免后续条目一直等待"""
+        if seq is None:
+            return
+        with self._lock:
+            self._pending[seq] = None
+            self._drain()
+
+    def close(self):
+        """写入剩余条目并完成归档"""
+        with self._lock:
+            for seq in sorted(self._pending):
+                entry = self._pending.pop(seq)
+                if entry:
+                    self._write_entry(*entry)
+
+            self._archive.close()
+            if self._compressor is not None:
+                self._compressor.close()
+            self._raw.close()
+            os.chmod(self._tmp_archive, DEFAULT_FILE_MODE)
+            os.replace(self._tmp_archive, self.archive_path)
+            shutil.rmtree(self._spool_dir, ignore_errors=True)
+
+    def _abort(self):
+        """初始化失败时清理临时文件"""
+        self._raw.close()
+        os.remove(self._tmp_archive)
+        shutil.rmtree(self._spool_dir, ignore_errors=True)
+
+    def _drain(self):
+        """按序号写入已就绪的条目"""
+        while self._next_seq in self._pending:
+            entry = self._pending.pop(self._next_seq)
+            self._next_seq += 1
+            if entry:
+                self._write_entry(*entry)
+
+    def _write_entry(self, name, tmp_path):
+        """写入单个条目并删除临时文件"""
+        import tarfile
+        import zipfile
+        try:
+            if self.kind == 'zip':
+                info = zipfile.ZipInfo(name, date_time=time.gmtime(max(self.mtime, 315532800))[:6])
+                info.compress_type = zipfile.ZIP_DEFLATED
+                info.external_attr = 0o644 << 16
+                with open(tmp_path, 'rb') as src, self._archive.open(info, 'w') as dst:
+                    shutil.copyfileobj(src, dst, CHUNK_SIZE)
+            else:
+                info = tarfile.TarInfo(name)
+                info.size = os.path.getsize(tmp_path)
+                info.mtime = self.mtime
+                info.mode = 0o644
+                info.uid = info.gid = 0
+                info.uname = info.gname = ""
+                with open(tmp_path, 'rb') as src:
+                    self._archive.addfile(info, src)
+            self.entry_count += 1
+        finally:
+            os.remove(tmp_path)
+
+    @staticmethod
+    def _entry_name(output_path):
+        """规范化条目名：使用 / 分隔，去掉盘符、开头的 / 与 .. 片段"""
+        path = os.path.splitdrive(str(output_path))[1].replace(os.sep, '/')
+        parts = [part for part in path.split('/') if part not in ('', '.', '..')]
+        if not parts:
+            raise Exception(f"无效的归档条目名: {output_path}")
+        return '/'.join(parts)
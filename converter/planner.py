@@ -0,0 +1,401 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+DocuFlow - 转换计划与耗时估算
+扫描一次输入，按格式组合统计任务数与字节数，列出会被跳过的文件，
+并根据以往运行记录的吞吐量估算耗时。
+
+吞吐量记录在本地统计文件中（默认 ~/.cache/docuflow/throughput.json），
+每种格式组合用最小二乘拟合 耗时 = 固定开销 + 字节数 / 吞吐量。
+"""
+
+import os
+import json
+import time
+import threading
+from utils.file_utils import get_file_extension
+from utils.archive_utils import is_archive_file
+
+# 跳过原因
+SKIP_UNSUPPORTED = "unsupported"
+SKIP_OVERSIZED = "oversized"
+SKIP_UP_TO_DATE = "up_to_date"
+SKIP_INVALID = "invalid"
+
+SKIP_LABELS = {
+    SKIP_UNSUPPORTED: "不支持",
+    SKIP_OVERSIZED: "超过大小限制",
+    SKIP_INVALID: "内容无效",
+    SKIP_UP_TO_DATE: "已是最新",
+}
+
+# 没有历史记录时的默认值：每个文件启动pandoc的开销（秒）与吞吐量（字节/秒）
+DEFAULT_OVERHEAD = 0.25
+DEFAULT_BYTES_PER_SECOND = 2 * 1024 * 1024
+
+# 每种格式组合的样本数超过此值时，历史统计减半，使估算跟随近期运行
+MAX_SAMPLES = 1000
+
+
+def pair_key(source_format, target_format):
+    """格式组合的键，如 ".md->.html\""""
+    return f"{source_format.lower()}->{target_format.lower()}"
+
+
+class ThroughputStats:
+    """按格式组合记录的转换吞吐量统计"""
+
+    def __init__(self, path):
+        """初始化吞吐量统计
+
+        Args:
+            path: 统计文件路径，文件不存在或损坏时从空统计开始
+        """
+        self.path = str(path)
+        self._lock = threading.Lock()
+        self._pairs = {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            self._pairs = {key: dict(value) for key, value in data.get('pairs', {}).items()}
+        except (OSError, ValueError, AttributeError):
+            self._pairs = {}
+
+    def record(self, source_format, target_format, size, seconds):
+        """记录一次转换的输入大小与耗时（线程安全）"""
+        key = pair_key(source_format, target_format)
+        with self._lock:
+            sums = self._pairs.setdefault(key, {'n': 0, 'sx': 0.0, 'sy': 0.0, 'sxx': 0.0, 'sxy': 0.0})
+            if sums['n'] >= MAX_SAMPLES:
+                for name in sums:
+                    sums[name] /= 2
+            sums['n'] += 1
+            sums['sx'] += size
+            sums['sy'] += seconds
+            sums['sxx'] += size * size
+            sums['sxy'] += size * seconds
+
+    def samples(self, source_format, target_format):
+        """格式组合的历史样本数"""
+        sums = self._pairs.get(pair_key(source_format, target_format))
+        return int(sums['n']) if sums else 0
+
+    def model(self, source_format, target_format):
+        """获取格式组合的耗时模型
+
+        Returns:
+            tuple: (每个文件的固定开销秒数, 每字节耗时秒数)
+        """
+        sums = self._pairs.get(pair_key(source_format, target_format))
+        if not sums or sums['n'] < 1:
+            return DEFAULT_OVERHEAD, 1.0 / DEFAULT_BYTES_PER_SECOND
+
+        n, sx, sy = sums['n'], sums['sx'], sums['sy']
+        denominator = n * sums['sxx'] - sx * sx
+        if n >= 2 and denominator > 0:
+            per_byte = (n * sums['sxy'] - sx * sy) / denominator
+            overhead = (sy - per_byte * sx) / n
+            if per_byte >= 0 and overhead >= 0:
+                return overhead, per_byte
+
+        # 样本不足以拟合时，按平均耗时分摊到固定开销与字节数
+        overhead = min(DEFAULT_OVERHEAD, sy / n)
+        per_byte = max(0.0, sy - overhead * n) / sx if sx > 0 else 0.0
+        return overhead, per_byte
+
+    def estimate(self, source_format, target_format, size):
+        """估算单个文件的转换耗时（秒）"""
+        overhead, per_byte = self.model(source_format, target_format)
+        return overhead + size * per_byte
+
+    def bytes_per_second(self, source_format, target_format):
+        """历史平均吞吐量（字节/秒），没有记录时返回None"""
+        sums = self._pairs.get(pair_key(source_format, target_format))
+        if not sums or sums['sy'] <= 0:
+            return None
+        return sums['sx'] / sums['sy']
+
+    def save(self):
+        """原子写入统计文件"""
+        with self._lock:
+            data = json.dumps({'version': 1, 'pairs': self._pairs}, indent=1, sort_keys=True)
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(data)
+        os.replace(tmp_path, self.path)
+
+
+def get_throughput_stats():
+    """加载配置中的吞吐量统计文件"""
+    from config import config
+    return ThroughputStats(config.conversion.stats_file)
+
+
+class PlanJob:
+    """计划中的一个转换任务"""
+
+    __slots__ = ('file_path', 'member', 'size', 'source_format', 'cost')
+
+    def __init__(self, file_path, member, size, source_format, cost):
+        self.file_path = file_path
+        self.member = member
+        self.size = size
+        self.source_format = source_format
+        self.cost = cost
+
+
+class ConversionPlan:
+    """转换计划"""
+
+    def __init__(self, output_format, max_workers):
+        """初始化转换计划
+
+        Args:
+            output_format: 输出格式
+            max_workers: 并发数
+        """
+        self.output_format = output_format
+        self.max_workers = max(1, max_workers)
+        self.jobs = []
+        self.skipped = []
+
+    @property
+    def files(self):
+        """要转换的输入路径（去重，保持顺序；归档只出现一次）"""
+        return list(dict.fromkeys(job.file_path for job in self.jobs))
+
+    @property
+    def total_bytes(self):
+        """要转换的总字节数"""
+        return sum(job.size for job in self.jobs)
+
+    @property
+    def pairs(self):
+        """按格式组合汇总
+
+        Returns:
+            dict: 格式组合 -> {'files': 任务数, 'bytes': 字节数, 'seconds': 预计耗时}
+        """
+        summary = {}
+        for job in self.jobs:
+            key = pair_key(job.source_format, self.output_format)
+            entry = summary.setdefault(key, {'files': 0, 'bytes': 0, 'seconds': 0.0})
+            entry['files'] += 1
+            entry['bytes'] += job.size
+            entry['seconds'] += job.cost
+        return summary
+
+    def skipped_by_reason(self):
+        """按原因分组的跳过文件
+
+        Returns:
+            dict: 原因 -> [(路径, 说明), ...]
+        """
+        groups = {}
+        for path, reason, message in self.skipped:
+            groups.setdefault(reason, []).append((path, message))
+        return groups
+
+    @property
+    def estimated_seconds(self):
+        """按并发数估算的总耗时（秒）"""
+        return estimate_wall_time([job.cost for job in self.jobs], self.max_workers)
+
+
+def estimate_wall_time(costs, max_workers):
+    """估算一组任务在给定并发数下的总耗时
+
+    总耗时不少于平均分摊到各工作线程的耗时，也不少于最慢的单个任务。
+
+    Args:
+        costs: 各任务的预计耗时
+        max_workers: 并发数
+
+    Returns:
+        float: 预计总耗时（秒）
+    """
+    if not costs:
+        return 0.0
+    return max(sum(costs) / max(1, max_workers), max(costs))
+
+
+def _is_up_to_date(source_mtime, output_path):
+    """输出存在且不比源文件旧"""
+    try:
+        return os.stat(output_path).st_mtime >= source_mtime
+    except OSError:
+        return False
+
+
+def check_file(converter, file_path, output_format, output_dir=None, keep_original_name=True,
+               max_file_size=None, skip_up_to_date=False):
+    """逐个检查流式读取的输入，与 plan_conversion 的检查相同，但不预先扫描全部输入
+
+    文件头预检在转换时进行（见 DocumentConverter.convert_file_detailed）。
+
+    Args:
+        converter: DocumentConverter 实例，用于校验格式支持
+        file_path: 源文件路径（不是归档）
+        output_format: 输出格式
+        output_dir: 输出目录，如果为None则使用源文件目录
+        keep_original_name: 是否保留原文件名
+        max_file_size: 单个文件的大小上限（字节），如果为None则使用配置中的 max_file_size
+        skip_up_to_date: 输出已存在且不比源文件旧时是否跳过
+
+    Returns:
+        tuple: (跳过原因, 说明)，可以转换时返回None
+    """
+    if max_file_size is None:
+        from config import config
+        max_file_size = config.conversion.max_file_size
+
+    reason = converter.check_conversion(file_path, output_format)
+    if reason:
+        return SKIP_UNSUPPORTED, reason
+    try:
+        stat = os.stat(file_path)
+    except OSError as e:
+        return SKIP_UNSUPPORTED, str(e)
+    if stat.st_size > max_file_size:
+        return SKIP_OVERSIZED, f"{stat.st_size} 字节"
+    try:
+        output_path = converter.output_path_for(file_path, output_format, output_dir,
+                                                keep_original_name)
+    except Exception as e:
+        return SKIP_UNSUPPORTED, str(e)
+    if skip_up_to_date and _is_up_to_date(stat.st_mtime, output_path):
+        return SKIP_UP_TO_DATE, output_path
+    return None
+
+
+def plan_conversion(converter, file_paths, output_format, output_dir=None,
+                    keep_original_name=True, max_workers=1, stats=None, max_file_size=None,
+                    skip_up_to_date=False):
+    """扫描输入并生成转换计划，不执行转换
+
+    格式与大小检查通过的文件再并行读取文件头检查内容（见 converter.preflight）。
+
+    Args:
+        converter: DocumentConverter 实例，用于校验格式支持
+        file_paths: 源文件路径列表，可包含 zip/tar 归档
+        output_format: 输出格式
+        output_dir: 输出目录，如果为None则使用源文件目录
+        keep_original_name: 是否保留原文件名
+        max_workers: 并发数
+        stats: ThroughputStats 实例，如果为None则加载配置中的统计文件
+        max_file_size: 单个文件的大小上限（字节），如果为None则使用配置中的 max_file_size
+        skip_up_to_date: 输出已存在且不比源文件旧时是否跳过
+
+    Returns:
+        ConversionPlan: 转换计划
+    """
+    if stats is None:
+        stats = get_throughput_stats()
+    if max_file_size is None:
+        from config import config
+        max_file_size = config.conversion.max_file_size
+
+    plan = ConversionPlan(output_format, max_workers)
+    candidates = []
+    for file_path in file_paths:
+        if is_archive_file(file_path):
+            candidates.append((file_path, None))
+            continue
+
+        reason = converter.check_conversion(file_path, output_format)
+        if reason:
+            plan.skipped.append((file_path, SKIP_UNSUPPORTED, reason))
+            continue
+        try:
+            stat = os.stat(file_path)
+        except OSError as e:
+            plan.skipped.append((file_path, SKIP_UNSUPPORTED, str(e)))
+            continue
+        if stat.st_size > max_file_size:
+            plan.skipped.append((file_path, SKIP_OVERSIZED, f"{stat.st_size} 字节"))
+            continue
+        candidates.append((file_path, stat))
+
+    from converter.preflight import preflight_batch
+    invalid = preflight_batch(file_path for file_path, stat in candidates if stat is not None)
+    for file_path, stat in candidates:
+        if stat is None:
+            _plan_archive(plan, converter, file_path, output_format, stats, max_file_size)
+            continue
+        if file_path in invalid:
+            plan.skipped.append((file_path, SKIP_INVALID, invalid[file_path]))
+            continue
+        try:
+            output_path = converter.output_path_for(file_path, output_format, output_dir,
+                                                    keep_original_name)
+        except Exception as e:
+            plan.skipped.append((file_path, SKIP_UNSUPPORTED, str(e)))
+            continue
+        if skip_up_to_date and _is_up_to_date(stat.st_mtime, output_path):
+            plan.skipped.append((file_path, SKIP_UP_TO_DATE, output_path))
+            continue
+
+        source_format = get_file_extension(file_path)
+        plan.jobs.append(PlanJob(file_path, None, stat.st_size, source_format,
+                                 stats.estimate(source_format, output_format, stat.st_size)))
+    return plan
+
+
+def _plan_archive(plan, converter, archive_path, output_format, stats, max_file_size):
+    """扫描归档成员（只读取成员信息）"""
+    from utils.archive_utils import iter_archive_members
+    try:
+        for member in iter_archive_members(archive_path):
+            name = f"{archive_path}:{member.name}"
+            reason = converter.check_conversion(member.name, output_format)
+            if reason:
+                plan.skipped.append((name, SKIP_UNSUPPORTED, reason))
+            elif member.size > max_file_size:
+                plan.skipped.append((name, SKIP_OVERSIZED, f"{member.size} 字节"))
+            else:
+                plan.jobs.append(PlanJob(archive_path, member.name, member.size, member.extension,
+                                         stats.estimate(member.extension, output_format,
+                                                        member.size)))
+    except Exception as e:
+        plan.skipped.append((archive_path, SKIP_UNSUPPORTED, f"无法读取归档: {e}"))
+
+
+class EtaTracker:
+    """根据计划的耗时模型与实际进度估算剩余时间
+
+    剩余耗时 = 未完成任务的预计耗时 / 并发数，再乘以实际耗时与已完成任务预计耗时之比进行校正。
+    """
+
+    def __init__(self, plan):
+        """初始化剩余时间估算
+
+        Args:
+            plan: ConversionPlan
+        """
+        self.max_workers = plan.max_workers
+        self._costs = {}
+        for job in plan.jobs:
+            self._costs[job.file_path] = self._costs.get(job.file_path, 0.0) + job.cost
+        self._remaining = sum(self._costs.values())
+        self._completed = 0.0
+        self._started = time.monotonic()
+        self._lock = threading.Lock()
+
+    def complete(self, file_path):
+        """标记一个输入已完成（归档在首次完成任一成员时整体计入）"""
+        with self._lock:
+            cost = self._costs.pop(file_path, 0.0)
+            self._remaining -= cost
+            self._completed += cost
+
+    def remaining_seconds(self):
+        """预计剩余秒数"""
+        with self._lock:
+            remaining = max(0.0, self._remaining) / self.max_workers
+            expected_elapsed = self._completed / self.max_workers
+        elapsed = time.monotonic() - self._started
+        if expected_elapsed > 0 and elapsed > 0:
+            remaining *= elapsed / expected_elapsed
+        return remaining
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+DocuFlow - 预压缩输出
+供 nginx gzip_static / brotli_static 等直接发送的静态文件使用：输出写入时，
+在工作线程中趁内容仍在内存（或页缓存）中，同时生成 .gz（以及可选的 .br、.zst）同级文件，
+不必事后再遍历输出目录重新读取。
+
+- 只处理文本输出（.html、.md）；.docx/.epub 本身已是压缩包，不再压缩
+- 输出内容未变化且各压缩文件都已存在时跳过
+- 压缩结果可重现（gzip 头部不含时间戳与文件名），与输出一样内容相同时不重写
+- .br 需要安装 brotli，.zst 需要安装 zstandard
+"""
+
+import os
+import threading
+from converter.output import commit_bytes, UNCHANGED
+
+# 压缩方式 -> 同级文件扩展名
+ENCODINGS = {
+    'gzip': '.gz',
+    'br': '.br',
+    'zstd': '.zst',
+}
+
+# 需要预压缩的输出格式
+COMPRESSIBLE_FORMATS = ('.html', '.htm', '.md')
+
+# 压缩级别：文件只压缩一次、被多次发送，使用最高级别
+GZIP_LEVEL = 9
+BROTLI_QUALITY = 11
+ZSTD_LEVEL = 19
+
+
+def parse_encodings(spec):
+    """解析压缩方式列表，如 "gzip,br"
+
+    Args:
+        spec: 逗号分隔的字符串或压缩方式序列；空值表示不预压缩
+
+    Returns:
+        tuple: 去重后的压缩方式（保持顺序）
+
+    Raises:
+        Exception: 未知的压缩方式，或缺少所需的模块
+    """
+    if not spec:
+        return ()
+    items = spec.split(',') if isinstance(spec, str) else spec
+    encodings = []
+    for item in items:
+        encoding = item.strip().lower()
+        if not encoding:
+            continue
+        if encoding not in ENCODINGS:
+            raise Exception(f"未知的预压缩方式: {encoding}（可用: {', '.join(ENCODINGS)}）")
+        if encoding not in encodings:
+            encodings.append(encoding)
+
+    if 'br' in encodings:
+        try:
+            import brotli  # noqa: F401
+        except ImportError:
+            raise Exception("生成 .br 需要安装 brotli: pip install brotli")
+    if 'zstd' in encodings:
+        try:
+            import zstandard  # noqa: F401
+        except ImportError:
+            raise Exception("生成 .zst 需要安装 zstandard: pip install zstandard")
+    return tuple(encodings)
+
+
+def compress(data, encoding):
+    """按指定方式压缩内容
+
+    Args:
+        data: 原始内容（字节串）
+        encoding: 压缩方式（见 ENCODINGS）
+
+    Returns:
+        bytes: 压缩后的内容
+    """
+    if encoding == 'gzip':
+        import gzip
+        return gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+    if encoding == 'br':
+        import brotli
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    if encoding == 'zstd':
+        import zstandard
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+    raise Exception(f"未知的预压缩方式: {encoding}")
+
+
+class Precompressor:
+    """为输出生成预压缩的同级文件，可被多个转换线程同时使用"""
+
+    def __init__(self, encodings=('gzip',)):
+        """初始化预压缩
+
+        Args:
+            encodings: 压缩方式列表或逗号分隔的字符串（见 ENCODINGS）
+        """
+        self.encodings = parse_encodings(encodings)
+        self._lock = threading.Lock()
+        # 统计：生成预压缩的输出数、因输出未变化而跳过的输出数、原始与压缩后的总字节数
+        self.stats = {'files': 0, 'skipped': 0, 'bytes_in': 0, 'bytes_out': 0}
+
+    def wants(self, output_path):
+        """该输出是否需要预压缩"""
+        return bool(self.encodings) and \
+            os.path.splitext(str(output_path))[1].lower() in COMPRESSIBLE_FORMATS
+
+    def variant_paths(self, output_path):
+        """各压缩方式的同级文件路径"""
+        return [(encoding, f"{output_path}{ENCODINGS[encoding]}") for encoding in self.encodings]
+
+    def process(self, output_path, status, data=None):
+        """输出提交后生成（或更新）其预压缩文件
+
+        Args:
+            output_path: 已提交的输出文件路径
+            status: 输出的写入状态（WRITTEN 或 UNCHANGED）
+            data: 输出内容，如果为None则从输出文件读取
+        """
+        if not self.wants(output_path):
+            return
+        variants = self.variant_paths(output_path)
+        if status == UNCHANGED and all(os.path.exists(path) for _, path in variants):
+            with self._lock:
+                self.stats['skipped'] += 1
+            return
+
+        if data is None:
+            with open(output_path, 'rb') as f:
+                data = f.read()
+        compressed_size = 0
+        for encoding, path in variants:
+            compressed = compress(data, encoding)
+            commit_bytes(compressed, path)
+            compressed_size += len(compressed)
+
+        with self._lock:
+            self.stats['files'] += 1
+            self.stats['bytes_in'] += len(data) * len(variants)
+            self.stats['bytes_out'] += compressed_size
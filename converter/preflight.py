@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+DocuFlow - 转换前的快速检查
+只读取文件头与 zip 中央目录，在启动 pandoc 之前拒绝注定失败或会产生乱码的输入，
+并给出明确的原因（而不是 pandoc 难以理解的错误输出）：
+
+- 空文件
+- 内容与扩展名不符（如改名为 .epub 的 HTML、改名为 .docx 的 PDF）
+- .docx/.epub 的 zip 已截断或损坏，或缺少必需的条目
+  （.docx 的 [Content_Types].xml，.epub 的 mimetype）
+- .md/.html 为二进制内容或 UTF-16/32 编码，或 HTML 声明了 pandoc 无法识别的编码
+  （pandoc 只读取 UTF-8，其他编码按 latin1 读取）
+"""
+
+import os
+import re
+import codecs
+from utils.file_utils import get_file_extension
+
+# 读取的文件头大小
+HEAD_SIZE = 64 * 1024
+
+# zip 容器格式必需的条目
+REQUIRED_ENTRIES = {
+    '.docx': ('[Content_Types].xml', 'word/document.xml'),
+    '.epub': ('mimetype', 'META-INF/container.xml'),
+}
+EPUB_MIMETYPE = b'application/epub+zip'
+
+# 常见格式的文件头，用于说明内容与扩展名不符
+SIGNATURES = (
+    (b'PK\x03\x04', 'zip 压缩包'),
+    (b'%PDF', 'PDF'),
+    (b'\xd0\xcf\x11\xe0', '旧版 Office 文档（.doc/.xls）'),
+    (b'{\\rtf', 'RTF 文档'),
+    (b'\x1f\x8b', 'gzip 压缩文件'),
+    (b'\x89PNG', 'PNG 图片'),
+    (b'\xff\xd8\xff', 'JPEG 图片'),
+    (b'GIF8', 'GIF 图片'),
+)
+
+# UTF-16/32 的字节顺序标记（UTF-32 LE 以 UTF-16 LE 的标记开头，需先判断）
+UTF_BOMS = (
+    (codecs.BOM_UTF32_LE, 'UTF-32'),
+    (codecs.BOM_UTF32_BE, 'UTF-32'),
+    (codecs.BOM_UTF16_LE, 'UTF-16'),
+    (codecs.BOM_UTF16_BE, 'UTF-16'),
+)
+
+# HTML 中声明的字符编码
+CHARSET_RE = re.compile(rb'<meta[^>]+charset\s*=\s*["\']?\s*([\w.:-]+)', re.IGNORECASE)
+# pandoc 读取非 UTF-8 输入时按 latin1 处理，这些编码的结果是正确的
+LATIN1_CHARSETS = {'iso-8859-1', 'iso8859-1', 'latin1', 'latin-1', 'windows-1252', 'cp1252',
+                   'us-ascii', 'ascii'}
+UTF8_CHARSETS = {'utf-8', 'utf8'}
+
+
+def _describe(head):
+    """根据文件头描述内容类型"""
+    for signature, description in SIGNATURES:
+        if head.startswith(signature):
+            return description
+    stripped = head.lstrip(codecs.BOM_UTF8).lstrip()[:64].lower()
+    if stripped.startswith((b'<!doctype html', b'<html', b'<head', b'<body')):
+        return 'HTML'
+    if stripped.startswith(b'<?xml'):
+        return 'XML'
+    if b'\x00' not in head:
+        return '文本'
+    return '未知的二进制内容'
+
+
+def _check_container(file_path, extension, head):
+    """检查 .docx/.epub 的 zip 结构（只读取中央目录与 mimetype 条目）"""
+    if not head.startswith(b'PK\x03\x04'):
+        return f"不是有效的{extension}文件：内容是{_describe(head)}"
+
+    import zipfile
+    try:
+        with zipfile.ZipFile(file_path) as archive:
+            names = set(archive.namelist())
+            for required in REQUIRED_ENTRIES[extension]:
+                if required not in names:
+                    return f"不是有效的{extension}文件：缺少 {required}"
+            if extension == '.epub' and archive.read('mimetype').strip() != EPUB_MIMETYPE:
+                return "不是有效的.epub文件：mimetype 不是 application/epub+zip"
+    except zipfile.BadZipFile as e:
+        return f"{extension}文件已损坏或不完整（zip 结构无效: {e}）"
+    return None
+
+
+def _check_text(extension, head, complete):
+    """检查 .md/.html 的内容与编码
+
+    Args:
+        extension: 扩展名
+        head: 文件开头部分
+        complete: head 是否为完整内容
+    """
+    for bom, encoding in UTF_BOMS:
+        if head.startswith(bom):
+            return f"使用 {encoding} 编码，请转换为 UTF-8"
+
+    for signature, description in SIGNATURES:
+        if head.startswith(signature):
+            return f"内容是{description}，与扩展名 {extension} 不符"
+
+    nul = head.find(b'\x00')
+    if nul >= 0:
+        # UTF-16 文本中每隔一个字节就是 NUL
+        if head[1::2].count(0) > len(head) // 4 or head[0::2].count(0) > len(head) // 4:
+            return "疑似 UTF-16 编码（没有字节顺序标记），请转换为 UTF-8"
+        return f"包含 NUL 字节（第 {nul} 字节），看起来是二进制文件"
+
+    try:
+        codecs.getincrementaldecoder('utf-8')().decode(head, final=complete)
+    except UnicodeDecodeError as e:
+        if extension in ('.html', '.htm'):
+            match = CHARSET_RE.search(head)
+            charset = match.group(1).decode('ascii', 'replace').lower() if match else None
+            if charset and charset not in LATIN1_CHARSETS | UTF8_CHARSETS:
+                return (f"声明的编码为 {charset}，pandoc 只能读取 UTF-8"
+                        f"（第 {e.start} 字节不是 UTF-8），请转换为 UTF-8")
+        # 未声明编码的非 UTF-8 文本按 latin1 读取，不拒绝
+    return None
+
+
+def preflight(file_path):
+    """转换前检查单个文件
+
+    Args:
+        file_path: 源文件路径
+
+    Returns:
+        str: 不能转换的原因，可以转换时返回None
+    """
+    extension = get_file_extension(file_path)
+    try:
+        size = os.path.getsize(file_path)
+        if size == 0:
+            return "文件为空（0 字节）"
+        with open(file_path, 'rb') as f:
+            head = f.read(HEAD_SIZE)
+    except OSError as e:
+        return f"无法读取文件: {e.strerror or e}"
+
+    if extension in REQUIRED_ENTRIES:
+        return _check_container(file_path, extension, head)
+    if extension in ('.md', '.html', '.htm'):
+        return _check_text(extension, head, complete=size <= HEAD_SIZE)
+    return None
+
+
+def check_stream_head(name, head, complete):
+    """检查通过标准输入流式转换的归档成员（只有开头部分）
+
+    Args:
+        name: 成员名称
+        head: 已读取的开头部分
+        complete: head 是否为完整内容
+
+    Returns:
+        str: 不能转换的原因，可以转换时返回None
+    """
+    if not head:
+        return "文件为空（0 字节）"
+    return _check_text(get_file_extension(name), head, complete)
+
+
+# 批量检查的最大线程数（只读取文件头，受 I/O 延迟限制）
+MAX_PREFLIGHT_WORKERS = 16
+
+
+def preflight_batch(file_paths, max_workers=MAX_PREFLIGHT_WORKERS):
+    """并行检查一批文件
+
+    Args:
+        file_paths: 源文件路径列表
+        max_workers: 最大线程数
+
+    Returns:
+        dict: 不能转换的文件路径 -> 原因
+    """
+    file_paths = list(file_paths)
+    if len(file_paths) <= 1 or max_workers <= 1:
+        reasons = zip(file_paths, map(preflight, file_paths))
+    else:
+        from concurrent.futures import ThreadPoolExecutor
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(file_paths)),
+                                thread_name_prefix="docuflow-preflight") as executor:
+            reasons = list(zip(file_paths, executor.map(preflight, file_paths)))
+    return {path: reason for path, reason in reasons if reason}
@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+DocuFlow - 失败隔离
+语料中总有少数文档每次都让 pandoc 失败或超时，每次批量转换都要为它们白白等待。
+失败按 输入内容哈希 + 工具链（pandoc 版本与过滤器）+ 输出格式与转换选项 记录到
+缓存目录下的 quarantine.json：
+
+- 同一输入累计失败达到次数（默认 2 次）后被隔离，之后的运行直接跳过并报告为已隔离
+- 文件内容、pandoc 版本、过滤器或转换选项变化后记录不再匹配，自动重新尝试
+- 转换成功时清除该输入的失败记录
+- 只有路径或大小与某条失败记录相同的文件才需要计算哈希，没有失败记录时检查几乎没有开销
+
+看起来是暂时性的失败（资源不足、打开文件过多、被信号终止等，见 is_transient）
+在转换时按退避自动重试（见 DocumentConverter.convert_file_detailed），与读写文件出错一样
+属于环境问题，不计入失败记录；超时则计入。
+"""
+
+import os
+import re
+import json
+import time
+import hashlib
+import threading
+from converter.output import file_digest
+
+# 暂时性失败的错误信息：系统资源不足、pandoc 被信号终止（如内存不足被杀死）、网络资源获取失败
+TRANSIENT_RE = re.compile(
+    r"Resource temporarily unavailable|Too many open files|Cannot allocate memory|"
+    r"out of memory|Heap exhausted|Broken pipe|Connection (?:reset|refused|timed out)|"
+    r"Temporary failure in name resolution|HttpExceptionRequest|ConnectionFailure|"
+    r"被信号 \d+ 终止",
+    re.IGNORECASE
+)
+
+# 记录中保存的错误信息长度上限
+MAX_ERROR_LENGTH = 500
+
+# 默认隔离所需的失败次数
+DEFAULT_THRESHOLD = 2
+
+
+def error_chain(error):
+    """异常及其 __cause__ 链（转换错误以 raise ... from 包装原始异常）
+
+    Args:
+        error: 异常对象或错误信息
+
+    Returns:
+        list: 从外到内的异常（或错误信息）
+    """
+    chain = [error]
+    while isinstance(error, BaseException) and error.__cause__ is not None \
+            and error.__cause__ not in chain:
+        error = error.__cause__
+        chain.append(error)
+    return chain
+
+
+def is_transient(error):
+    """失败是否看起来是暂时性的（重试可能成功）
+
+    Args:
+        error: 异常对象或错误信息
+
+    Returns:
+        bool: 是否为暂时性失败
+    """
+    for cause in error_chain(error):
+        if isinstance(cause, (MemoryError, BrokenPipeError, ConnectionError)):
+            return True
+    return bool(TRANSIENT_RE.search(str(error)))
+
+
+def make_context(toolchain, output_format, options):
+    """转换环境的签名：工具链、输出格式或选项变化后签名随之变化
+
+    Args:
+        toolchain: 工具链描述（pandoc 版本与过滤器），可被 JSON 序列化
+        output_format: 输出格式
+        options: 影响输出的转换选项（字典）
+
+    Returns:
+        str: 十六进制签名
+    """
+    data = json.dumps([toolchain, output_format.lower(), options], sort_keys=True)
+    return hashlib.sha256(data.encode('utf-8')).hexdigest()[:16]
+
+
+def get_quarantine():
+    """加载配置中的失败记录文件"""
+    from config import config
+    return Quarantine(config.conversion.quarantine_file, config.conversion.quarantine_after)
+
+
+class Quarantine:
+    """按输入内容与转换环境记录的失败，可被多个转换线程同时使用
+
+    修改只保存在内存中，由调用方在批次结束后调用 save 写入文件。
+    """
+
+    def __init__(self, path, threshold=DEFAULT_THRESHOLD):
+        """初始化失败记录
+
+        Args:
+            path: 记录文件路径，文件不存在或损坏时从空记录开始
+            threshold: 隔离所需的失败次数
+        """
+        self.path = str(path)
+        self.threshold = max(1, threshold)
+        self._lock = threading.Lock()
+        self._entries = {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            self._entries = {key: dict(value) for key, value in data.get('entries', {}).items()}
+        except (OSError, ValueError, AttributeError):
+            self._entries = {}
+
+        # 按路径与大小索引记录，大多数文件不需要计算哈希就能确定没有记录
+        self._by_path = {}
+        self._by_size = {}
+        for key, entry in list(self._entries.items()):
+            try:
+                self._index(key, entry)
+            except (KeyError, TypeError):
+                del self._entries[key]
+
+        # 统计：跳过的已隔离输入数、记录的失败数、因转换成功而清除的记录数
+        self.stats = {'quarantined': 0, 'failures': 0, 'released': 0}
+
+    def _index(self, key, entry):
+        """把记录加入索引"""
+        self._by_path.setdefault(entry['path'], set()).add(key)
+        self._by_size.setdefault(entry['size'], set()).add(key)
+
+    def _unindex(self, key, entry):
+        """把记录移出索引"""
+        for index, value in ((self._by_path, entry['path']), (self._by_size, entry['size'])):
+            keys = index.get(value)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del index[value]
+
+    def _key(self, file_path, context, need_digest=True):
+        """计算输入的记录键（内容哈希:环境签名）
+
+        路径、大小与修改时间都与已有记录相同时沿用其内容哈希，不重新读取文件。
+
+        Returns:
+            tuple: (记录键, 绝对路径, stat结果)；不需要计算哈希（没有可能匹配的记录）时记录键为None
+        """
+        path = os.path.abspath(file_path)
+        stat = os.stat(path)
+        with self._lock:
+            for key in self._by_path.get(path, ()):
+                entry = self._entries[key]
+                if key.endswith(':' + context) and entry['size'] == stat.st_size \
+                        and entry.get('mtime_ns') == stat.st_mtime_ns:
+                    return key, path, stat
+            candidates = path in self._by_path or stat.st_size in self._by_size
+        if not need_digest and not candidates:
+            return None, path, stat
+        return f"{file_digest(path)}:{context}", path, stat
+
+    def lookup(self, file_path, context):
+        """查找已隔离的输入
+
+        Args:
+            file_path: 源文件路径
+            context: 转换环境签名（见 make_context）
+
+        Returns:
+            dict: 失败记录（副本），未被隔离时返回None
+        """
+        try:
+            key, path, stat = self._key(file_path, context, need_digest=False)
+        except OSError:
+            return None
+        if key is None:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry['failures'] < self.threshold:
+                return None
+            if entry['path'] == path:
+                # 内容未变但修改时间变了（如被 touch），之后不必再计算哈希
+                entry['mtime_ns'] = stat.st_mtime_ns
+            self.stats['quarantined'] += 1
+            return dict(entry)
+
+    def record_failure(self, file_path, context, error, toolchain="", output_format=""):
+        """记录一次失败
+
+        Args:
+            file_path: 源文件路径
+            context: 转换环境签名
+            error: 异常对象或错误信息
+            toolchain: 工具链描述（仅用于显示）
+            output_format: 输出格式（仅用于显示）
+
+        Returns:
+            dict: 更新后的失败记录（副本），无法读取源文件时返回None
+        """
+        try:
+            key, path, stat = self._key(file_path, context)
+        except OSError:
+            return None
+        now = time.time()
+        with self._lock:
+            self._drop_stale(key, path, context)
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = {'failures': 0, 'first_failed': now}
+                self._entries[key] = entry
+            else:
+                self._unindex(key, entry)
+            entry.update(path=path, size=stat.st_size, mtime_ns=stat.st_mtime_ns,
+                         format=output_format, toolchain=toolchain, last_failed=now,
+                         error=str(error).strip()[:MAX_ERROR_LENGTH])
+            entry['failures'] += 1
+            self._index(key, entry)
+            self.stats['failures'] += 1
+            return dict(entry)
+
+    def record_success(self, file_path, context):
+        """转换成功后清除该输入的失败记录"""
+        try:
+            key, path, _ = self._key(file_path, context, need_digest=False)
+        except OSError:
+            return
+        if key is None:
+            return
+        with self._lock:
+            self._drop_stale(key, path, context)
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._unindex(key, entry)
+                self.stats['released'] += 1
+
+    def _drop_stale(self, key, path, context):
+        """删除同一路径在同一转换环境下、内容已变化的旧记录（调用方需持有锁）"""
+        for stale in list(self._by_path.get(path, ())):
+            if stale != key and stale.endswith(':' + context):
+                self._unindex(stale, self._entries.pop(stale))
+
+    def entries(self):
+        """全部失败记录（副本），最近失败的在前
+
+        Returns:
+            list: 失败记录，quarantined 表示是否已被隔离
+        """
+        with self._lock:
+            entries = [dict(entry, key=key, quarantined=entry['failures'] >= self.threshold)
+                       for key, entry in self._entries.items()]
+        entries.sort(key=lambda entry: entry.get('last_failed', 0), reverse=True)
+        return entries
+
+    def clear(self, file_paths=None):
+        """清除失败记录
+
+        Args:
+            file_paths: 只清除这些源文件的记录，如果为None则清除全部
+
+        Returns:
+            int: 清除的记录数
+        """
+        with self._lock:
+            if file_paths is None:
+                keys = list(self._entries)
+            else:
+                paths = {os.path.abspath(str(path)) for path in file_paths}
+                keys = [key for key, entry in self._entries.items() if entry['path'] in paths]
+            for key in keys:
+                self._unindex(key, self._entries.pop(key))
+            return len(keys)
+
+    def save(self):
+        """原子写入记录文件"""
+        with self._lock:
+            data = json.dumps({'version': 1, 'entries': self._entries}, indent=1, sort_keys=True)
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(data)
+        os.replace(tmp_path, self.path)
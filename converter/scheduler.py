@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+DocuFlow - 按优先级调度的共享转换线程池
+同一进程中的所有转换（GUI、命令行、API 调用方）共用一个线程池，任务分为三个通道：
+
+- interactive: 交互式的少量文件，优先于其他通道，并有预留的工作线程只处理该通道，
+  即使线程池被批量任务占满也能立即开始
+- normal: 普通批次
+- bulk: 大批量后台任务，与 normal 按权重分享空闲线程（不会被完全饿死）
+
+同一通道内按提交方（如每个 ConversionEngine）加权公平分配：
+每个提交方维护虚拟时间，每派发一个任务增加 1/权重，总是选择虚拟时间最小的提交方，
+一个提交方的大批次不会让后来的提交方一直等待。
+
+启用 CPU 亲和性时，每个工作线程绑定到一组 CPU（见 converter/affinity.py）。
+"""
+
+import threading
+import itertools
+from collections import deque
+from concurrent.futures import Future
+
+# 优先级通道
+INTERACTIVE = "interactive"
+NORMAL = "normal"
+BULK = "bulk"
+PRIORITIES = (INTERACTIVE, NORMAL, BULK)
+
+# normal 与 bulk 通道分享空闲线程的权重
+LANE_WEIGHTS = {NORMAL: 4, BULK: 1}
+
+# 界面中显示的名称
+PRIORITY_LABELS = {
+    INTERACTIVE: "交互（优先）",
+    NORMAL: "普通",
+    BULK: "批量（后台）",
+}
+
+# 界面选择“自动”时，不超过此文件数的批次使用 interactive 通道
+INTERACTIVE_BATCH_SIZE = 10
+
+
+def priority_for_batch(file_count):
+    """界面中“自动”优先级：少量文件走交互通道，其余为普通批次"""
+    return INTERACTIVE if file_count <= INTERACTIVE_BATCH_SIZE else NORMAL
+
+
+class _Flow:
+    """某个提交方在某个通道中的任务队列"""
+
+    __slots__ = ('jobs', 'weight', 'vtime')
+
+    def __init__(self, weight, vtime):
+        self.jobs = deque()
+        self.weight = weight
+        self.vtime = vtime
+
+
+class ConversionScheduler:
+    """按优先级通道与提交方公平调度的线程池"""
+
+    def __init__(self, max_workers, reserved_interactive=1, affinity='off'):
+        """初始化调度器（工作线程在首次提交任务时才创建）
+
+        Args:
+            max_workers: 处理所有通道的工作线程数
+            reserved_interactive: 只处理 interactive 通道的预留线程数
+            affinity: CPU 亲和性模式（'off'、'cores' 或 'numa'）
+        """
+        self.max_workers = max(1, max_workers)
+        self.reserved_interactive = max(0, reserved_interactive)
+        self._cond = threading.Condition()
+        self._flows = {priority: {} for priority in PRIORITIES}
+        self._lane_vtime = {lane: 0.0 for lane in LANE_WEIGHTS}
+        self._running = {}
+        self._limits = {}
+        self._general_threads = 0
+        self._reserved_threads = 0
+        self._thread_ids = itertools.count(1)
+        self._local = threading.local()
+        self.affinity = affinity
+        self._cpu_slots = None
+        self._slot_ids = itertools.count()
+
+    def ensure_workers(self, count):
+        """确保处理所有通道的工作线程不少于 count 个（只增不减）"""
+        with self._cond:
+            self.max_workers = max(self.max_workers, count)
+            if self._general_threads or self._reserved_threads:
+                self._start_threads()
+
+    def in_worker(self):
+        """当前线程是否为调度器的工作线程"""
+        return getattr(self._local, 'worker', False)
+
+    def submit(self, fn, *args, priority=NORMAL, submitter=None, weight=1.0, max_running=None,
+               **kwargs):
+        """提交任务
+
+        Args:
+            fn: 任务函数，参数为 *args 与 **kwargs
+            priority: 优先级通道（INTERACTIVE、NORMAL 或 BULK）
+            submitter: 提交方标识，同一通道内按提交方公平分配，如果为None则每个任务单独计
+            weight: 提交方的权重，权重越大分到的线程越多
+            max_running: 该提交方同时运行的任务数上限，如果为None则不限制
+
+        Returns:
+            concurrent.futures.Future: 任务结果
+        """
+        if priority not in self._flows:
+            raise Exception(f"未知的优先级: {priority}（可用: {', '.join(PRIORITIES)}）")
+        future = Future()
+        key = submitter if submitter is not None else object()
+        with self._cond:
+            flows = self._flows[priority]
+            flow = flows.get(key)
+            if flow is None:
+                # 新提交方从当前最小虚拟时间开始，既不占先也不吃亏
+                start = min((other.vtime for other in flows.values()), default=0.0)
+                flow = flows[key] = _Flow(max(weight, 0.001), start)
+            flow.jobs.append((future, fn, args, kwargs))
+            self._running.setdefault(key, 0)
+            if max_running is not None:
+                self._limits[key] = max(1, max_running)
+            self._start_threads()
+            self._cond.notify_all()
+        return future
+
+    def _start_threads(self):
+        """补足工作线程（调用方需持有锁）"""
+        while self._reserved_threads < self.reserved_interactive:
+            self._reserved_threads += 1
+            self._spawn(True)
+        while self._general_threads < self.max_workers:
+            self._general_threads += 1
+            self._spawn(False)
+
+    def _next_cpus(self):
+        """下一个工作线程绑定的 CPU 集合，不绑定时返回None（调用方需持有锁）"""
+        if self.affinity == 'off':
+            return None
+        if self._cpu_slots is None:
+            from converter.affinity import plan_cpu_slots
+            self._cpu_slots = plan_cpu_slots(self.max_workers + self.reserved_interactive,
+                                             self.affinity)
+        if not self._cpu_slots:
+            return None
+        # ensure_workers 增加的线程轮流复用已规划的槽位
+        return self._cpu_slots[next(self._slot_ids) % len(self._cpu_slots)]
+
+    def _spawn(self, reserved):
+        """启动一个工作线程"""
+        thread = threading.Thread(target=self._worker, args=(reserved, self._next_cpus()),
+                                  daemon=True,
+                                  name=f"docuflow-{next(self._thread_ids)}")
+        thread.start()
+
+    def _eligible(self, flows):
+        """有待运行任务且未达到并发上限的提交方"""
+        return [(key, flow) for key, flow in flows.items()
+                if flow.jobs and self._running[key] < self._limits.get(key, float('inf'))]
+
+    def _next_job(self, reserved):
+        """选择下一个任务（调用方需持有锁）
+
+        Returns:
+            tuple: (提交方, 任务)，没有可运行的任务时返回None
+        """
+        candidates = self._eligible(self._flows[INTERACTIVE])
+        if not candidates and not reserved:
+            lanes = {lane: self._eligible(self._flows[lane]) for lane in LANE_WEIGHTS}
+            active = [lane for lane, eligible in lanes.items() if eligible]
+            if not active:
+                return None
+            # 空闲的通道追上活跃通道的虚拟时间，不能积攒份额
+            floor = min(self._lane_vtime[lane] for lane in active)
+            for lane in LANE_WEIGHTS:
+                if lane not in active:
+                    self._lane_vtime[lane] = max(self._lane_vtime[lane], floor)
+            lane = min(active, key=lambda name: self._lane_vtime[name])
+            self._lane_vtime[lane] += 1.0 / LANE_WEIGHTS[lane]
+            candidates = lanes[lane]
+        if not candidates:
+            return None
+
+        key, flow = min(candidates, key=lambda item: item[1].vtime)
+        flow.vtime += 1.0 / flow.weight
+        return key, flow.jobs.popleft()
+
+    def _release(self, key):
+        """任务结束后更新计数，清理已空闲的提交方（调用方需持有锁）"""
+        self._running[key] -= 1
+        if self._running[key] == 0 and not any(
+                key in flows and flows[key].jobs for flows in self._flows.values()):
+            del self._running[key]
+            self._limits.pop(key, None)
+            for flows in self._flows.values():
+                flows.pop(key, None)
+
+    def _worker(self, reserved, cpus=None):
+        """工作线程主循环"""
+        self._local.worker = True
+        if cpus:
+            from converter.affinity import pin_current_thread
+            pin_current_thread(cpus)
+        while True:
+            with self._cond:
+                selected = self._next_job(reserved)
+                while selected is None:
+                    self._cond.wait()
+                    selected = self._next_job(reserved)
+                key, (future, fn, args, kwargs) = selected
+                self._running[key] += 1
+
+            try:
+                if future.set_running_or_notify_cancel():
+                    try:
+                        result = fn(*args, **kwargs)
+                    except BaseException as e:
+                        future.set_exception(e)
+                    else:
+                        future.set_result(result)
+            finally:
+                with self._cond:
+                    self._release(key)
+                    self._cond.notify_all()
+
+
+# 进程内共享的调度器
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler():
+    """获取进程内共享的调度器（首次调用时按配置创建）
+
+    Returns:
+        ConversionScheduler: 调度器
+    """
+    global _scheduler
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                from config import config
+                _scheduler = ConversionScheduler(config.conversion.max_workers,
+                                                 config.conversion.reserved_interactive_workers,
+                                                 config.conversion.cpu_affinity)
+    return _scheduler
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+DocuFlow - 本地暂存区
+源文件与输出目录位于 NFS/SMB 等网络文件系统时，pandoc 的大量小块读写与 --self-contained
+获取资源都很慢。启用暂存后，每个文件（以及 .md/.html 中以相对路径引用的图片、样式表等资源）
+先以大块顺序读取复制到本地临时目录（优先 /dev/shm），pandoc 在本地读写，
+输出再一次性写回输出目录。
+
+暂存的源文件保留文件名与修改时间，资源按原相对路径放在暂存目录中并排在资源搜索路径最前，
+没有暂存的资源仍从原位置读取，输出与直接转换相同。
+暂存区总大小有上限，已满时新任务等待其他任务释放空间；单个文件超过上限时直接转换。
+
+启用暂存时小文件不再分批转换（批量转换由 pandoc 直接读取源文件）。
+增量渲染（--incremental）不暂存：源文件只被顺序读取一次，章节输出来自本地缓存。
+"""
+
+import os
+import re
+import shutil
+import tempfile
+import threading
+from contextlib import contextmanager
+from urllib.parse import unquote
+
+# 复制文件时的块大小（网络文件系统上大块顺序读取远快于 pandoc 的小块读取）
+COPY_BUFFER_SIZE = 4 * 1024 * 1024
+
+# 暂存区默认大小上限
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+# 输出大小按输入估计，另加固定余量（如 .docx 的样式与元数据）
+OUTPUT_ALLOWANCE = 64 * 1024
+
+# 会引用本地资源的输入格式，及其中的资源引用：Markdown 图片、src 属性、<link href>、CSS url()
+RESOURCE_FORMATS = ('.md', '.html', '.htm')
+RESOURCE_RE = re.compile(
+    r'!\[[^\]]*\]\(\s*<?([^)\s>]+)'
+    r'|\bsrc\s*=\s*["\']?([^"\'\s>]+)'
+    r'|<link\b[^>]*?\bhref\s*=\s*["\']?([^"\'\s>]+)'
+    r'|url\(\s*["\']?([^"\')\s]+)',
+    re.IGNORECASE
+)
+# 带协议的 URL（http:、data: 等）不是本地文件
+URL_SCHEME_RE = re.compile(r'^[a-z][a-z0-9+.-]*:', re.IGNORECASE)
+
+
+def _copy(source_path, target_path):
+    """以大块顺序读取复制文件，保留访问与修改时间"""
+    os.makedirs(os.path.dirname(target_path), exist_ok=True)
+    with open(source_path, 'rb') as src, open(target_path, 'wb') as dst:
+        if hasattr(os, 'posix_fadvise'):
+            os.posix_fadvise(src.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+        shutil.copyfileobj(src, dst, COPY_BUFFER_SIZE)
+    stat = os.stat(source_path)
+    os.utime(target_path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+
+def find_resources(file_path, bases):
+    """查找 .md/.html 中以相对路径引用、且存在的本地资源
+
+    Args:
+        file_path: 源文件路径
+        bases: 解析相对路径的目录列表，按pandoc资源搜索路径的顺序
+
+    Returns:
+        dict: 资源的相对路径 -> 按搜索顺序找到的第一个文件路径
+    """
+    with open(file_path, 'rb') as f:
+        text = f.read().decode('utf-8', errors='replace')
+
+    resources = {}
+    for match in RESOURCE_RE.finditer(text):
+        url = next(group for group in match.groups() if group)
+        url = unquote(url.split('#', 1)[0].split('?', 1)[0])
+        if not url or URL_SCHEME_RE.match(url) or os.path.isabs(url):
+            continue
+        relative = os.path.normpath(url)
+        # 指向上级目录的资源不暂存，仍从原位置读取
+        if relative in resources or relative.startswith(os.pardir):
+            continue
+        for base in bases:
+            candidate = os.path.join(base, relative)
+            if os.path.isfile(candidate):
+                resources[relative] = candidate
+                break
+    return resources
+
+
+class StagedInput:
+    """暂存到本地的一个转换任务"""
+
+    def __init__(self, work_dir, path, resource_dir=None):
+        """初始化暂存任务
+
+        Args:
+            work_dir: 任务的本地临时目录
+            path: 源文件的本地副本
+            resource_dir: 资源副本所在目录，没有暂存资源时为None
+        """
+        self.work_dir = work_dir
+        self.path = path
+        self.resource_dir = resource_dir
+
+    def output_path(self, output_path):
+        """与最终输出同名的本地输出路径（pandoc 根据扩展名推断输出格式）"""
+        return os.path.join(self.work_dir, "out", os.path.basename(output_path))
+
+    def resource_args(self, bases):
+        """pandoc的资源搜索路径参数：资源副本目录在前，其后为原搜索路径"""
+        dirs = ([self.resource_dir] if self.resource_dir else []) + list(bases)
+        return [f"--resource-path={os.pathsep.join(dirs)}"]
+
+
+class StagingArea:
+    """大小有上限的本地暂存区，可被多个转换线程同时使用"""
+
+    def __init__(self, root=None, max_bytes=DEFAULT_MAX_BYTES):
+        """初始化暂存区
+
+        Args:
+            root: 暂存目录，如果为None则使用本地临时目录（优先 /dev/shm）
+            max_bytes: 同时暂存的源文件、资源与输出的估计总大小上限
+        """
+        if root is None:
+            from utils.file_utils import get_scratch_dir
+            root = get_scratch_dir()
+        self.root = os.path.abspath(str(root))
+        self.max_bytes = max(1, max_bytes)
+        self._used = 0
+        self._cond = threading.Condition()
+        # 统计：暂存的文件数、从源位置读入的字节数、写回的输出字节数
+        self.stats = {'staged': 0, 'bytes_in': 0, 'bytes_out': 0}
+
+    def _reserve(self, size):
+        """占用暂存空间，已满时等待"""
+        with self._cond:
+            while self._used and self._used + size > self.max_bytes:
+                self._cond.wait()
+            self._used += size
+
+    def _release(self, size):
+        """释放暂存空间"""
+        with self._cond:
+            self._used -= size
+            self._cond.notify_all()
+
+    def record_output(self, size):
+        """记录写回的输出大小"""
+        with self._cond:
+            self.stats['bytes_out'] += size
+
+    @contextmanager
+    def stage(self, file_path, resource_bases=None):
+        """把源文件（及其引用的相对路径资源）复制到本地，退出时删除
+
+        Args:
+            file_path: 源文件路径
+            resource_bases: 解析资源相对路径的目录列表，如果为None则不暂存资源
+
+        Yields:
+            StagedInput: 暂存任务；源文件已在暂存目录中或超过暂存区上限时为None，应直接转换
+        """
+        file_path = os.path.abspath(file_path)
+        try:
+            already_local = os.path.commonpath([file_path, self.root]) == self.root
+        except ValueError:
+            # Windows 上位于不同驱动器
+            already_local = False
+        if already_local:
+            yield None
+            return
+
+        resources = {}
+        if resource_bases is not None and os.path.splitext(file_path)[1].lower() in RESOURCE_FORMATS:
+            resources = find_resources(file_path, resource_bases)
+        copied = os.path.getsize(file_path) + sum(os.path.getsize(path)
+                                                  for path in resources.values())
+        # 源文件与资源的副本，加上与之相当的输出
+        reserved = copied * 2 + OUTPUT_ALLOWANCE
+        if reserved > self.max_bytes:
+            yield None
+            return
+
+        self._reserve(reserved)
+        work_dir = None
+        try:
+            work_dir = tempfile.mkdtemp(prefix="docuflow_stage_", dir=self.root)
+            os.mkdir(os.path.join(work_dir, "out"))
+            local_path = os.path.join(work_dir, "in", os.path.basename(file_path))
+            _copy(file_path, local_path)
+
+            resource_dir = None
+            if resources:
+                resource_dir = os.path.join(work_dir, "res")
+                for relative, source_path in resources.items():
+                    _copy(source_path, os.path.join(resource_dir, relative))
+
+            with self._cond:
+                self.stats['staged'] += 1
+                self.stats['bytes_in'] += copied
+            yield StagedInput(work_dir, local_path, resource_dir)
+        finally:
+            if work_dir:
+                shutil.rmtree(work_dir, ignore_errors=True)
+            self._release(reserved)
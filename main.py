@@ -7,12 +7,14 @@ DocuFlow - 文档转换器
 
 import sys
 import os
-from PyQt5.QtWidgets import QApplication
-from PyQt5.QtCore import Qt
-from ui.main_window import MainWindow
 
 def main():
     """主函数"""
+    # Qt 与主窗口在启动时才导入
+    from PyQt5.QtWidgets import QApplication
+    from PyQt5.QtCore import Qt
+    from ui.main_window import MainWindow
+    
     # 设置高DPI支持（必须在创建QApplication之前）
     QApplication.setAttribute(Qt.AA_EnableHighDpiScaling, True)
     QApplication.setAttribute(Qt.AA_UseHighDpiPixmaps, True)
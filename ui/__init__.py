@@ -1,8 +1,16 @@
 # -*- coding: utf-8 -*-
 """
 DocuFlow UI模块
+
+界面模块依赖 Qt，按需导入：MainWindow 为 PyQt5 主窗口，
+PySide6 主窗口位于 ui.pyside_window
 """
 
-from .main_window import MainWindow
+__all__ = ['MainWindow']
 
-__all__ = ['MainWindow']
\ No newline at end of file
+def __getattr__(name):
+    """首次访问 MainWindow 时才导入 PyQt5 界面"""
+    if name == 'MainWindow':
+        from .main_window import MainWindow
+        return MainWindow
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
\ No newline at end of file
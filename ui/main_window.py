@@ -10,7 +10,8 @@ from PyQt5.QtWidgets import (
     QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QGridLayout,
     QPushButton, QLabel, QComboBox, QLineEdit, QTextEdit, QProgressBar,
     QFileDialog, QMessageBox, QListWidget, QListWidgetItem, QGroupBox,
-    QCheckBox, QSplitter, QFrame, QDialog, QDialogButtonBox, QStyledItemDelegate
+    QCheckBox, QSplitter, QFrame, QDialog, QDialogButtonBox, QStyledItemDelegate,
+    QListView
 )
 from PyQt5.QtCore import Qt
 from PyQt5.QtGui import QPainter, QFontMetrics
@@ -170,52 +171,125 @@ class FileListItem(QWidget):
         """删除文件"""
         self.parent_window.remove_file(self.file_path)
 
-from PyQt5.QtCore import Qt, QThread, pyqtSignal, QTimer
-from PyQt5.QtGui import QFont, QIcon, QPixmap, QDragEnterEvent, QDropEvent
+from PyQt5.QtCore import Qt, QThread, pyqtSignal, QTimer, QAbstractListModel, QModelIndex
+from PyQt5.QtGui import QFont, QIcon, QPixmap, QDragEnterEvent, QDropEvent, QColor
+from config import config
 from converter.document_converter import DocumentConverter
 from utils.file_utils import get_supported_formats, is_supported_file
+from converter.planner import plan_conversion, get_throughput_stats, EtaTracker
+from converter.scheduler import PRIORITY_LABELS, priority_for_batch
+from utils.file_utils import format_duration
+from ui.result_log import ResultLog, ResultEntry, ProgressBatcher
+
+class ResultLogModel(QAbstractListModel):
+    """转换结果列表模型，视图只绘制可见行"""
+    
+    def __init__(self, result_log, parent=None):
+        super().__init__(parent)
+        self.result_log = result_log
+        self._rows = []
+    
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+    
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        entry = self._rows[index.row()]
+        if role == Qt.DisplayRole:
+            return entry.display_text()
+        if role == Qt.ForegroundRole and not entry.success:
+            return QColor("#c0392b")
+        return None
+    
+    def refresh(self):
+        """按结果日志的当前内容与过滤条件重建可见行（切换过滤条件、清空日志时使用）"""
+        self.beginResetModel()
+        self._rows = self.result_log.visible_entries()
+        self.endResetModel()
+    
+    def append(self, entries, evicted):
+        """增量更新可见行：移除因超出容量而丢弃的最早结果，在末尾插入新结果
+        
+        Args:
+            entries: 新追加到结果日志的结果
+            evicted: 结果日志因此丢弃的已有结果（ResultLog.extend 的返回值）
+        """
+        if len(entries) >= self.result_log.capacity:
+            # 一批结果就超出容量（新结果本身也被丢弃）时直接重建
+            self.refresh()
+            return
+        removed = sum(1 for entry in evicted if self.result_log.is_visible(entry))
+        if removed:
+            self.beginRemoveRows(QModelIndex(), 0, removed - 1)
+            del self._rows[:removed]
+            self.endRemoveRows()
+        added = [entry for entry in entries if self.result_log.is_visible(entry)]
+        if added:
+            start = len(self._rows)
+            self.beginInsertRows(QModelIndex(), start, start + len(added) - 1)
+            self._rows.extend(added)
+            self.endInsertRows()
 
 class ConversionWorker(QThread):
-    """转换工作线程"""
-    progress_updated = pyqtSignal(int, str)  # 进度, 状态信息
-    file_processed = pyqtSignal(str, bool, str)  # 文件名, 是否成功, 错误信息
+    """转换工作线程
+    
+    逐个文件的进度写入 ProgressBatcher，由界面定时器批量读取，不逐个发送信号
+    """
     conversion_finished = pyqtSignal(list)  # 转换完成的文件列表
     
-    def __init__(self, files, output_format, output_dir, keep_original_name):
+    def __init__(self, files, output_format, output_dir, keep_original_name, batcher,
+                 priority=None):
         super().__init__()
         self.files = files
         self.output_format = output_format
         self.output_dir = output_dir
         self.keep_original_name = keep_original_name
+        self.batcher = batcher
+        self.priority = priority
         self.converter = DocumentConverter()
         
     def run(self):
         """执行转换任务"""
-        total_files = len(self.files)
         converted_files = []
+        self.batcher.set_total(len(self.files))
+        
+        # 用历史吞吐量估算剩余时间，并记录本次运行的吞吐量
+        stats = get_throughput_stats()
+        eta = EtaTracker(plan_conversion(self.converter, self.files, self.output_format,
+                                         self.output_dir, self.keep_original_name, stats=stats,
+                                         max_file_size=float('inf')))
+        self.converter.throughput_stats = stats
         
-        for i, file_path in enumerate(self.files):
+        for file_path in self.files:
+            filename = os.path.basename(file_path)
             try:
-                # 更新进度
-                progress = int((i / total_files) * 100)
-                self.progress_updated.emit(progress, f"正在转换: {os.path.basename(file_path)}")
+                self.batcher.set_status(f"正在转换: {filename}，"
+                                        f"预计剩余 {format_duration(eta.remaining_seconds())}")
                 
                 # 执行转换
                 output_file = self.converter.convert_file(
-                    file_path, self.output_format, self.output_dir, self.keep_original_name
+                    file_path, self.output_format, self.output_dir, self.keep_original_name,
+                    priority=self.priority
                 )
                 
                 if output_file:
                     converted_files.append(output_file)
-                    self.file_processed.emit(os.path.basename(file_path), True, "")
+                    self.batcher.record(filename, True)
                 else:
-                    self.file_processed.emit(os.path.basename(file_path), False, "转换失败")
+                    self.batcher.record(filename, False, "转换失败")
                     
             except Exception as e:
-                self.file_processed.emit(os.path.basename(file_path), False, str(e))
+                self.batcher.record(filename, False, str(e))
+            eta.complete(file_path)
+        
+        try:
+            stats.save()
+        except OSError:
+            pass
         
         # 转换完成
-        self.progress_updated.emit(100, "转换完成")
+        self.batcher.set_status("转换完成")
         self.conversion_finished.emit(converted_files)
 
 class MainWindow(QMainWindow):
@@ -225,6 +299,14 @@ class MainWindow(QMainWindow):
         super().__init__()
         self.selected_files = []
         self.conversion_worker = None
+        self.progress_batcher = None
+        self.result_log = ResultLog(config.window.log_capacity)
+        
+        # 按固定帧率合并刷新进度与日志
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.setInterval(max(1, 1000 // config.window.refresh_fps))
+        self.refresh_timer.timeout.connect(self.flush_progress)
+        
         self.init_ui()
         
     def init_ui(self):
@@ -474,6 +556,14 @@ class MainWindow(QMainWindow):
         self.keep_name_checkbox.setChecked(True)
         layout.addWidget(self.keep_name_checkbox, 2, 0, 1, 2)
         
+        # 优先级：自动时少量文件走交互通道，不会排在大批量任务之后
+        layout.addWidget(QLabel("优先级:"), 3, 0)
+        self.priority_combo = QComboBox()
+        self.priority_combo.addItem("自动", None)
+        for priority, label in PRIORITY_LABELS.items():
+            self.priority_combo.addItem(label, priority)
+        layout.addWidget(self.priority_combo, 3, 1)
+        
         # 连接信号
         self.browse_output_btn.clicked.connect(self.browse_output_directory)
         
@@ -504,11 +594,19 @@ class MainWindow(QMainWindow):
         self.status_label.setStyleSheet("color: #2c3e50; font-weight: bold;")
         layout.addWidget(self.status_label)
         
-        # 结果文本框
-        self.result_text = QTextEdit()
-        self.result_text.setMaximumHeight(120)
-        self.result_text.setStyleSheet("""
-            QTextEdit {
+        # 结果过滤
+        self.failures_only_checkbox = QCheckBox("只显示失败")
+        self.failures_only_checkbox.toggled.connect(self.toggle_failures_only)
+        layout.addWidget(self.failures_only_checkbox)
+        
+        # 结果列表（有界环形缓冲区，只绘制可见行）
+        self.result_model = ResultLogModel(self.result_log, self)
+        self.result_view = QListView()
+        self.result_view.setModel(self.result_model)
+        self.result_view.setUniformItemSizes(True)
+        self.result_view.setMaximumHeight(120)
+        self.result_view.setStyleSheet("""
+            QListView {
                 border: 1px solid #bdc3c7;
                 border-radius: 4px;
                 background-color: #f8f9fa;
@@ -516,7 +614,7 @@ class MainWindow(QMainWindow):
                 font-size: 11px;
             }
         """)
-        layout.addWidget(self.result_text)
+        layout.addWidget(self.result_view)
         
         return group
     
@@ -628,36 +726,76 @@ class MainWindow(QMainWindow):
         output_dir = self.output_dir_edit.text().strip() or None
         keep_original_name = self.keep_name_checkbox.isChecked()
         
+        # 安排任务前按能力索引校验，注定失败的文件不进入转换
+        try:
+            converter = DocumentConverter()
+            checks = [(file_path, converter.check_conversion(file_path, output_format))
+                      for file_path in self.selected_files]
+        except Exception as e:
+            QMessageBox.critical(self, "无法转换", str(e))
+            return
+        files = [file_path for file_path, reason in checks if not reason]
+        rejected = [ResultEntry(os.path.basename(file_path), False, reason)
+                    for file_path, reason in checks if reason]
+        
+        # 清空结果日志，记录被跳过的文件
+        self.result_log.clear()
+        self.result_log.extend(rejected)
+        self.result_model.refresh()
+        self.progress_bar.setValue(0)
+        
+        if not files:
+            QMessageBox.warning(self, "无法转换", f"所选文件都不能转换为 {output_format} 格式")
+            return
+        
         # 禁用转换按钮
         self.convert_button.setEnabled(False)
         self.convert_button.setText("转换中...")
         
-        # 清空结果文本
-        self.result_text.clear()
-        
         # 创建并启动工作线程
+        self.progress_batcher = ProgressBatcher(len(files))
+        priority = self.priority_combo.currentData() or priority_for_batch(len(files))
         self.conversion_worker = ConversionWorker(
-            self.selected_files, output_format, output_dir, keep_original_name
+            files, output_format, output_dir, keep_original_name,
+            self.progress_batcher, priority
         )
-        self.conversion_worker.progress_updated.connect(self.update_progress)
-        self.conversion_worker.file_processed.connect(self.file_processed)
         self.conversion_worker.conversion_finished.connect(self.conversion_finished)
         self.conversion_worker.start()
+        self.refresh_timer.start()
     
-    def update_progress(self, progress, status):
-        """更新进度"""
-        self.progress_bar.setValue(progress)
-        self.status_label.setText(status)
-    
-    def file_processed(self, filename, success, error_msg):
-        """文件处理完成"""
-        if success:
-            self.result_text.append(f"✅ {filename} - 转换成功")
+    def flush_progress(self):
+        """读取自上次刷新以来的进度与结果，一次性更新界面"""
+        if self.progress_batcher is None:
+            return
+        update = self.progress_batcher.take()
+        if update is None:
+            return
+        
+        done, total, status, entries = update
+        if total:
+            self.progress_bar.setValue(int(done * 100 / total))
+            self.status_label.setText(f"{status} ({done}/{total})")
         else:
-            self.result_text.append(f"❌ {filename} - 转换失败: {error_msg}")
+            self.status_label.setText(status)
+        
+        if entries:
+            # 只插入新增的行；用户向上翻看日志时不强制滚动到底部
+            scroll_bar = self.result_view.verticalScrollBar()
+            at_bottom = scroll_bar.value() >= scroll_bar.maximum()
+            evicted = self.result_log.extend(entries)
+            self.result_model.append(entries, evicted)
+            if at_bottom:
+                self.result_view.scrollToBottom()
+    
+    def toggle_failures_only(self, checked):
+        """切换是否只显示失败的文件"""
+        self.result_log.failures_only = checked
+        self.result_model.refresh()
     
     def conversion_finished(self, converted_files):
         """转换完成"""
+        self.refresh_timer.stop()
+        self.flush_progress()
         self.convert_button.setEnabled(True)
         self.convert_button.setText("🚀 开始转换")
         
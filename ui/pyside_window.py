@@ -0,0 +1,463 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+DocuFlow - PySide6 主窗口界面
+"""
+
+import logging
+from pathlib import Path
+from PySide6.QtWidgets import (
+    QMainWindow, QVBoxLayout, QHBoxLayout, 
+    QWidget, QPushButton, QListWidget, QComboBox, QLineEdit,
+    QLabel, QFileDialog, QMessageBox, QTabWidget, QFormLayout,
+    QListView, QCheckBox, QProgressBar
+)
+from PySide6.QtCore import QThread, QObject, Signal, Qt, QTimer, QAbstractListModel, QModelIndex
+from PySide6.QtGui import QColor
+
+from config import config
+from converter.document_converter import DocumentConverter
+from converter.engine import ConversionEngine, FAILED, CANCELLED
+from converter.output import UNCHANGED
+from converter.planner import plan_conversion, get_throughput_stats, EtaTracker, SKIP_LABELS
+from converter.scheduler import PRIORITY_LABELS, priority_for_batch
+from utils.file_utils import format_duration
+from utils.archive_utils import is_archive_file
+from ui.result_log import ResultLog, ProgressBatcher
+
+# 文件列表中各状态的颜色
+STATUS_COLORS = {
+    "success": "#27ae60",
+    FAILED: "#c0392b",
+    CANCELLED: "#7f8c8d",
+}
+
+# 设置日志
+logger = logging.getLogger(__name__)
+
+class ResultLogModel(QAbstractListModel):
+    """转换结果列表模型，视图只绘制可见行"""
+
+    def __init__(self, result_log, parent=None):
+        super().__init__(parent)
+        self.result_log = result_log
+        self._rows = []
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        entry = self._rows[index.row()]
+        if role == Qt.DisplayRole:
+            return entry.display_text()
+        if role == Qt.ForegroundRole and not entry.success:
+            return QColor("#c0392b")
+        return None
+
+    def refresh(self):
+        """按结果日志的当前内容与过滤条件重建可见行（切换过滤条件、清空日志时使用）"""
+        self.beginResetModel()
+        self._rows = self.result_log.visible_entries()
+        self.endResetModel()
+
+    def append(self, entries, evicted):
+        """增量更新可见行：移除因超出容量而丢弃的最早结果，在末尾插入新结果
+
+        Args:
+            entries: 新追加到结果日志的结果
+            evicted: 结果日志因此丢弃的已有结果（ResultLog.extend 的返回值）
+        """
+        if len(entries) >= self.result_log.capacity:
+            # 一批结果就超出容量（新结果本身也被丢弃）时直接重建
+            self.refresh()
+            return
+        removed = sum(1 for entry in evicted if self.result_log.is_visible(entry))
+        if removed:
+            self.beginRemoveRows(QModelIndex(), 0, removed - 1)
+            del self._rows[:removed]
+            self.endRemoveRows()
+        added = [entry for entry in entries if self.result_log.is_visible(entry)]
+        if added:
+            start = len(self._rows)
+            self.beginInsertRows(QModelIndex(), start, start + len(added) - 1)
+            self._rows.extend(added)
+            self.endInsertRows()
+
+class ConversionWorker(QObject):
+    """转换工作对象，使用并发转换引擎，单个文件失败不影响其他文件"""
+    conversion_finished = Signal(str)
+    conversion_error = Signal(str)
+
+    def __init__(self, files_to_convert, output_dir, output_format, batcher, priority=None):
+        super().__init__()
+        self.files_to_convert = files_to_convert
+        # 空字符串转换为None，使用源文件所在目录
+        self.output_dir = output_dir if output_dir.strip() else None
+        self.output_format = output_format
+        # 逐个文件的进度写入 batcher，由界面定时器批量读取
+        self.batcher = batcher
+        self.engine = ConversionEngine(DocumentConverter(), priority=priority)
+        self.eta = None
+
+    def cancel(self):
+        """取消转换（可在界面线程中调用）"""
+        self.engine.cancel()
+        self.batcher.set_status("正在取消，等待进行中的文件完成...")
+
+    def run(self):
+        converter = self.engine.converter
+        try:
+            # 扫描输入，跳过不能转换的文件，并用历史吞吐量估算剩余时间
+            stats = get_throughput_stats()
+            plan = plan_conversion(converter, self.files_to_convert, self.output_format,
+                                   self.output_dir, max_workers=self.engine.max_workers,
+                                   stats=stats)
+            # 要转换的归档中被跳过的成员在转换归档时仍会产出结果，不在这里重复记录
+            archives = tuple(f"{path}:" for path in plan.files if is_archive_file(path))
+            skipped = [item for item in plan.skipped if not item[0].startswith(archives)] \
+                if archives else plan.skipped
+            for file_path, reason, message in skipped:
+                self.batcher.record(Path(file_path).name, False,
+                                    f"{SKIP_LABELS[reason]}: {message}", file_path)
+            self.eta = EtaTracker(plan)
+            # 每个归档成员单独产出结果（包括被跳过的成员），总数按结果条数而不是输入文件数计算
+            self.batcher.set_total(len(plan.jobs) + len(plan.skipped))
+            self.batcher.set_status(f"正在转换（{self.engine.max_workers} 个并发），"
+                                    f"预计 {format_duration(plan.estimated_seconds)}")
+
+            converter.throughput_stats = stats
+            results = self.engine.run(plan.files, self.output_format, self.output_dir,
+                                      on_result=self._on_result)
+        except Exception as e:
+            self.conversion_error.emit(f"发生意外错误: {e}")
+            return
+
+        try:
+            stats.save()
+        except OSError as e:
+            logger.warning(f"无法保存吞吐量统计: {e}")
+
+        succeeded = sum(1 for result in results if result.ok)
+        failed = len(skipped) + sum(1 for result in results if result.status == FAILED)
+        cancelled = sum(1 for result in results if result.status == CANCELLED)
+        message = f"成功 {succeeded} 个，失败 {failed} 个"
+        if cancelled:
+            message += f"，已取消 {cancelled} 个"
+        self.batcher.set_status("转换已取消" if cancelled else "转换完成")
+        self.conversion_finished.emit(message)
+
+    def _on_result(self, result):
+        """记录单个文件的结果（在工作线程中调用）"""
+        if result.status == CANCELLED:
+            return
+        name = Path(result.file_path).name
+        if result.member:
+            name = f"{name}:{result.member}"
+        message = "内容未变化" if result.status == UNCHANGED else (result.error or "")
+        if result.ok and result.duplicate_of:
+            message = f"与 {Path(result.duplicate_of).name} 内容相同"
+        self.batcher.record(name, result.ok, message, result.file_path)
+        if self.eta is not None and not self.engine.cancelled:
+            self.eta.complete(result.file_path)
+            self.batcher.set_status(f"正在转换（{self.engine.max_workers} 个并发），"
+                                    f"预计剩余 {format_duration(self.eta.remaining_seconds())}")
+
+class MainWindow(QMainWindow):
+    def __init__(self):
+        super().__init__()
+        self.setWindowTitle(f"{config.app.name} v{config.app.version}")
+        self.setGeometry(100, 100, config.window.width, config.window.height)
+        
+        self.progress_batcher = None
+        self.worker = None
+        self.result_log = ResultLog(config.window.log_capacity)
+        # 本批次各文件的列表项与失败的文件
+        self.batch_items = {}
+        self.finished_files = set()
+        self.failed_files = []
+        
+        # 按固定帧率合并刷新进度与日志
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.setInterval(max(1, 1000 // config.window.refresh_fps))
+        self.refresh_timer.timeout.connect(self.flush_progress)
+        
+        # 创建中央部件
+        central_widget = QWidget()
+        self.setCentralWidget(central_widget)
+        
+        # 创建主布局
+        main_layout = QHBoxLayout(central_widget)
+        
+        # 左侧文件列表
+        left_layout = QVBoxLayout()
+        
+        # 文件操作按钮
+        file_buttons_layout = QHBoxLayout()
+        self.add_files_button = QPushButton("添加文件")
+        self.add_folder_button = QPushButton("添加文件夹")
+        self.clear_files_button = QPushButton("清空列表")
+        
+        file_buttons_layout.addWidget(self.add_files_button)
+        file_buttons_layout.addWidget(self.add_folder_button)
+        file_buttons_layout.addWidget(self.clear_files_button)
+        
+        left_layout.addLayout(file_buttons_layout)
+        
+        # 文件列表
+        self.file_list_widget = QListWidget()
+        left_layout.addWidget(QLabel("待转换文件:"))
+        left_layout.addWidget(self.file_list_widget)
+        
+        main_layout.addLayout(left_layout, 2)
+        
+        # 右侧设置和控制
+        right_layout = QVBoxLayout()
+        
+        # 创建选项卡
+        tab_widget = QTabWidget()
+        
+        # 设置选项卡
+        settings_tab = QWidget()
+        settings_layout = QFormLayout(settings_tab)
+        
+        # 输出目录设置
+        default_dir = config.conversion.default_output_dir
+        self.output_dir_edit = QLineEdit(str(default_dir) if default_dir else "")
+        self.output_dir_edit.setPlaceholderText("留空则使用源文件所在目录")
+        self.browse_button = QPushButton("浏览...")
+        output_dir_layout = QHBoxLayout()
+        output_dir_layout.addWidget(self.output_dir_edit)
+        output_dir_layout.addWidget(self.browse_button)
+        settings_layout.addRow("输出目录:", output_dir_layout)
+
+        self.output_format_combo = QComboBox()
+        for ext, fmt in config.files.supported_output_formats.items():
+            self.output_format_combo.addItem(f"{fmt.description}", ext)
+        settings_layout.addRow("输出格式:", self.output_format_combo)
+
+        # 优先级：自动时少量文件走交互通道，不会排在大批量任务之后
+        self.priority_combo = QComboBox()
+        self.priority_combo.addItem("自动", None)
+        for priority, label in PRIORITY_LABELS.items():
+            self.priority_combo.addItem(label, priority)
+        settings_layout.addRow("优先级:", self.priority_combo)
+
+        self.start_conversion_button = QPushButton("开始转换")
+        self.start_conversion_button.setStyleSheet("font-size: 16px; padding: 10px;")
+        self.cancel_button = QPushButton("取消")
+        self.cancel_button.setEnabled(False)
+        self.retry_button = QPushButton("重试失败的文件")
+        self.retry_button.setEnabled(False)
+        control_layout = QHBoxLayout()
+        control_layout.addWidget(self.cancel_button)
+        control_layout.addWidget(self.retry_button)
+
+        self.progress_bar = QProgressBar()
+        self.status_label = QLabel("准备就绪")
+
+        right_layout.addWidget(tab_widget)
+        right_layout.addWidget(self.progress_bar)
+        right_layout.addWidget(self.status_label)
+        right_layout.addWidget(self.start_conversion_button)
+        right_layout.addLayout(control_layout)
+        
+        tab_widget.addTab(settings_tab, "设置")
+        
+        # 日志选项卡
+        log_tab = QWidget()
+        log_layout = QVBoxLayout(log_tab)
+        self.failures_only_checkbox = QCheckBox("只显示失败")
+        log_layout.addWidget(self.failures_only_checkbox)
+        # 有界环形缓冲区，只绘制可见行
+        self.result_model = ResultLogModel(self.result_log, self)
+        self.result_view = QListView()
+        self.result_view.setModel(self.result_model)
+        self.result_view.setUniformItemSizes(True)
+        log_layout.addWidget(self.result_view)
+        tab_widget.addTab(log_tab, "日志")
+        
+        main_layout.addLayout(right_layout, 1)
+        
+        # 连接信号
+        self.add_files_button.clicked.connect(self.add_files)
+        self.add_folder_button.clicked.connect(self.add_folder)
+        self.clear_files_button.clicked.connect(self.clear_files)
+        self.browse_button.clicked.connect(self.browse_output_dir)
+        self.start_conversion_button.clicked.connect(lambda: self.start_conversion())
+        self.cancel_button.clicked.connect(self.cancel_conversion)
+        self.retry_button.clicked.connect(self.retry_failed)
+        self.failures_only_checkbox.toggled.connect(self.toggle_failures_only)
+        
+        logger.info(f"{config.app.name} v{config.app.version} 已启动")
+
+    def add_files(self):
+        files, _ = QFileDialog.getOpenFileNames(
+            self, "选择文件", "", 
+            config.get_file_dialog_filter('input')
+        )
+        for file_path in files:
+            if not self.file_list_widget.findItems(file_path, Qt.MatchExactly):
+                self.file_list_widget.addItem(file_path)
+                logger.info(f"已添加文件: {file_path}")
+
+    def start_conversion(self, files_to_convert=None):
+        """开始转换
+
+        Args:
+            files_to_convert: 要转换的文件，如果为None则转换列表中的全部文件
+        """
+        items = [self.file_list_widget.item(i) for i in range(self.file_list_widget.count())]
+        if files_to_convert is None:
+            files_to_convert = [item.text() for item in items]
+        if not files_to_convert:
+            QMessageBox.warning(self, "没有文件", "请先添加要转换的文件。")
+            return
+
+        output_dir = self.output_dir_edit.text()
+        output_format = self.output_format_combo.currentData()
+
+        self.set_converting(True)
+        logger.info(f"开始转换 {len(files_to_convert)} 个文件到 {output_format} 格式...")
+
+        # 重置本批次文件的状态
+        batch = set(files_to_convert)
+        self.batch_items = {item.text(): item for item in items if item.text() in batch}
+        for item in self.batch_items.values():
+            self.set_item_status(item, None)
+        self.finished_files = set()
+        self.failed_files = []
+
+        self.result_log.clear()
+        self.result_model.refresh()
+        self.progress_bar.setValue(0)
+        self.progress_batcher = ProgressBatcher(len(files_to_convert))
+
+        self.thread = QThread()
+        priority = self.priority_combo.currentData() or priority_for_batch(len(files_to_convert))
+        self.worker = ConversionWorker(files_to_convert, output_dir, output_format,
+                                       self.progress_batcher, priority)
+        self.worker.moveToThread(self.thread)
+
+        self.thread.started.connect(self.worker.run)
+        self.worker.conversion_finished.connect(self.on_conversion_finished)
+        self.worker.conversion_error.connect(self.on_conversion_error)
+
+        self.thread.start()
+        self.refresh_timer.start()
+
+    def cancel_conversion(self):
+        """取消正在进行的转换"""
+        if self.worker is not None:
+            self.cancel_button.setEnabled(False)
+            self.worker.cancel()
+
+    def retry_failed(self):
+        """只重新转换上一批次中失败的文件"""
+        if self.failed_files:
+            self.start_conversion(list(self.failed_files))
+
+    def set_converting(self, converting):
+        """切换转换中/空闲时的按钮状态"""
+        self.start_conversion_button.setEnabled(not converting)
+        self.cancel_button.setEnabled(converting)
+        self.retry_button.setEnabled(not converting and bool(self.failed_files))
+        for button in (self.add_files_button, self.add_folder_button, self.clear_files_button):
+            button.setEnabled(not converting)
+
+    def set_item_status(self, item, status, message=""):
+        """在文件列表中标记文件的转换状态"""
+        if status is None:
+            item.setData(Qt.ForegroundRole, None)
+            item.setToolTip("")
+            return
+        item.setForeground(QColor(STATUS_COLORS[status]))
+        item.setToolTip(message)
+
+    def flush_progress(self):
+        """读取自上次刷新以来的进度与结果，一次性更新界面"""
+        if self.progress_batcher is None:
+            return
+        update = self.progress_batcher.take()
+        if update is None:
+            return
+
+        done, total, status, entries = update
+        if total:
+            self.progress_bar.setValue(int(done * 100 / total))
+            self.status_label.setText(f"{status} ({done}/{total})")
+        else:
+            self.status_label.setText(status)
+
+        if entries:
+            for entry in entries:
+                self.finished_files.add(entry.file_path)
+                if not entry.success and entry.file_path not in self.failed_files:
+                    self.failed_files.append(entry.file_path)
+                item = self.batch_items.get(entry.file_path)
+                if item is not None:
+                    status = "success" if entry.success else FAILED
+                    # 归档中任一成员失败时保持失败标记
+                    if entry.success and entry.file_path in self.failed_files:
+                        status = FAILED
+                    self.set_item_status(item, status, entry.message)
+            # 只插入新增的行；用户向上翻看日志时不强制滚动到底部
+            scroll_bar = self.result_view.verticalScrollBar()
+            at_bottom = scroll_bar.value() >= scroll_bar.maximum()
+            evicted = self.result_log.extend(entries)
+            self.result_model.append(entries, evicted)
+            if at_bottom:
+                self.result_view.scrollToBottom()
+
+    def toggle_failures_only(self, checked):
+        """切换是否只显示失败的文件"""
+        self.result_log.failures_only = checked
+        self.result_model.refresh()
+
+    def on_conversion_finished(self, message):
+        self.finish_conversion()
+        if self.failed_files:
+            QMessageBox.warning(self, "转换完成", f"{message}。\n可点击“重试失败的文件”只重新转换失败的文件。")
+        else:
+            QMessageBox.information(self, "转换完成", message)
+        logger.info(message)
+
+    def on_conversion_error(self, error_message):
+        self.finish_conversion()
+        QMessageBox.critical(self, "转换失败", error_message)
+        logger.error(error_message)
+
+    def finish_conversion(self):
+        """结束批次：刷新剩余进度，标记未转换的文件，停止线程"""
+        self.refresh_timer.stop()
+        self.flush_progress()
+        for file_path, item in self.batch_items.items():
+            if file_path not in self.finished_files:
+                self.set_item_status(item, CANCELLED, "已取消")
+        self.thread.quit()
+        self.thread.wait()
+        self.worker = None
+        self.set_converting(False)
+
+    def add_folder(self):
+        directory = QFileDialog.getExistingDirectory(self, "选择文件夹")
+        if directory:
+            folder_path = Path(directory)
+            for extension in config.files.all_input_extensions:
+                for file_path in folder_path.rglob(f"*{extension}"):
+                    if file_path.is_file():
+                        if not self.file_list_widget.findItems(str(file_path), Qt.MatchExactly):
+                            self.file_list_widget.addItem(str(file_path))
+                            logger.info(f"已添加文件: {file_path}")
+
+    def clear_files(self):
+        self.file_list_widget.clear()
+        self.failed_files = []
+        self.retry_button.setEnabled(False)
+        logger.info("已清空文件列表")
+
+    def browse_output_dir(self):
+        directory = QFileDialog.getExistingDirectory(self, "选择输出目录")
+        if directory:
+            self.output_dir_edit.setText(directory)
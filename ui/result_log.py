@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+DocuFlow - 转换结果日志与进度合并
+不依赖 Qt，PyQt5 与 PySide6 界面共用：
+
+- ProgressBatcher: 工作线程逐个记录结果，界面定时器按固定帧率一次性取走，
+  避免每个文件发送一次信号导致界面线程忙于重绘
+- ResultLog: 固定容量的环形缓冲区，只保留最近的结果，支持只查看失败项
+"""
+
+import threading
+import itertools
+from collections import deque
+
+
+class ResultEntry:
+    """单个文件的转换结果"""
+
+    __slots__ = ('name', 'success', 'message', 'file_path')
+
+    def __init__(self, name, success, message="", file_path=None):
+        """初始化转换结果
+
+        Args:
+            name: 显示用的文件名
+            success: 是否成功
+            message: 附加信息（失败原因等）
+            file_path: 源文件路径，用于在文件列表中标记状态
+        """
+        self.name = name
+        self.success = success
+        self.message = message
+        self.file_path = file_path
+
+    def display_text(self):
+        """日志视图中显示的文本"""
+        if self.success:
+            suffix = f" ({self.message})" if self.message else ""
+            return f"✅ {self.name} - 转换成功{suffix}"
+        return f"❌ {self.name} - 转换失败: {self.message}"
+
+
+class ProgressBatcher:
+    """线程安全的进度累加器
+
+    工作线程调用 record()/set_status() 只做加锁追加，界面线程定时调用 take()
+    取走自上次以来的全部变化。
+    """
+
+    def __init__(self, total=0):
+        """初始化进度累加器
+
+        Args:
+            total: 文件总数
+        """
+        self._lock = threading.Lock()
+        self._entries = []
+        self._total = total
+        self._done = 0
+        self._status = ""
+        self._changed = False
+
+    def set_total(self, total):
+        """设置文件总数"""
+        with self._lock:
+            self._total = total
+            self._changed = True
+
+    def set_status(self, status):
+        """更新当前状态文本（只保留最新一条）"""
+        with self._lock:
+            self._status = status
+            self._changed = True
+
+    def record(self, name, success, message="", file_path=None):
+        """记录一个文件的转换结果"""
+        with self._lock:
+            self._entries.append(ResultEntry(name, success, message, file_path))
+            self._done += 1
+            self._changed = True
+
+    def take(self):
+        """取走自上次调用以来的变化
+
+        Returns:
+            tuple: (已完成数, 总数, 状态文本, 新结果列表)，没有变化时返回None
+        """
+        with self._lock:
+            if not self._changed:
+                return None
+            entries, self._entries = self._entries, []
+            self._changed = False
+            return self._done, self._total, self._status, entries
+
+
+class ResultLog:
+    """有界的转换结果日志"""
+
+    def __init__(self, capacity=10000):
+        """初始化结果日志
+
+        Args:
+            capacity: 最多保留的结果条数，超出后丢弃最早的结果
+        """
+        self.capacity = max(1, capacity)
+        self._entries = deque(maxlen=self.capacity)
+        self.failures_only = False
+        self.success_count = 0
+        self.failure_count = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def dropped(self):
+        """因超出容量而丢弃的条数"""
+        return self.success_count + self.failure_count - len(self._entries)
+
+    def extend(self, entries):
+        """追加一批结果
+
+        Args:
+            entries: 新结果列表
+
+        Returns:
+            list: 因超出容量而丢弃的已有结果（最早的在前），供视图增量移除对应的行
+        """
+        for entry in entries:
+            if entry.success:
+                self.success_count += 1
+            else:
+                self.failure_count += 1
+        overflow = min(len(self._entries), len(self._entries) + len(entries) - self.capacity)
+        evicted = list(itertools.islice(self._entries, overflow)) if overflow > 0 else []
+        self._entries.extend(entries)
+        return evicted
+
+    def clear(self):
+        """清空日志与计数"""
+        self._entries.clear()
+        self.success_count = 0
+        self.failure_count = 0
+
+    def is_visible(self, entry):
+        """结果在当前过滤条件下是否显示"""
+        return not (self.failures_only and entry.success)
+
+    def visible_entries(self):
+        """按当前过滤条件返回要显示的结果"""
+        if self.failures_only:
+            return [entry for entry in self._entries if not entry.success]
+        return list(self._entries)
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+DocuFlow - 归档输入工具函数
+直接读取 zip/tar 归档中的文档，无需先解压到磁盘
+"""
+
+import os
+import time
+from utils.file_utils import get_file_extension, SUPPORTED_FORMATS
+
+# 支持作为输入的归档格式
+ARCHIVE_EXTENSIONS = ('.zip', '.tar', '.tar.gz', '.tgz', '.tar.bz2', '.tbz2',
+                      '.tar.xz', '.txz', '.tar.zst')
+
+
+class ArchiveMember:
+    """归档中的一个文档成员"""
+
+    def __init__(self, archive_path, name, size, mtime, fileobj):
+        """初始化归档成员
+
+        Args:
+            archive_path: 所属归档路径
+            name: 规范化后的成员相对路径（使用 / 分隔）
+            size: 成员大小（字节）
+            mtime: 成员修改时间戳
+            fileobj: 可读取成员内容的文件对象，仅在迭代到下一个成员之前有效
+        """
+        self.archive_path = archive_path
+        self.name = name
+        self.size = size
+        self.mtime = mtime
+        self.fileobj = fileobj
+
+    @property
+    def extension(self):
+        """小写的扩展名"""
+        return get_file_extension(self.name)
+
+    def __repr__(self):
+        return f"ArchiveMember({self.archive_path!r}, {self.name!r})"
+
+
+def is_archive_file(file_path):
+    """检查文件是否为支持的输入归档
+
+    Args:
+        file_path: 文件路径
+
+    Returns:
+        bool: 是否为归档
+    """
+    return os.path.isfile(file_path) and file_path.lower().endswith(ARCHIVE_EXTENSIONS)
+
+
+def safe_member_path(name):
+    """规范化成员路径，去掉开头的 /、盘符与 .. 片段
+
+    Args:
+        name: 归档中的原始成员名
+
+    Returns:
+        str: 规范化后的相对路径，无效时返回None
+    """
+    path = name.replace('\\', '/')
+    parts = [part for part in path.split('/') if part not in ('', '.', '..')]
+    if parts and parts[0].endswith(':'):
+        parts = parts[1:]
+    return '/'.join(parts) or None
+
+
+def iter_archive_members(archive_path):
+    """按归档中的顺序逐个读取支持格式的文档成员
+
+    tar 归档以流模式读取，每个成员的内容只能在迭代到下一个成员之前读取。
+
+    Args:
+        archive_path: 归档路径
+
+    Yields:
+        ArchiveMember: 文档成员
+    """
+    if archive_path.lower().endswith('.zip'):
+        yield from _iter_zip_members(archive_path)
+    else:
+        yield from _iter_tar_members(archive_path)
+
+
+def _iter_zip_members(archive_path):
+    """读取 zip 归档成员"""
+    import zipfile
+    with zipfile.ZipFile(archive_path) as archive:
+        for info in archive.infolist():
+            if info.is_dir():
+                continue
+            name = safe_member_path(info.filename)
+            if not name or get_file_extension(name) not in SUPPORTED_FORMATS:
+                continue
+
+            mtime = _zip_mtime(info)
+            with archive.open(info) as fileobj:
+                yield ArchiveMember(archive_path, name, info.file_size, mtime, fileobj)
+
+
+def _iter_tar_members(archive_path):
+    """以流模式读取 tar 归档成员"""
+    import tarfile
+    with open(archive_path, 'rb') as raw:
+        stream = raw
+        if archive_path.lower().endswith('.tar.zst'):
+            try:
+                import zstandard
+            except ImportError:
+                raise Exception("读取 .tar.zst 需要安装 zstandard: pip install zstandard")
+            stream = zstandard.ZstdDecompressor().stream_reader(raw)
+
+        with tarfile.open(fileobj=stream, mode='r|*') as archive:
+            for info in archive:
+                if not info.isfile():
+                    continue
+                name = safe_member_path(info.name)
+                if not name or get_file_extension(name) not in SUPPORTED_FORMATS:
+                    continue
+
+                fileobj = archive.extractfile(info)
+                yield ArchiveMember(archive_path, name, info.size, info.mtime, fileobj)
+
+
+def _zip_mtime(info):
+    """将 zip 成员的修改时间转换为时间戳"""
+    try:
+        return time.mktime(info.date_time + (0, 0, -1))
+    except (OverflowError, ValueError):
+        return 0
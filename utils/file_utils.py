@@ -5,6 +5,7 @@ DocuFlow - 文件处理工具函数
 """
 
 import os
+import sys
 import mimetypes
 
 # 支持的文件格式（已移除PDF支持）
@@ -16,7 +17,19 @@ SUPPORTED_FORMATS = {
     '.epub': 'EPUB电子书'
 }
 
-# 格式转换支持矩阵（已移除PDF转换）
+# 支持的输出格式
+OUTPUT_FORMATS = {
+    '.md': 'Markdown文档',
+    '.docx': 'Microsoft Word文档',
+    '.html': 'HTML文档',
+    '.epub': 'EPUB电子书'
+}
+
+# 读取路径列表时的块大小
+PATH_LIST_CHUNK_SIZE = 64 * 1024
+
+# 格式转换支持矩阵（已移除PDF转换），是项目内唯一的转换表；
+# 实际可用的转换见 converter.capabilities，还需与已安装的pandoc求交集
 CONVERSION_MATRIX = {
     '.docx': ['.md', '.html', '.epub'],
     '.md': ['.docx', '.html', '.epub'],
@@ -59,6 +72,14 @@ def get_supported_formats():
     """
     return SUPPORTED_FORMATS.copy()
 
+def get_output_formats():
+    """获取支持的输出格式列表
+    
+    Returns:
+        dict: 格式字典
+    """
+    return OUTPUT_FORMATS.copy()
+
 def get_conversion_options(source_format):
     """获取指定源格式的转换选项
     
@@ -137,6 +158,58 @@ def format_file_size(size_bytes):
     
     return f"{size_bytes:.1f} {size_names[i]}"
 
+def format_duration(seconds):
+    """格式化时长
+    
+    Args:
+        seconds: 秒数
+        
+    Returns:
+        str: 如 "42s"、"3m05s"、"1h02m"
+    """
+    seconds = int(round(seconds))
+    if seconds < 60:
+        return f"{seconds}s"
+    minutes, seconds = divmod(seconds, 60)
+    if minutes < 60:
+        return f"{minutes}m{seconds:02d}s"
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}h{minutes:02d}m"
+
+def iter_files_from_directory(directory, recursive=False):
+    """惰性扫描目录中支持的文件
+    
+    每个目录内按文件名排序，子目录在当前目录的文件之后依次扫描；
+    不需要先列出整棵目录树，适合文件数很多的目录。
+    
+    Args:
+        directory: 目录路径
+        recursive: 是否递归搜索子目录
+        
+    Yields:
+        str: 支持的文件路径
+    """
+    try:
+        with os.scandir(directory) as entries:
+            entries = sorted(entries, key=lambda entry: entry.name)
+    except OSError:
+        return
+    
+    subdirs = []
+    for entry in entries:
+        try:
+            # 与 os.walk 一致，不进入指向目录的符号链接，避免链接成环时重复扫描
+            if entry.is_dir(follow_symlinks=False):
+                subdirs.append(entry.path)
+            elif entry.is_file() and get_file_extension(entry.name) in SUPPORTED_FORMATS:
+                yield entry.path
+        except OSError:
+            continue
+    
+    if recursive:
+        for subdir in subdirs:
+            yield from iter_files_from_directory(subdir, recursive)
+
 def get_files_from_directory(directory, recursive=False):
     """从目录获取支持的文件列表
     
@@ -147,21 +220,49 @@ def get_files_from_directory(directory, recursive=False):
     Returns:
         list: 支持的文件路径列表
     """
-    files = []
+    return sorted(iter_files_from_directory(directory, recursive))
+
+def iter_path_list(source, null_separated=False):
+    """惰性读取路径列表（如 find 的输出），读到一个路径就产出一个
     
-    if not os.path.isdir(directory):
-        return files
+    Args:
+        source: 列表文件路径，"-" 表示标准输入
+        null_separated: 路径以 NUL 分隔（find -print0），否则按行分隔并忽略空行
+        
+    Yields:
+        str: 路径（无法按文件系统编码解码的字节保留为代理字符，与 os.listdir 一致）
+    """
+    stream = sys.stdin.buffer if source == '-' else open(source, 'rb')
+    try:
+        if not null_separated:
+            for line in stream:
+                line = line.rstrip(b'\r\n')
+                if line:
+                    yield os.fsdecode(line)
+            return
+        
+        # 管道中按可用数据读取，不等待填满缓冲区
+        read = getattr(stream, 'read1', stream.read)
+        pending = b''
+        for chunk in iter(lambda: read(PATH_LIST_CHUNK_SIZE), b''):
+            *paths, pending = (pending + chunk).split(b'\0')
+            for path in paths:
+                if path:
+                    yield os.fsdecode(path)
+        if pending:
+            yield os.fsdecode(pending)
+    finally:
+        if stream is not sys.stdin.buffer:
+            stream.close()
+
+def get_scratch_dir():
+    """获取本地临时目录，优先使用内存文件系统 /dev/shm
     
-    if recursive:
-        for root, dirs, filenames in os.walk(directory):
-            for filename in filenames:
-                file_path = os.path.join(root, filename)
-                if is_supported_file(file_path):
-                    files.append(file_path)
-    else:
-        for filename in os.listdir(directory):
-            file_path = os.path.join(directory, filename)
-            if is_supported_file(file_path):
-                files.append(file_path)
-    
-    return sorted(files)
\ No newline at end of file
+    Returns:
+        str: 临时目录路径
+    """
+    shm_dir = '/dev/shm'
+    if os.path.isdir(shm_dir) and os.access(shm_dir, os.W_OK | os.X_OK):
+        return shm_dir
+    import tempfile
+    return tempfile.gettempdir()
\ No newline at end of file
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+DocuFlow - 非阻塞日志
+所有日志记录器只挂一个 QueueHandler，日志调用只是把记录放入内存队列；
+由后台 QueueListener 线程统一写入文件与终端，转换线程不会因磁盘或终端 I/O 而阻塞，
+多个线程也不再争用处理器的锁。
+
+支持按大小轮转的日志文件、JSON Lines 格式与按模块设置的日志级别。
+本模块只在配置日志时导入（logging 较重，不在启动阶段加载）。
+"""
+
+import json
+import queue
+import atexit
+import logging
+import logging.handlers
+
+# 标准 LogRecord 属性，其余属性视为 extra 传入的结构化字段
+_RECORD_ATTRS = frozenset(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """每条日志输出为一行 JSON
+
+    包含时间、级别、记录器、线程与消息，logger.info(..., extra={...}) 传入的字段原样保留。
+    """
+
+    def format(self, record):
+        entry = {
+            'time': self.formatTime(record, '%Y-%m-%dT%H:%M:%S') + f".{int(record.msecs):03d}",
+            'level': record.levelname,
+            'logger': record.name,
+            'thread': record.threadName,
+            'message': record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+def _level(name):
+    """级别名称转换为数值，无效名称按 INFO 处理"""
+    level = logging.getLevelName(str(name).upper())
+    return level if isinstance(level, int) else logging.INFO
+
+
+def setup_queue_logging(settings):
+    """配置队列日志
+
+    Args:
+        settings: config.LoggingSettings
+
+    Returns:
+        logging.handlers.QueueListener: 已启动的后台写入线程，进程退出时自动停止并写完剩余日志
+    """
+    if settings.json:
+        formatter = JsonLinesFormatter()
+    else:
+        formatter = logging.Formatter(settings.format)
+
+    # 日志文件在写入第一条日志时才创建
+    if settings.max_bytes > 0:
+        file_handler = logging.handlers.RotatingFileHandler(
+            settings.file, maxBytes=settings.max_bytes, backupCount=settings.backup_count,
+            encoding='utf-8', delay=True
+        )
+    else:
+        file_handler = logging.FileHandler(settings.file, encoding='utf-8', delay=True)
+    file_handler.setFormatter(formatter)
+
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(logging.Formatter(settings.format))
+
+    # 无界队列：put 不会阻塞调用线程
+    log_queue = queue.SimpleQueue()
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+    root.setLevel(_level(settings.level))
+    for name, level in settings.module_levels.items():
+        logging.getLogger(name).setLevel(_level(level))
+
+    listener = logging.handlers.QueueListener(log_queue, file_handler, stream_handler,
+                                              respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+    return listener